@@ -0,0 +1,186 @@
+import numpy as np
+from typing import Optional, Tuple
+
+
+def squared_distances(queries: np.ndarray, points: np.ndarray, point_norms: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Squared Euclidean distances between every query row and every point row.
+
+    Args:
+        queries (np.ndarray): (M, D) float32 query vectors
+        points (np.ndarray): (N, D) float32 vectors to compare against
+        point_norms (np.ndarray): Optional precomputed squared norms of points
+
+    Returns:
+        np.ndarray: (M, N) squared distances, clipped at zero
+    """
+    if point_norms is None:
+        point_norms = np.einsum('ij,ij->i', points, points)
+    query_norms = np.einsum('ij,ij->i', queries, queries)
+    squared = query_norms[:, None] + point_norms[None, :] - 2.0 * (queries @ points.T)
+    np.maximum(squared, 0.0, out=squared)
+    return squared
+
+
+def nearest_centroids(points: np.ndarray, centroids: np.ndarray, block_rows: int = 8192) -> np.ndarray:
+    """
+    Index of the nearest centroid for every point, computed block_rows points at a time
+    so the distance matrix never exceeds block_rows x n_centroids.
+
+    Returns:
+        np.ndarray: (N,) int64 centroid indices
+    """
+    assignment = np.empty(len(points), dtype=np.int64)
+    centroid_norms = np.einsum('ij,ij->i', centroids, centroids)
+    for start in range(0, len(points), block_rows):
+        stop = start + block_rows
+        # |c|^2 - 2 p.c orders centroids like the full distance; |p|^2 is the same for every centroid
+        scores = centroid_norms[None, :] - 2.0 * (points[start:stop] @ centroids.T)
+        assignment[start:stop] = np.argmin(scores, axis=1)
+    return assignment
+
+
+def kmeans(points: np.ndarray, n_clusters: int, n_iter: int = 20, seed: int = 0) -> np.ndarray:
+    """
+    Plain Lloyd's k-means, enough to partition a face gallery.
+
+    Args:
+        points (np.ndarray): (N, D) float32 vectors
+        n_clusters (int): Number of centroids
+        n_iter (int): Number of Lloyd iterations
+        seed (int): Random seed for the initial centroids
+
+    Returns:
+        np.ndarray: (n_clusters, D) float32 centroids
+    """
+    rng = np.random.RandomState(seed)
+    centroids = points[rng.choice(len(points), n_clusters, replace=False)].copy()
+
+    for _ in range(n_iter):
+        assignment = nearest_centroids(points, centroids)
+        counts = np.bincount(assignment, minlength=n_clusters)
+
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignment, points)
+        non_empty = counts > 0
+        centroids[non_empty] = sums[non_empty] / counts[non_empty, None]
+
+        # Re-seed empty clusters from random points so every list stays in use
+        empty = np.flatnonzero(~non_empty)
+        if len(empty):
+            centroids[empty] = points[rng.choice(len(points), len(empty), replace=False)]
+
+    return centroids
+
+
+class IVFIndex:
+    def __init__(self, encodings: np.ndarray, n_lists: Optional[int] = None, n_probe: int = 8,
+                 train_size: int = 50000, seed: int = 0, centroids: Optional[np.ndarray] = None,
+                 assignment: Optional[np.ndarray] = None, norms: Optional[np.ndarray] = None,
+                 trained_rows: Optional[int] = None):
+        """
+        Inverted-file (cluster-partitioned) approximate nearest-neighbour index
+
+        The gallery is split into n_lists k-means cells. A query is only
+        compared against the members of its n_probe nearest cells, so raising
+        n_probe trades latency for recall (n_probe == n_lists is exact).
+
+        Args:
+            encodings (np.ndarray): (N, 128) float32 gallery encodings
+            n_lists (int): Number of cells (defaults to about 4 * sqrt(N))
+            n_probe (int): Number of cells searched per query
+            train_size (int): Maximum number of rows used to train the centroids
+            seed (int): Random seed for training
+            centroids (np.ndarray): Already trained centroids to reuse (skips training,
+                e.g. when a gallery changed by a few rows)
+            assignment (np.ndarray): Cell of every row under those centroids, if already known
+            norms (np.ndarray): Squared norms of the rows, if already known
+            trained_rows (int): Gallery size the reused centroids were trained for
+        """
+        self.encodings = np.ascontiguousarray(encodings, dtype=np.float32)
+        count = len(self.encodings)
+
+        self.n_probe = n_probe
+        # Gallery size the centroids were trained for, so callers can tell when they no longer fit
+        self.trained_rows = count
+        if centroids is not None and len(centroids):
+            self.centroids = np.ascontiguousarray(centroids, dtype=np.float32)
+            if trained_rows is not None:
+                self.trained_rows = trained_rows
+        elif count:
+            if n_lists is None:
+                n_lists = int(4 * np.sqrt(count))
+            # Train on a sample; assigning the full gallery is a single pass afterwards
+            rng = np.random.RandomState(seed)
+            if count > train_size:
+                sample = self.encodings[rng.choice(count, train_size, replace=False)]
+            else:
+                sample = self.encodings
+            self.centroids = kmeans(sample, max(1, min(n_lists, count)), seed=seed)
+        else:
+            self.centroids = np.empty((0, self.encodings.shape[1]), dtype=np.float32)
+        self.n_lists = max(1, len(self.centroids))
+
+        if assignment is None:
+            assignment = self.assign(self.encodings)
+        # Cell of every row, in gallery order
+        self.assignment = np.asarray(assignment, dtype=np.int64)
+
+        # Store rows grouped by cell so each cell is one contiguous slice
+        self.order = np.argsort(assignment, kind='stable')
+        self.list_encodings = self.encodings[self.order]
+        if norms is None:
+            norms = np.einsum('ij,ij->i', self.encodings, self.encodings)
+        self.list_norms = np.asarray(norms, dtype=np.float32)[self.order]
+        self.offsets = np.concatenate(([0], np.cumsum(np.bincount(assignment, minlength=self.n_lists))))
+
+    def assign(self, encodings: np.ndarray) -> np.ndarray:
+        """
+        Cell of every encoding under the trained centroids.
+        """
+        if len(self.centroids) == 0:
+            return np.zeros(len(encodings), dtype=np.int64)
+        return nearest_centroids(np.asarray(encodings, dtype=np.float32), self.centroids)
+
+    def search(self, queries: np.ndarray, k: int = 1, n_probe: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Approximate k nearest gallery rows for every query.
+
+        Args:
+            queries (np.ndarray): (M, 128) float32 query encodings
+            k (int): Number of neighbours per query
+            n_probe (int): Override the number of cells searched
+
+        Returns:
+            tuple: (M, k) gallery indices and (M, k) distances, nearest first.
+            Missing neighbours (fewer than k candidates) have index -1 and
+            distance inf.
+        """
+        queries = np.ascontiguousarray(queries, dtype=np.float32)
+        n_probe = min(n_probe or self.n_probe, self.n_lists)
+
+        indices = np.full((len(queries), k), -1, dtype=np.int64)
+        distances = np.full((len(queries), k), np.inf, dtype=np.float32)
+        if len(queries) == 0 or len(self.encodings) == 0:
+            return indices, distances
+
+        # Nearest cells for every query in one batch
+        cell_dist = squared_distances(queries, self.centroids)
+        if n_probe < self.n_lists:
+            probes = np.argpartition(cell_dist, n_probe - 1, axis=1)[:, :n_probe]
+        else:
+            probes = np.tile(np.arange(self.n_lists), (len(queries), 1))
+
+        for q, cells in enumerate(probes):
+            rows = np.concatenate([np.arange(self.offsets[c], self.offsets[c + 1]) for c in cells])
+            if len(rows) == 0:
+                continue
+            dist = squared_distances(queries[q:q + 1], self.list_encodings[rows], self.list_norms[rows])[0]
+
+            top = min(k, len(rows))
+            best = np.argpartition(dist, top - 1)[:top] if top < len(rows) else np.arange(len(rows))
+            best = best[np.argsort(dist[best])]
+            indices[q, :top] = self.order[rows[best]]
+            distances[q, :top] = np.sqrt(dist[best])
+
+        return indices, distances
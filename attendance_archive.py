@@ -0,0 +1,372 @@
+import os
+import json
+import tempfile
+import threading
+from contextlib import contextmanager
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Optional
+
+try:
+    import fcntl
+except ImportError:
+    # Windows
+    fcntl = None
+    import msvcrt
+
+TIME_SLOTS = 3
+MISSING = -1
+DURATION_TABLE_DAYS = 3
+
+# Same order as AttendanceTracker.REQUIRED_COLUMNS
+COLUMNS = ['Name', 'Date'] + [
+    f'{kind} Time {i}' for i in range(1, TIME_SLOTS + 1) for kind in ('In', 'Out')
+] + [f'Session {i} Duration' for i in range(1, TIME_SLOTS + 1)] + ['Total Hours']
+
+# 'H:MM[:SS]' clock times and durations, optionally with str(timedelta) days
+TIME_PATTERN = r'^\s*(?:(\d+) days?, )?(\d+):(\d{1,2})(?::(\d{1,2}))?\s*$'
+
+
+def parse_seconds(values) -> np.ndarray:
+    """
+    Parse clock times or durations ('HH:MM:SS', 'HH:MM', '1 day, H:MM:SS') to seconds.
+
+    Args:
+        values: Sequence or Series of strings (empty or missing allowed)
+
+    Returns:
+        np.ndarray: int32 seconds, MISSING (-1) where a value is empty or unparsable
+    """
+    series = pd.Series(values, dtype=object).fillna('').astype(str)
+    parts = series.str.extract(TIME_PATTERN).astype(float).fillna({0: 0, 3: 0})
+    seconds = parts[0] * 86400 + parts[1] * 3600 + parts[2] * 60 + parts[3]
+    return seconds.fillna(MISSING).to_numpy(dtype=np.int32)
+
+
+def format_clock(seconds: np.ndarray) -> List[str]:
+    """
+    Seconds since midnight as 'HH:MM:SS' ('' for MISSING).
+    """
+    return ['' if s < 0 else f'{s // 3600:02d}:{s // 60 % 60:02d}:{s % 60:02d}' for s in seconds.tolist()]
+
+
+def duration_text(s: int) -> str:
+    """
+    Non-negative seconds as str(timedelta) does, 'H:MM:SS' or 'N day(s), H:MM:SS'.
+    """
+    days, s = divmod(s, 86400)
+    text = f'{s // 3600}:{s // 60 % 60:02d}:{s % 60:02d}'
+    return f"{days} day{'s' if days > 1 else ''}, {text}" if days else text
+
+
+_duration_table = None
+
+
+def format_duration(seconds: np.ndarray) -> np.ndarray:
+    """
+    Seconds as str(timedelta) does ('' for MISSING), vectorized.
+
+    Durations under DURATION_TABLE_DAYS days (three sessions can't exceed
+    that) are looked up in a table of precomputed strings built on first
+    use; longer ones are formatted one by one.
+
+    Returns:
+        np.ndarray: object array of strings
+    """
+    global _duration_table
+    if _duration_table is None:
+        _duration_table = np.array([''] + [duration_text(s) for s in range(DURATION_TABLE_DAYS * 86400)], dtype=object)
+    seconds = np.asarray(seconds, dtype=np.int64)
+    # Row 0 of the table is the MISSING text
+    out = _duration_table[np.clip(seconds, MISSING, len(_duration_table) - 2) + 1]
+    for i in np.flatnonzero(seconds >= len(_duration_table) - 1):
+        out[i] = duration_text(int(seconds[i]))
+    return out
+
+
+@contextmanager
+def file_lock(path: str):
+    """
+    Exclusive lock on a lock file, held across processes (e.g. the API and the
+    live recognition script writing the same archive).
+    """
+    with open(path, 'a+b') as f:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def month_of(date: str) -> str:
+    """
+    Partition key 'YYYY-MM' of a 'dd/mm/yyyy' date.
+    """
+    day, month, year = date.strip().split('/')
+    return f'{int(year):04d}-{int(month):02d}'
+
+
+class AttendanceArchive:
+    def __init__(self, directory: str = 'attendance_archive'):
+        """
+        Columnar attendance history, one compact file per month
+
+        Each partition (YYYY-MM.npz) holds typed columns: a name id into the
+        partition's sorted name list, the day of month, In/Out times as
+        seconds since midnight and session/total durations as seconds (-1
+        when missing). Values whose text the typed columns can't reproduce
+        exactly (e.g. 'HH:MM' times or unparsable strings) also keep their
+        original text, so restored records equal the archived ones. An index
+        maps every student to the months they appear in, so a daily query
+        reads one partition and a per-student query only the partitions
+        holding that student.
+
+        Args:
+            directory (str): Directory the partitions are written to
+        """
+        self.directory = directory
+        self.index_file = os.path.join(directory, 'index.json')
+        # Thread lock plus a lock file, since several processes may share the archive
+        self.lock = threading.Lock()
+        self.lock_file = os.path.join(directory, '.lock')
+        # Loaded partitions, keyed by month, with the mtime they were read at
+        self.cache = {}
+        os.makedirs(directory, exist_ok=True)
+
+    def partition_file(self, month: str) -> str:
+        return os.path.join(self.directory, f'{month}.npz')
+
+    def months(self) -> List[str]:
+        """
+        Archived months, oldest first.
+        """
+        return sorted(f[:-4] for f in os.listdir(self.directory) if f.endswith('.npz') and not f.startswith('.'))
+
+    def has_month(self, month: str) -> bool:
+        return os.path.exists(self.partition_file(month))
+
+    def load_index(self) -> Dict[str, List[str]]:
+        try:
+            with open(self.index_file, encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def save_index(self, index: Dict[str, List[str]]):
+        # Called with the archive locked (see replace_partition and remove_month)
+        temp_file = f'{self.index_file}.tmp'
+        with open(temp_file, 'w', encoding='utf-8') as f:
+            json.dump(index, f)
+        os.replace(temp_file, self.index_file)
+
+    @staticmethod
+    def encode(month: str, records: pd.DataFrame) -> Dict[str, np.ndarray]:
+        """
+        Partition columns of a month's records (CSV-style string columns).
+        """
+        names = records['Name'].fillna('').astype(str).to_numpy()
+        unique_names, name_ids = np.unique(names, return_inverse=True)
+        dates = records['Date'].fillna('').astype(str).to_numpy(dtype=object)
+        days = np.array([int(d.split('/')[0]) for d in dates], dtype=np.int8)
+        columns = {
+            'names': unique_names.astype(str),
+            'name_id': name_ids.astype(np.int32),
+            'day': days,
+            'total': parse_seconds(records['Total Hours'])
+        }
+        year, month_number = month.split('-')
+        restored = {'Date': np.array([f'{d:02d}/{month_number}/{year}' for d in days.tolist()], dtype=object),
+                    'Total Hours': format_duration(columns['total'])}
+        for i in range(1, TIME_SLOTS + 1):
+            columns[f'in_{i}'] = parse_seconds(records[f'In Time {i}'])
+            columns[f'out_{i}'] = parse_seconds(records[f'Out Time {i}'])
+            columns[f'session_{i}'] = parse_seconds(records[f'Session {i} Duration'])
+            restored[f'In Time {i}'] = np.array(format_clock(columns[f'in_{i}']), dtype=object)
+            restored[f'Out Time {i}'] = np.array(format_clock(columns[f'out_{i}']), dtype=object)
+            restored[f'Session {i} Duration'] = format_duration(columns[f'session_{i}'])
+
+        # Original text of every value the typed columns don't give back exactly
+        raw_rows, raw_columns, raw_values = [], [], []
+        for column, values in restored.items():
+            original = dates if column == 'Date' else records[column].fillna('').astype(str).to_numpy(dtype=object)
+            for row in np.flatnonzero(original != values).tolist():
+                raw_rows.append(row)
+                raw_columns.append(column)
+                raw_values.append(original[row])
+        columns['raw_row'] = np.array(raw_rows, dtype=np.int32)
+        columns['raw_column'] = np.array(raw_columns, dtype=str)
+        columns['raw_value'] = np.array(raw_values, dtype=str)
+        return columns
+
+    def write_month(self, month: str, records: pd.DataFrame):
+        """
+        Replace a month's partition with the given records (CSV-style string columns).
+
+        Args:
+            month (str): Partition key 'YYYY-MM'
+            records (pd.DataFrame): Every record of that month
+        """
+        columns = self.encode(month, records)
+        with self.lock, file_lock(self.lock_file):
+            self.replace_partition(month, columns)
+
+    def write_day(self, date: str, records: pd.DataFrame) -> bool:
+        """
+        Replace the records of one day in its month's partition, leaving the other days as they are.
+
+        Args:
+            date (str): Day to replace, 'dd/mm/yyyy'
+            records (pd.DataFrame): Every record of that day
+
+        Returns:
+            bool: False if the month is not archived (nothing is written)
+        """
+        month = month_of(date)
+        day_columns = self.encode(month, records)
+        with self.lock, file_lock(self.lock_file):
+            columns = self.load_month(month)
+            if columns is None:
+                return False
+            keep = columns['day'] != int(date.split('/')[0])
+            names = np.concatenate([columns['names'][columns['name_id'][keep]],
+                                    day_columns['names'][day_columns['name_id']]])
+            unique_names, name_ids = np.unique(names, return_inverse=True)
+            merged = {'names': unique_names.astype(str), 'name_id': name_ids.astype(np.int32)}
+            for key, values in day_columns.items():
+                if key not in merged and not key.startswith('raw_'):
+                    merged[key] = np.concatenate([columns[key][keep], values])
+
+            # Kept rows move up past the dropped ones; the day's rows follow them
+            raw_rows = columns.get('raw_row', np.empty(0, dtype=np.int32))
+            kept_raw = keep[raw_rows]
+            positions = np.cumsum(keep) - 1
+            merged['raw_row'] = np.concatenate([positions[raw_rows[kept_raw]],
+                                                day_columns['raw_row'] + int(keep.sum())]).astype(np.int32)
+            for key in ('raw_column', 'raw_value'):
+                old = columns.get(key, np.empty(0, dtype=str))
+                merged[key] = np.concatenate([old[kept_raw], day_columns[key]]).astype(str)
+            self.replace_partition(month, merged)
+        return True
+
+    def replace_partition(self, month: str, columns: Dict[str, np.ndarray]):
+        # Called with the archive locked (see write_month and write_day)
+        # Unique temp file per writer; np.savez appends .npz to names without it, so keep the suffix
+        fd, temp_file = tempfile.mkstemp(dir=self.directory, prefix=f'.{month}.', suffix='.npz')
+        os.close(fd)
+        try:
+            np.savez(temp_file, **columns)
+        except BaseException:
+            os.remove(temp_file)
+            raise
+        os.replace(temp_file, self.partition_file(month))
+        self.cache.pop(month, None)
+
+        index = self.load_index()
+        for name in list(index):
+            index[name] = [m for m in index[name] if m != month]
+            if not index[name]:
+                del index[name]
+        for name in columns['names'].tolist():
+            index[name] = sorted(index.get(name, []) + [month])
+        self.save_index(index)
+
+    def remove_month(self, month: str):
+        """
+        Drop a partition, so the month is re-archived from the store later.
+        """
+        with self.lock, file_lock(self.lock_file):
+            if os.path.exists(self.partition_file(month)):
+                os.remove(self.partition_file(month))
+            self.cache.pop(month, None)
+            index = {n: [m for m in months if m != month] for n, months in self.load_index().items()}
+            self.save_index({n: months for n, months in index.items() if months})
+
+    def load_month(self, month: str) -> Optional[Dict[str, np.ndarray]]:
+        """
+        Columns of a partition, read once and cached until the file changes.
+        """
+        path = self.partition_file(month)
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            return None
+        cached = self.cache.get(month)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+        with np.load(path, allow_pickle=False) as data:
+            columns = {key: data[key] for key in data.files}
+        self.cache[month] = (mtime, columns)
+        return columns
+
+    def to_frame(self, month: str, columns: Dict[str, np.ndarray], mask: np.ndarray, typed: bool) -> pd.DataFrame:
+        """
+        Selected rows of a partition, as typed columns or in the CSV string format.
+        """
+        def as_text(values):
+            # Missing values as None, like the SQLite store returns them
+            return [v or None for v in values]
+
+        year, month_number = month.split('-')
+        days = columns['day'][mask]
+        frame = {
+            'Name': columns['names'][columns['name_id'][mask]],
+            'Date': [f'{d:02d}/{month_number}/{year}' for d in days.tolist()]
+        }
+        for i in range(1, TIME_SLOTS + 1):
+            for prefix, key in (('In Time', 'in'), ('Out Time', 'out')):
+                values = columns[f'{key}_{i}'][mask]
+                frame[f'{prefix} {i}'] = values if typed else as_text(format_clock(values))
+        for i in range(1, TIME_SLOTS + 1):
+            values = columns[f'session_{i}'][mask]
+            frame[f'Session {i} Duration'] = values if typed else as_text(format_duration(values))
+        frame['Total Hours'] = columns['total'][mask] if typed else as_text(format_duration(columns['total'][mask]))
+
+        raw_rows = columns.get('raw_row')
+        if not typed and raw_rows is not None and len(raw_rows):
+            # Put back the original text of values the typed columns don't reproduce
+            positions = np.cumsum(mask) - 1
+            selected = mask[raw_rows]
+            for row, column, value in zip(raw_rows[selected].tolist(), columns['raw_column'][selected].tolist(),
+                                          columns['raw_value'][selected].tolist()):
+                frame[column][positions[row]] = value
+        return pd.DataFrame(frame)
+
+    def daily(self, date: str, typed: bool = False) -> Optional[pd.DataFrame]:
+        """
+        Records of one 'dd/mm/yyyy' date, or None if its month is not archived.
+
+        Args:
+            date (str): Date to query
+            typed (bool): Return times and durations as int seconds instead of strings
+        """
+        month = month_of(date)
+        columns = self.load_month(month)
+        if columns is None:
+            return None
+        mask = columns['day'] == int(date.split('/')[0])
+        return self.to_frame(month, columns, mask, typed)
+
+    def student(self, name: str, typed: bool = False) -> pd.DataFrame:
+        """
+        Archived records of one student, reading only the months they appear in.
+        """
+        frames = []
+        for month in self.load_index().get(name, []):
+            columns = self.load_month(month)
+            if columns is None:
+                continue
+            position = np.searchsorted(columns['names'], name)
+            if position == len(columns['names']) or columns['names'][position] != name:
+                continue
+            frames.append(self.to_frame(month, columns, columns['name_id'] == position, typed))
+        if not frames:
+            return pd.DataFrame(columns=COLUMNS)
+        return pd.concat(frames, ignore_index=True)
@@ -0,0 +1,235 @@
+import os
+import sqlite3
+import threading
+import pandas as pd
+from typing import Callable, Dict, List, Optional
+
+# 'mm/yyyy' of a dd/mm/yyyy date, and the date rearranged to yyyymmdd so it sorts;
+# both are indexed, and queries must use these exact expressions to hit the indexes
+MONTH_SQL = 'substr("Date", 4)'
+SORTABLE_DATE_SQL = 'substr("Date", 7, 4) || substr("Date", 4, 2) || substr("Date", 1, 2)'
+
+
+class SQLiteAttendanceStore:
+    def __init__(self, db_file: str, columns: List[str]):
+        """
+        Indexed attendance storage backed by SQLite
+
+        One row per attendance record, with the same columns as Attendance.csv.
+        Lookups by (Name, Date) go through an index, so marking attendance no
+        longer reads or rewrites the whole history.
+
+        Args:
+            db_file (str): SQLite database file
+            columns (list): Record columns, in CSV order
+        """
+        self.db_file = db_file
+        self.columns = list(columns)
+        self.lock = threading.Lock()
+
+        directory = os.path.dirname(self.db_file)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+
+        # Shared between the recognition loop, Flask threads and writer threads
+        self.conn = sqlite3.connect(self.db_file, check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.create_schema()
+
+    @staticmethod
+    def quote(column: str) -> str:
+        return '"' + column.replace('"', '""') + '"'
+
+    def create_schema(self):
+        """
+        Create the attendance table and its indexes if they don't exist.
+        """
+        column_defs = ', '.join(f'{self.quote(c)} TEXT' for c in self.columns)
+        with self.lock, self.conn:
+            self.conn.execute(f'CREATE TABLE IF NOT EXISTS attendance (id INTEGER PRIMARY KEY, {column_defs})')
+            self.conn.execute('CREATE INDEX IF NOT EXISTS idx_attendance_name_date ON attendance ("Name", "Date")')
+            self.conn.execute('CREATE INDEX IF NOT EXISTS idx_attendance_date ON attendance ("Date")')
+            # Dates are dd/mm/yyyy text: index the month ('mm/yyyy') and the sortable yyyymmdd form,
+            # so month and date-range queries don't scan the table
+            self.conn.execute(f'CREATE INDEX IF NOT EXISTS idx_attendance_month ON attendance ({MONTH_SQL})')
+            self.conn.execute(f'CREATE INDEX IF NOT EXISTS idx_attendance_day ON attendance ({SORTABLE_DATE_SQL})')
+
+    def data_version(self) -> int:
+        """
+        Changes whenever another connection commits to the database (own writes don't change it).
+        """
+        with self.lock:
+            return self.conn.execute('PRAGMA data_version').fetchone()[0]
+
+    def count(self) -> int:
+        with self.lock:
+            return self.conn.execute('SELECT COUNT(*) FROM attendance').fetchone()[0]
+
+    def records_with_ids(self, date: str) -> List[Dict]:
+        """
+        Records for a date as dicts with an 'id' key, oldest first.
+        """
+        with self.lock:
+            return self.fetch_with_ids(date)
+
+    def fetch_with_ids(self, date: str) -> List[Dict]:
+        # Caller holds self.lock
+        select = ', '.join(['id'] + [self.quote(c) for c in self.columns])
+        rows = self.conn.execute(
+            f'SELECT {select} FROM attendance WHERE "Date" = ? ORDER BY id', (date,)
+        ).fetchall()
+        return [dict(zip(['id'] + self.columns, row)) for row in rows]
+
+    def save_records(self, records: List[Dict]):
+        """
+        Insert records without an 'id' and update the others, in one transaction.
+        New ids are written back into the record dicts.
+        """
+        with self.lock, self.conn:
+            self.write_records(records)
+
+    def write_records(self, records: List[Dict]):
+        # Caller holds self.lock and commits
+        names = ', '.join(self.quote(c) for c in self.columns)
+        placeholders = ', '.join('?' for _ in self.columns)
+        assignments = ', '.join(f'{self.quote(c)} = ?' for c in self.columns)
+        for record in records:
+            values = [record.get(c) or None for c in self.columns]
+            if record.get('id') is None:
+                cursor = self.conn.execute(f'INSERT INTO attendance ({names}) VALUES ({placeholders})', values)
+                record['id'] = cursor.lastrowid
+            else:
+                self.conn.execute(f'UPDATE attendance SET {assignments} WHERE id = ?', values + [record['id']])
+
+    def update_day(self, date: str, update: Callable[[List[Dict]], List[Dict]]) -> List[Dict]:
+        """
+        Read a date's records and write back the ones update() returns, as one
+        transaction that also excludes writers in other processes. update()
+        therefore always sees the latest records, never a stale copy.
+
+        Args:
+            date (str): Date of the records, 'dd/mm/yyyy'
+            update (callable): Takes the date's records (dicts with 'id'),
+                returns the records to insert or update
+
+        Returns:
+            list: The written records, with their ids
+        """
+        with self.lock:
+            # Take the write lock before reading, so no other connection commits in between
+            self.conn.execute('BEGIN IMMEDIATE')
+            try:
+                records = update(self.fetch_with_ids(date))
+                self.write_records(records)
+                self.conn.commit()
+            except BaseException:
+                self.conn.rollback()
+                raise
+        return records
+
+    def query(self, where: str = '', params: tuple = (), with_ids: bool = False) -> pd.DataFrame:
+        """
+        Records matching a WHERE clause as a string DataFrame in CSV column order
+        (preceded by an 'id' column if with_ids).
+        """
+        columns = (['id'] if with_ids else []) + self.columns
+        select = ', '.join(c if c == 'id' else self.quote(c) for c in columns)
+        sql = f'SELECT {select} FROM attendance {where} ORDER BY id'
+        with self.lock:
+            rows = self.conn.execute(sql, params).fetchall()
+        return pd.DataFrame(rows, columns=columns, dtype=object)
+
+    def records_for_date(self, date: str) -> pd.DataFrame:
+        return self.query('WHERE "Date" = ?', (date,))
+
+    def records_for_name(self, name: str, exclude_months: Optional[List[str]] = None) -> pd.DataFrame:
+        """
+        Records of a student, optionally skipping some 'YYYY-MM' months (e.g. archived ones).
+        """
+        if not exclude_months:
+            return self.query('WHERE "Name" = ?', (name,))
+        excluded = [f"{m.split('-')[1]}/{m.split('-')[0]}" for m in exclude_months]
+        placeholders = ', '.join('?' for _ in excluded)
+        return self.query(f'WHERE "Name" = ? AND {MONTH_SQL} NOT IN ({placeholders})', (name, *excluded))
+
+    def records_for_month(self, month: str) -> pd.DataFrame:
+        """
+        Records of a 'YYYY-MM' month (dates are stored as dd/mm/yyyy).
+        """
+        year, month_number = month.split('-')
+        return self.query(f'WHERE {MONTH_SQL} = ?', (f'{month_number}/{year}',))
+
+    def months(self) -> List[str]:
+        """
+        Months with at least one record, as 'YYYY-MM', oldest first.
+        """
+        with self.lock:
+            rows = self.conn.execute(f'SELECT DISTINCT {MONTH_SQL} FROM attendance WHERE "Date" IS NOT NULL').fetchall()
+        months = set()
+        for (month_year,) in rows:
+            parts = month_year.split('/')
+            if len(parts) == 2 and all(p.isdigit() for p in parts):
+                months.add(f'{int(parts[1]):04d}-{int(parts[0]):02d}')
+        return sorted(months)
+
+    def records_between(self, start_date: Optional[str] = None, end_date: Optional[str] = None,
+                        with_ids: bool = False) -> pd.DataFrame:
+        """
+        Records dated from start_date to end_date inclusive ('dd/mm/yyyy', either may be None).
+        """
+        conditions, params = [], []
+        for date, operator in ((start_date, '>='), (end_date, '<=')):
+            if date:
+                day, month, year = date.split('/')
+                conditions.append(f'{SORTABLE_DATE_SQL} {operator} ?')
+                params.append(f'{int(year):04d}{int(month):02d}{int(day):02d}')
+        where = 'WHERE ' + ' AND '.join(conditions) if conditions else ''
+        return self.query(where, tuple(params), with_ids)
+
+    def update_columns(self, ids: List[int], values: Dict[str, List]):
+        """
+        Set some columns of many records in one transaction.
+
+        Args:
+            ids (list): Record ids
+            values (dict): Column name -> new value of every record, in ids order
+        """
+        columns = list(values)
+        assignments = ', '.join(f'{self.quote(c)} = ?' for c in columns)
+        rows = zip(*[[v or None for v in values[c]] for c in columns], ids)
+        with self.lock, self.conn:
+            self.conn.executemany(f'UPDATE attendance SET {assignments} WHERE id = ?', rows)
+
+    def import_csv(self, csv_file: str) -> int:
+        """
+        Append every record of an attendance CSV file.
+
+        Returns:
+            int: Number of imported records
+        """
+        try:
+            df = pd.read_csv(csv_file, dtype=str)
+        except (FileNotFoundError, pd.errors.EmptyDataError):
+            return 0
+
+        df = df.reindex(columns=self.columns)
+        rows = [[None if pd.isna(v) or v == '' else v for v in row] for row in df.itertuples(index=False)]
+        placeholders = ', '.join('?' for _ in self.columns)
+        names = ', '.join(self.quote(c) for c in self.columns)
+        with self.lock, self.conn:
+            self.conn.executemany(f'INSERT INTO attendance ({names}) VALUES ({placeholders})', rows)
+        return len(rows)
+
+    def export_csv(self, csv_file: str):
+        """
+        Write every record to a CSV file (replaced atomically).
+        """
+        df = self.query()
+        temp_file = f'{csv_file}.tmp'
+        df.to_csv(temp_file, index=False)
+        os.replace(temp_file, csv_file)
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
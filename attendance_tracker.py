@@ -1,9 +1,41 @@
 import pandas as pd
 import os
+import atexit
+import threading
+import time
+import weakref
 from datetime import datetime, timedelta
 
+import numpy as np
+from attendance_archive import AttendanceArchive, TIME_SLOTS, format_duration, month_of
+from attendance_store import SQLiteAttendanceStore
+
+# Trackers whose marks haven't been exported to CSV yet; closed at interpreter exit
+_open_trackers = weakref.WeakSet()
+
+# Clock times calculate_duration accepts ('%H:%M:%S' or '%H:%M')
+CLOCK_PATTERN = r'^(\d{1,2}):(\d{1,2})(?::(\d{1,2}))?$'
+
+@atexit.register
+def _close_open_trackers():
+    for tracker in list(_open_trackers):
+        tracker.close()
+
 class AttendanceTracker:
-    def __init__(self, csv_file='Attendance.csv'):
+    def __init__(self, csv_file='Attendance.csv', db_file=None, flush_interval=5.0, flush_every=20,
+                 archive_dir=None, use_archive=True, duplicate_window=30, export_interval=60.0):
+        """
+        Args:
+            csv_file (str): CSV view of the attendance records
+            db_file (str): SQLite store (defaults to the CSV name with .db)
+            flush_interval (float): Seconds between background flushes of pending marks
+            flush_every (int): Flush as soon as this many students have pending marks
+            archive_dir (str): Columnar archive of closed months (defaults to the CSV name with _archive)
+            use_archive (bool): Answer queries for closed months from the archive
+            duplicate_window (float): Seconds within which a mark repeats one already recorded
+            export_interval (float): Most frequent refresh of the CSV view by the background
+                flush thread (None to export only on close)
+        """
         # List of required columns defined as a class attribute
         self.REQUIRED_COLUMNS = [
             'Name', 
@@ -20,8 +52,40 @@ class AttendanceTracker:
             'Total Hours'
         ]
         
+        # In/Out slots in the order they are filled
+        self.SLOT_COLUMNS = [f'{kind} Time {i}' for i in range(1, 4) for kind in ('In', 'Out')]
+        self.duplicate_window = duplicate_window
+
         self.csv_file = csv_file
+        # Records live in an indexed SQLite store; the CSV is an exported view of it
+        self.db_file = db_file or os.path.splitext(csv_file)[0] + '.db'
         self.create_csv_if_not_exists()
+        self.store = self.open_store()
+        self.dirty = False
+
+        # Closed months are copied to a month-partitioned columnar archive for queries
+        self.archive = None
+        if use_archive:
+            self.archive = AttendanceArchive(archive_dir or os.path.splitext(csv_file)[0] + '_archive')
+            self.archive_closed_months()
+
+        # Today's records held in memory (name -> record), flushed to the store in batches
+        self.flush_interval = flush_interval
+        self.flush_every = flush_every
+        self.export_interval = export_interval
+        self.last_export = time.monotonic()
+        self.lock = threading.RLock()
+        self.today = None
+        self.today_records = {}
+        # Marks not written yet (name -> times); replayed onto the stored records by flush()
+        self.pending_marks = {}
+        # Store version today_records was read at; other processes' writes change it
+        self.seen_version = None
+        self.flush_thread = None
+        self.stop_event = threading.Event()
+        # Called with (date, names) after marks are written, e.g. to invalidate read caches
+        self.write_listeners = []
+        _open_trackers.add(self)
 
     def create_csv_if_not_exists(self):
         """
@@ -40,95 +104,296 @@ class AttendanceTracker:
             df.to_csv(self.csv_file, index=False)
             print(f"CSV file created with columns: {self.REQUIRED_COLUMNS}")
         else:
-            # Check if the file is empty or has the wrong structure
+            # Check if the file is empty or has the wrong structure (header only)
             try:
-                df = pd.read_csv(self.csv_file)
+                df = pd.read_csv(self.csv_file, nrows=0)
                 print(f"CSV file exists with columns: {list(df.columns)}")
             except pd.errors.EmptyDataError:
                 print(f"CSV file exists but is empty. Recreating with proper structure.")
                 df = pd.DataFrame(columns=self.REQUIRED_COLUMNS)
                 df.to_csv(self.csv_file, index=False)
 
-    def mark_attendance(self, name):
+    def open_store(self):
+        """
+        Open the SQLite store, importing the CSV history the first time.
+        """
+        store = SQLiteAttendanceStore(self.db_file, self.REQUIRED_COLUMNS)
+        if store.count() == 0:
+            imported = store.import_csv(self.csv_file)
+            if imported:
+                print(f"Imported {imported} records from {self.csv_file} into {self.db_file}")
+        return store
+
+    def archive_closed_months(self):
+        """
+        Archive every month before the current one that isn't archived yet.
+        """
+        if self.archive is None:
+            return
+        current_month = datetime.now().strftime('%Y-%m')
+        for month in self.store.months():
+            if month >= current_month or self.archive.has_month(month):
+                continue
+            try:
+                records = self.store.records_for_month(month)
+                self.archive.write_month(month, records)
+                print(f"Archived {len(records)} attendance records of {month}")
+            except Exception as e:
+                print(f"Error archiving attendance for {month}: {e}")
+
+    def add_write_listener(self, callback):
+        """
+        Register callback(date, names), called after marks for that date are written to the store.
+        """
+        self.write_listeners.append(callback)
+
+    def mark_attendance(self, name, when=None):
         """
         Mark attendance with multiple time entries tracking.
         Preserves existing records and adds new entries.
-        """
-        # First, ensure the CSV file exists with headers
-        self.create_csv_if_not_exists()
-    
-        # Read existing CSV file
-        try:
-            # Use dtype=str to ensure all columns are read as strings
-            df = pd.read_csv(self.csv_file, dtype=str)  
-        except pd.errors.EmptyDataError:
-            print("CSV file exists but is empty. Creating proper structure.")
-            # Create a fresh DataFrame with the required columns
-            df = pd.DataFrame(columns=self.REQUIRED_COLUMNS)
-            df.to_csv(self.csv_file, index=False)
-        except Exception as e:
-            print(f"Error reading CSV: {e}")
-            # Recreate the CSV with proper structure
-            df = pd.DataFrame(columns=self.REQUIRED_COLUMNS)
-            df.to_csv(self.csv_file, index=False)
+        The mark is applied to today's in-memory records and written
+        to the store by the next flush.
 
+        Args:
+            name (str): Student name
+            when (datetime): Time of the sighting (defaults to now; recorded
+                footage passes its own timestamps)
+        """
         # Get current date and time
-        now = datetime.now()
+        now = when or datetime.now()
         today = now.strftime('%d/%m/%Y')
         current_time = now.strftime('%H:%M:%S')
 
-        # Check if student exists for today
-        today_records = df[(df['Name'] == name) & (df['Date'] == today)]
+        with self.lock:
+            self.load_today(today)
+            self.sync_today()
+
+            if not self.apply_mark(self.today_records, name, today, current_time):
+                # All time slots for today are already used
+                return
+
+            self.pending_marks.setdefault(name, []).append(current_time)
+            if len(self.pending_marks) >= self.flush_every:
+                self.flush()
+
+        self.start_flush_thread()
 
-        if today_records.empty:
+    def apply_mark(self, records, name, date, current_time, verbose=True):
+        """
+        Apply one mark to the record of name in records (name -> record), creating it if needed.
+
+        Returns:
+            bool: True if the record changed
+        """
+        record = records.get(name)
+        if record is None:
             # First entry for the day - add a new record
             new_record = {col: '' for col in self.REQUIRED_COLUMNS}
             new_record['Name'] = name
-            new_record['Date'] = today
+            new_record['Date'] = date
             new_record['In Time 1'] = current_time
-            
-            # Append the new record to existing dataframe
-            df = pd.concat([df, pd.DataFrame([new_record])], ignore_index=True)
-            print(f"First attendance entry for {name} at {current_time}")
-        else:
-            # Student already has an entry for today
-            last_record_index = today_records.index[-1]
-
-            # Check which time slot to fill
-            time_slots = [
-                ('In Time 1', 'Out Time 1'),
-                ('In Time 2', 'Out Time 2'),
-                ('In Time 3', 'Out Time 3')
-            ]
-
-            for in_slot, out_slot in time_slots:
-                # If the in-time slot is empty
-                if (pd.isna(df.loc[last_record_index, in_slot]) or 
-                    df.loc[last_record_index, in_slot] == ''):
-                    # Mark the in-time
-                    df.loc[last_record_index, in_slot] = current_time
+            new_record['id'] = None
+
+            records[name] = new_record
+            if verbose:
+                print(f"First attendance entry for {name} at {current_time}")
+            return True
+        return bool(self.insert_mark(record, current_time, verbose))
+
+    @staticmethod
+    def clock_seconds(value):
+        """
+        Seconds since midnight of an 'HH:MM:SS' or 'HH:MM' time (None if empty or invalid).
+        """
+        if pd.isna(value) or not str(value).strip():
+            return None
+        for time_format in ('%H:%M:%S', '%H:%M'):
+            try:
+                parsed = datetime.strptime(str(value).strip(), time_format)
+                return parsed.hour * 3600 + parsed.minute * 60 + parsed.second
+            except ValueError:
+                continue
+        return None
+
+    def insert_mark(self, record, current_time, verbose=True):
+        """
+        Add a mark to a record, keeping its In/Out slots in time order.
+
+        A mark within duplicate_window seconds of a recorded one is ignored,
+        so processing the same footage twice changes nothing. A mark later
+        than every recorded time fills the next slot as before; an earlier
+        one (backdated footage arriving after live marks) is merged in and
+        the slots are re-paired in time order.
+
+        Returns:
+            dict: Changed columns (empty if the mark was ignored or all slots are used)
+        """
+        name = record['Name']
+        filled = [record[c] for c in self.SLOT_COLUMNS if not (pd.isna(record[c]) or record[c] == '')]
+        recorded = [self.clock_seconds(t) for t in filled]
+        seconds = self.clock_seconds(current_time)
+
+        if any(s is not None and abs(s - seconds) <= self.duplicate_window for s in recorded):
+            if verbose:
+                print(f"{name} is already marked at {current_time}")
+            return {}
+        if len(filled) == len(self.SLOT_COLUMNS):
+            return {}
+        if not recorded or recorded[-1] is None or seconds >= recorded[-1]:
+            return self.next_slot_update(record, current_time, verbose)
+
+        # Earlier than the last recorded mark: merge and re-pair every slot in time order
+        times = sorted(filled + [current_time], key=lambda t: self.clock_seconds(t) or 0)
+        updates = {column: '' for column in self.SLOT_COLUMNS}
+        updates.update(zip(self.SLOT_COLUMNS, times))
+        record.update(updates)
+        updates.update(self.calculate_record_hours(record))
+        record.update(updates)
+        if verbose:
+            print(f"Inserted earlier mark for {name} at {current_time}")
+        return updates
+
+    def load_today(self, today):
+        """
+        Load today's records into memory once per day, flushing the previous day first.
+        """
+        if self.today == today:
+            return
+
+        self.flush()
+        if self.today is not None and month_of(self.today) != month_of(today):
+            # A month was closed while running
+            self.archive_closed_months()
+        self.today = today
+        self.reload_today()
+
+    def reload_today(self):
+        """
+        Read today's records from the store and re-apply the marks not written yet.
+        """
+        self.seen_version = self.store.data_version()
+        self.today_records = {}
+        # Later records for the same student replace earlier ones
+        for record in self.store.records_with_ids(self.today):
+            self.today_records[record['Name']] = record
+        for name, times in self.pending_marks.items():
+            for current_time in times:
+                self.apply_mark(self.today_records, name, self.today, current_time, verbose=False)
+
+    def sync_today(self):
+        """
+        Reload today's records if another process (e.g. the live recognition
+        script next to the API) wrote to the store since they were read.
+        """
+        if self.store.data_version() != self.seen_version:
+            self.reload_today()
+
+    def flush(self):
+        """
+        Write pending marks to the store in one transaction.
+
+        The marks are replayed onto the records as stored at that moment
+        (inside the transaction), so marks written by other processes since
+        today's records were read are kept rather than overwritten.
+        """
+        with self.lock:
+            if not self.pending_marks or self.store is None:
+                return
+            pending = self.pending_marks
+
+            def update(stored):
+                records = {}
+                for record in stored:
+                    if record['Name'] in pending:
+                        records[record['Name']] = record
+                for name, times in pending.items():
+                    for current_time in times:
+                        self.apply_mark(records, name, self.today, current_time, verbose=False)
+                return list(records.values())
+
+            try:
+                written = self.store.update_day(self.today, update)
+            except Exception as e:
+                print(f"Error saving attendance: {e}")
+                return
+            names = list(pending)
+            self.pending_marks = {}
+            for record in written:
+                self.today_records[record['Name']] = record
+            self.dirty = True
+
+            # Marks for an archived month (e.g. backdated video footage): rewrite that day of its partition
+            if self.archive is not None and self.archive.has_month(month_of(self.today)):
+                self.archive.write_day(self.today, self.store.records_for_date(self.today))
+
+            for callback in self.write_listeners:
+                try:
+                    callback(self.today, names)
+                except Exception as e:
+                    print(f"Error in attendance write listener: {e}")
+
+    def start_flush_thread(self):
+        """
+        Start the background flush timer on the first mark.
+        """
+        if self.flush_thread is not None:
+            return
+        self.flush_thread = threading.Thread(target=self.flush_loop, name='attendance-flush', daemon=True)
+        self.flush_thread.start()
+
+    def flush_loop(self):
+        while not self.stop_event.wait(self.flush_interval):
+            self.flush()
+            # Keep the CSV view reasonably fresh for long-running processes (e.g. the API)
+            if (self.dirty and self.export_interval is not None
+                    and time.monotonic() - self.last_export >= self.export_interval):
+                self.export_csv()
+
+    def next_slot_update(self, record, current_time, verbose=True):
+        """
+        Fill the next empty time slot of a record.
+
+        Args:
+            record (dict): Today's record for a student
+            current_time (str): Time to mark, 'HH:MM:SS'
+            verbose (bool): Print the marked slot
+
+        Returns:
+            dict: Changed columns (empty if all slots are already used)
+        """
+        name = record['Name']
+
+        # Check which time slot to fill
+        time_slots = [
+            ('In Time 1', 'Out Time 1'),
+            ('In Time 2', 'Out Time 2'),
+            ('In Time 3', 'Out Time 3')
+        ]
+
+        for in_slot, out_slot in time_slots:
+            # If the in-time slot is empty
+            if pd.isna(record[in_slot]) or record[in_slot] == '':
+                # Mark the in-time
+                record[in_slot] = current_time
+                if verbose:
                     print(f"Marked {in_slot} for {name} at {current_time}")
-                    break
+                return {in_slot: current_time}
+            
+            # If in-time is set but out-time is empty, mark out-time
+            elif pd.isna(record[out_slot]) or record[out_slot] == '':
+                # Mark out-time
+                record[out_slot] = current_time
+                updates = {out_slot: current_time}
                 
-                # If in-time is set but out-time is empty, mark out-time
-                elif (pd.notna(df.loc[last_record_index, in_slot]) and 
-                      (pd.isna(df.loc[last_record_index, out_slot]) or 
-                       df.loc[last_record_index, out_slot] == '')):
-                    # Mark out-time
-                    df.loc[last_record_index, out_slot] = current_time
-                    
-                    # Recalculate total hours for this record
-                    df = self.calculate_total_hours(df, last_record_index)
-                    
+                # Recalculate total hours for this record
+                updates.update(self.calculate_record_hours(record))
+                record.update(updates)
+                
+                if verbose:
                     print(f"Marked {out_slot} for {name} at {current_time}")
-                    break
+                return updates
 
-        # Save changes to CSV
-        try:
-            # Use mode='a' with header=False to append without overwriting
-            df.to_csv(self.csv_file, index=False)
-        except Exception as e:
-            print(f"Error saving CSV: {e}")
+        return {}
 
     def calculate_duration(self, in_time, out_time):
         """
@@ -167,33 +432,165 @@ class AttendanceTracker:
             print(f"Unexpected error calculating duration: {e}")
             return timedelta()
 
-    def calculate_total_hours(self, df, index):
+    def calculate_record_hours(self, record):
         """
-        Calculate total hours spent in class for a specific record.
+        Calculate session durations and total hours for a single record.
+
+        Returns:
+            dict: 'Session i Duration' and 'Total Hours' values
         """
-        # Calculate individual session durations
-        session_durations = []
+        hours = {}
         total_duration = timedelta()
 
         for i in range(1, 4):
-            in_time = df.loc[index, f'In Time {i}']
-            out_time = df.loc[index, f'Out Time {i}']
+            in_time = record[f'In Time {i}']
+            out_time = record[f'Out Time {i}']
             
             # Calculate session duration
             session_duration = self.calculate_duration(in_time, out_time)
             
             # Store session duration
-            df.loc[index, f'Session {i} Duration'] = str(session_duration)
+            hours[f'Session {i} Duration'] = str(session_duration)
             
             # Add to total duration if session is complete
             if in_time and out_time:
                 total_duration += session_duration
         
         # Store total hours
-        df.loc[index, 'Total Hours'] = str(total_duration)
+        hours['Total Hours'] = str(total_duration)
+        
+        return hours
+
+    def calculate_total_hours(self, df, index):
+        """
+        Calculate total hours spent in class for a specific record.
+        """
+        hours = self.calculate_record_hours(df.loc[index].to_dict())
+        for column, value in hours.items():
+            df.loc[index, column] = value
         
         return df
 
+    @staticmethod
+    def parse_clock_column(values):
+        """
+        Parse a column of clock times like calculate_duration does, vectorized.
+
+        Zero-padded 'HH:MM:SS' and 'HH:MM' values are decoded straight from
+        their characters as a fixed-width array; anything else goes through
+        the CLOCK_PATTERN regular expression.
+
+        Returns:
+            tuple: int seconds since midnight (-1 if empty or invalid) and
+                whether each value had a seconds field
+        """
+        # Nine characters, so values longer than 'HH:MM:SS' are told apart from it
+        text = np.asarray(values, dtype=object).astype('U9')
+        codes = text.view(np.uint32).reshape(-1, 9)
+        # Unsigned, so characters below '0' wrap around and fail the digit test too
+        digits = codes - np.uint32(ord('0'))
+        is_digit = digits <= 9
+        colon = ord(':')
+        hh_mm = is_digit[:, 0] & is_digit[:, 1] & (codes[:, 2] == colon) & is_digit[:, 3] & is_digit[:, 4]
+        short_form = hh_mm & (codes[:, 5] == 0)
+        long_form = (hh_mm & (codes[:, 5] == colon) & is_digit[:, 6] & is_digit[:, 7] & (codes[:, 8] == 0))
+        # Missing values (None, NaN, pd.NA) come out of astype as their repr
+        empty = (codes[:, 0] == 0) | (text == 'None') | (text == 'nan') | (text == '<NA>')
+
+        digits = digits.astype(np.int64)
+        hours = digits[:, 0] * 10 + digits[:, 1]
+        minutes = digits[:, 3] * 10 + digits[:, 4]
+        secs = np.where(long_form, digits[:, 6] * 10 + digits[:, 7], 0)
+        has_seconds = long_form.copy()
+
+        other = np.flatnonzero(~(short_form | long_form | empty))
+        if len(other):
+            original = pd.Series(np.asarray(values, dtype=object)[other], dtype=object).astype(str)
+            parts = original.str.strip().str.extract(CLOCK_PATTERN).astype(float)
+            matched = parts[0].notna().to_numpy()
+            hours[other] = parts[0].fillna(99).to_numpy()
+            minutes[other] = parts[1].fillna(99).to_numpy()
+            secs[other] = parts[2].fillna(0).to_numpy()
+            has_seconds[other] = parts[2].notna().to_numpy()
+            short_form[other] = matched
+
+        valid = (short_form | long_form) & (hours <= 23) & (minutes <= 59) & (secs <= 59)
+        seconds = np.where(valid, hours * 3600 + minutes * 60 + secs, -1)
+        return seconds, has_seconds
+
+    def calculate_hours_bulk(self, records):
+        """
+        Session durations and total hours of many records at once.
+        Same results as calculate_record_hours, computed column-wise
+        (an Out Time before the In Time wraps past midnight).
+
+        Args:
+            records (pd.DataFrame): Records with In/Out Time columns
+
+        Returns:
+            pd.DataFrame: 'Session i Duration' and 'Total Hours' columns, same index
+        """
+        hours = {}
+        total = np.zeros(len(records), dtype=np.int64)
+
+        for i in range(1, TIME_SLOTS + 1):
+            in_seconds, in_has_seconds = self.parse_clock_column(records[f'In Time {i}'])
+            out_seconds, out_has_seconds = self.parse_clock_column(records[f'Out Time {i}'])
+
+            # Both times must parse with the same format, otherwise the session counts as zero
+            valid = (in_seconds >= 0) & (out_seconds >= 0) & (in_has_seconds == out_has_seconds)
+            session = np.where(valid, (out_seconds - in_seconds) % 86400, 0)
+
+            hours[f'Session {i} Duration'] = format_duration(session)
+            total += session
+
+        hours['Total Hours'] = format_duration(total)
+        return pd.DataFrame(hours, index=records.index)
+
+    def recompute_hours(self, start_date=None, end_date=None):
+        """
+        Recalculate Session/Total columns of stored records in one pass,
+        e.g. to repair history or before a term report.
+
+        Args:
+            start_date (str): First date, 'dd/mm/yyyy' (None for the earliest)
+            end_date (str): Last date, 'dd/mm/yyyy' (None for the latest)
+
+        Returns:
+            int: Number of records whose durations changed
+        """
+        with self.lock:
+            self.flush()
+            records = self.store.records_between(start_date, end_date, with_ids=True)
+            if records.empty:
+                return 0
+
+            hours = self.calculate_hours_bulk(records)
+            old = records[hours.columns].fillna('').astype(str)
+            changed = (old != hours).any(axis=1).to_numpy()
+            if not changed.any():
+                return 0
+
+            updated = hours[changed]
+            self.store.update_columns(records['id'][changed].tolist(),
+                                      {c: updated[c].tolist() for c in updated.columns})
+            self.dirty = True
+            # Reload today's records on the next mark
+            self.today = None
+
+            for date, names in records[changed].groupby('Date')['Name']:
+                if self.archive is not None and self.archive.has_month(month_of(date)):
+                    self.archive.write_day(date, self.store.records_for_date(date))
+                for callback in self.write_listeners:
+                    try:
+                        callback(date, names.tolist())
+                    except Exception as e:
+                        print(f"Error in attendance write listener: {e}")
+            self.archive_closed_months()
+
+        print(f"Recomputed durations of {len(records)} records, {int(changed.sum())} changed")
+        return int(changed.sum())
+
     def get_daily_attendance(self, date=None):
         """
         Retrieve attendance for a specific date.
@@ -203,9 +600,12 @@ class AttendanceTracker:
             date = datetime.now().strftime('%d/%m/%Y')
 
         try:
-            df = pd.read_csv(self.csv_file, dtype=str)
-            daily_records = df[df['Date'] == date]
-            return daily_records
+            self.flush()
+            if self.archive is not None:
+                records = self.archive.daily(date)
+                if records is not None:
+                    return records
+            return self.store.records_for_date(date)
         except Exception as e:
             print(f"Error retrieving daily attendance: {e}")
             return pd.DataFrame(columns=self.REQUIRED_COLUMNS)
@@ -215,13 +615,44 @@ class AttendanceTracker:
         Retrieve all attendance records for a specific student.
         """
         try:
-            df = pd.read_csv(self.csv_file, dtype=str)
-            student_records = df[df['Name'] == name]
-            return student_records
+            self.flush()
+            if self.archive is None:
+                return self.store.records_for_name(name)
+            # Archived months come from the archive, the rest from the store
+            recent = self.store.records_for_name(name, exclude_months=self.archive.months())
+            return pd.concat([self.archive.student(name), recent], ignore_index=True)
         except Exception as e:
             print(f"Error retrieving student attendance: {e}")
             return pd.DataFrame(columns=self.REQUIRED_COLUMNS)
 
+    def export_csv(self):
+        """
+        Refresh the CSV view of the attendance store for existing consumers.
+        """
+        try:
+            self.flush()
+            self.store.export_csv(self.csv_file)
+            self.dirty = False
+            self.last_export = time.monotonic()
+        except Exception as e:
+            print(f"Error saving CSV: {e}")
+
+    def close(self):
+        """
+        Flush pending marks, export them to CSV and close the store.
+        """
+        if self.store is None:
+            return
+        self.stop_event.set()
+        if self.flush_thread is not None:
+            self.flush_thread.join()
+        self.flush()
+        if self.dirty:
+            self.export_csv()
+        self.store.close()
+        self.store = None
+        _open_trackers.discard(self)
+
 # Example usage
 if __name__ == "__main__":
     tracker = AttendanceTracker()
@@ -0,0 +1,128 @@
+import queue
+import threading
+import time
+
+
+class AttendanceWriter:
+    def __init__(self, tracker, max_queue=256):
+        """
+        Background writer that takes attendance marks off the video loop
+
+        The recognition loop calls submit(), which never waits on storage.
+        A single thread drains the bounded queue into the tracker. A name
+        that is already waiting in the queue is coalesced instead of being
+        queued twice.
+
+        Args:
+            tracker (AttendanceTracker): Tracker the marks are written to
+            max_queue (int): Maximum number of pending marks
+        """
+        self.tracker = tracker
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.pending = set()
+        self.lock = threading.Lock()
+        self.thread = None
+
+        # Counters reported by stats()
+        self.submitted = 0
+        self.coalesced = 0
+        self.dropped = 0
+        self.written = 0
+        self.failed = 0
+        self.total_write_time = 0.0
+        self.max_write_time = 0.0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+
+    def start(self):
+        """
+        Start the writer thread.
+        """
+        if self.thread is None:
+            self.thread = threading.Thread(target=self.run, name='attendance-writer', daemon=True)
+            self.thread.start()
+        return self
+
+    def submit(self, name):
+        """
+        Queue an attendance mark without blocking.
+
+        Returns:
+            bool: True if the mark was queued or is already pending
+        """
+        with self.lock:
+            self.submitted += 1
+            if name in self.pending:
+                self.coalesced += 1
+                return True
+            try:
+                self.queue.put_nowait((name, time.perf_counter()))
+            except queue.Full:
+                self.dropped += 1
+                print(f"Attendance queue full, dropped mark for {name}")
+                return False
+            self.pending.add(name)
+            return True
+
+    def run(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                self.queue.task_done()
+                break
+
+            name, queued_at = item
+            with self.lock:
+                self.pending.discard(name)
+
+            start = time.perf_counter()
+            try:
+                self.tracker.mark_attendance(name)
+                ok = True
+            except Exception as e:
+                print(f"Error marking attendance for {name}: {e}")
+                ok = False
+            done = time.perf_counter()
+
+            with self.lock:
+                if ok:
+                    self.written += 1
+                else:
+                    self.failed += 1
+                write_time = done - start
+                latency = done - queued_at
+                self.total_write_time += write_time
+                self.max_write_time = max(self.max_write_time, write_time)
+                self.total_latency += latency
+                self.max_latency = max(self.max_latency, latency)
+            self.queue.task_done()
+
+    def stop(self):
+        """
+        Write every queued mark, then stop the writer thread.
+        """
+        if self.thread is None:
+            return
+        # The sentinel must get in even when the queue is full
+        self.queue.put(None)
+        self.thread.join()
+        self.thread = None
+
+    def stats(self):
+        """
+        Queue depth, counters and write latency in milliseconds.
+        """
+        with self.lock:
+            processed = self.written + self.failed
+            return {
+                'queue_depth': self.queue.qsize(),
+                'submitted': self.submitted,
+                'coalesced': self.coalesced,
+                'dropped': self.dropped,
+                'written': self.written,
+                'failed': self.failed,
+                'avg_write_ms': self.total_write_time / processed * 1000 if processed else 0.0,
+                'max_write_ms': self.max_write_time * 1000,
+                'avg_latency_ms': self.total_latency / processed * 1000 if processed else 0.0,
+                'max_latency_ms': self.max_latency * 1000
+            }
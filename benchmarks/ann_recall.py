@@ -0,0 +1,76 @@
+"""
+Recall@1 and latency of the IVF matcher index versus brute force.
+
+Uses synthetic 128-d data shaped like face encodings: one centre per
+identity, queries are noisy copies of gallery rows.
+
+Usage (from the repository root):
+    python -m benchmarks.ann_recall --gallery 50000 --queries 1000
+"""
+import argparse
+import time
+import numpy as np
+
+from face_matcher import FaceMatcher
+
+
+def make_gallery(count, dim=128, seed=0):
+    rng = np.random.RandomState(seed)
+    # Face encodings sit roughly on a shell; spread identities around it
+    centres = rng.randn(count, dim).astype(np.float32)
+    centres *= 0.6 / np.linalg.norm(centres, axis=1, keepdims=True)
+    return centres
+
+
+def make_queries(gallery, count, noise, seed=1):
+    rng = np.random.RandomState(seed)
+    truth = rng.choice(len(gallery), count, replace=False)
+    queries = gallery[truth] + rng.randn(count, gallery.shape[1]).astype(np.float32) * noise
+    return queries, truth
+
+
+def timed_search(matcher, queries, batch, n_probe=None):
+    if n_probe is not None:
+        matcher.index.n_probe = n_probe
+
+    indices = []
+    start = time.perf_counter()
+    for i in range(0, len(queries), batch):
+        indices.append(matcher.search(queries[i:i + batch], k=1)[0][:, 0])
+    elapsed = time.perf_counter() - start
+    return np.concatenate(indices), elapsed / len(queries) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--gallery', type=int, default=50000, help='Number of gallery encodings')
+    parser.add_argument('--queries', type=int, default=1000, help='Number of query faces')
+    parser.add_argument('--batch', type=int, default=60, help='Faces matched per call (faces per frame)')
+    parser.add_argument('--noise', type=float, default=0.02, help='Per-dimension query noise')
+    parser.add_argument('--n-lists', type=int, default=None, help='IVF cells (default 4 * sqrt(N))')
+    parser.add_argument('--n-probe', type=int, nargs='+', default=[1, 2, 4, 8, 16, 32])
+    args = parser.parse_args()
+
+    gallery = make_gallery(args.gallery)
+    names = [str(i) for i in range(len(gallery))]
+    queries, _ = make_queries(gallery, args.queries, args.noise)
+
+    brute = FaceMatcher(gallery, names)
+    exact, brute_ms = timed_search(brute, queries, args.batch)
+
+    start = time.perf_counter()
+    ivf = FaceMatcher(gallery, names, index='ivf', n_lists=args.n_lists)
+    build_s = time.perf_counter() - start
+
+    print(f"Gallery: {args.gallery} x 128, queries: {args.queries}, batch: {args.batch}")
+    print(f"IVF build: {build_s:.2f} s, {ivf.index.n_lists} cells")
+    print(f"{'mode':<16}{'recall@1':>10}{'ms/face':>10}{'speedup':>10}")
+    print(f"{'brute':<16}{1.0:>10.4f}{brute_ms:>10.3f}{1.0:>10.1f}")
+    for n_probe in args.n_probe:
+        approx, ivf_ms = timed_search(ivf, queries, args.batch, n_probe)
+        recall = float(np.mean(approx == exact))
+        print(f"{f'ivf n_probe={n_probe}':<16}{recall:>10.4f}{ivf_ms:>10.3f}{brute_ms / ivf_ms:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
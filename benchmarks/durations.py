@@ -0,0 +1,81 @@
+"""
+Bulk (vectorized) versus per-row recomputation of session durations.
+
+Builds synthetic attendance records with up to three sessions, some
+crossing midnight, some incomplete and some in 'HH:MM' format. The
+per-row path is calculate_record_hours on every record, as marking does;
+the bulk path is calculate_hours_bulk on the whole frame. Both must give
+identical strings. The per-row path is timed on a sample and scaled to
+the full row count unless --per-row-sample is 0.
+
+Usage (from the repository root):
+    python -m benchmarks.durations --rows 1000000
+"""
+import argparse
+import os
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+
+from attendance_tracker import AttendanceTracker
+
+
+def clock(seconds, with_seconds):
+    if seconds < 0:
+        return ''
+    text = f'{seconds // 3600:02d}:{seconds // 60 % 60:02d}'
+    return f'{text}:{seconds % 60:02d}' if with_seconds else text
+
+
+def make_records(count, seed=0):
+    rng = np.random.RandomState(seed)
+    records = {'Name': [f'STUDENT {i % 5000}' for i in range(count)],
+               'Date': [f'{i % 28 + 1:02d}/{i // 28 % 12 + 1:02d}/2024' for i in range(count)]}
+    with_seconds = rng.rand(count) > 0.05
+    for i in range(1, 4):
+        in_seconds = rng.randint(0, 86400, count)
+        # Sessions up to 10 hours; late starts run past midnight
+        out_seconds = (in_seconds + rng.randint(0, 36000, count)) % 86400
+        used = rng.rand(count) < 0.9 / i
+        closed = used & (rng.rand(count) < 0.9)
+        records[f'In Time {i}'] = [clock(s if u else -1, w) for s, u, w in zip(in_seconds, used, with_seconds)]
+        records[f'Out Time {i}'] = [clock(s if c else -1, w) for s, c, w in zip(out_seconds, closed, with_seconds)]
+    return pd.DataFrame(records)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=1000000, help='Number of attendance records')
+    parser.add_argument('--per-row-sample', type=int, default=100000,
+                        help='Records timed on the per-row path (0 for all)')
+    args = parser.parse_args()
+
+    records = make_records(args.rows)
+    sample = records if not args.per_row_sample else records.iloc[:args.per_row_sample]
+
+    with tempfile.TemporaryDirectory() as directory:
+        tracker = AttendanceTracker(os.path.join(directory, 'Attendance.csv'), use_archive=False)
+
+        start = time.perf_counter()
+        bulk = tracker.calculate_hours_bulk(records)
+        bulk_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        per_row = pd.DataFrame([tracker.calculate_record_hours(record)
+                                for record in sample.to_dict('records')], index=sample.index)
+        per_row_seconds = (time.perf_counter() - start) * len(records) / len(sample)
+
+        tracker.close()
+
+    mismatches = int((per_row != bulk.loc[sample.index, per_row.columns]).any(axis=1).sum())
+    print(f"Records: {len(records)}, per-row path timed on {len(sample)}"
+          f"{' (scaled)' if len(sample) < len(records) else ''}")
+    print(f"{'path':<10}{'seconds':>10}{'rows/s':>14}")
+    print(f"{'per-row':<10}{per_row_seconds:>10.2f}{len(records) / per_row_seconds:>14,.0f}")
+    print(f"{'bulk':<10}{bulk_seconds:>10.2f}{len(records) / bulk_seconds:>14,.0f}")
+    print(f"Speed-up: {per_row_seconds / bulk_seconds:.1f}x, mismatching records: {mismatches}")
+
+
+if __name__ == "__main__":
+    main()
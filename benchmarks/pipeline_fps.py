@@ -0,0 +1,44 @@
+"""
+End-to-end FPS and latency of the live frame pipeline versus worker count.
+
+Runs FramePipeline over a local video file (no display) once per worker
+count and prints processed FPS, dropped frames and capture-to-result
+latency.
+
+Usage (from the repository root):
+    python -m benchmarks.pipeline_fps lecture.mp4 --workers 1 2 4 8
+"""
+import argparse
+import time
+
+from frame_pipeline import FramePipeline
+
+
+def run(video, workers, max_seconds):
+    pipeline = FramePipeline(video, workers=workers).start()
+    start = time.perf_counter()
+    try:
+        for _ in pipeline.results():
+            if time.perf_counter() - start > max_seconds:
+                break
+    finally:
+        pipeline.stop()
+    return pipeline.stats()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('video', help='Local video file used as the camera')
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--max-seconds', type=float, default=30.0, help='Time limit per run')
+    args = parser.parse_args()
+
+    print(f"{'workers':>8}{'fps':>10}{'processed':>11}{'dropped':>9}{'avg ms':>10}{'p95 ms':>10}")
+    for workers in args.workers:
+        stats = run(args.video, workers, args.max_seconds)
+        print(f"{workers:>8}{stats['fps']:>10.1f}{stats['processed']:>11}{stats['dropped']:>9}"
+              f"{stats['avg_latency_ms']:>10.1f}{stats['p95_latency_ms']:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
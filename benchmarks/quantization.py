@@ -0,0 +1,65 @@
+"""
+Memory and accuracy of float16/int8 quantized galleries versus float32.
+
+Uses the synthetic gallery from benchmarks.ann_recall. Recall@1 is the
+fraction of queries whose nearest gallery row matches the float32 result;
+distance error is measured against float32 distances.
+
+Usage (from the repository root):
+    python -m benchmarks.quantization --gallery 100000 --queries 1000
+"""
+import argparse
+import time
+import numpy as np
+
+from benchmarks.ann_recall import make_gallery, make_queries
+from face_matcher import FaceMatcher
+
+
+def timed_search(matcher, queries, batch):
+    indices, distances = [], []
+    start = time.perf_counter()
+    for i in range(0, len(queries), batch):
+        top, dist = matcher.search(queries[i:i + batch], k=1)
+        indices.append(top[:, 0])
+        distances.append(dist[:, 0])
+    elapsed = time.perf_counter() - start
+    return np.concatenate(indices), np.concatenate(distances), elapsed / len(queries) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--gallery', type=int, default=100000, help='Number of gallery encodings')
+    parser.add_argument('--queries', type=int, default=1000, help='Number of query faces')
+    parser.add_argument('--batch', type=int, default=60, help='Faces matched per call (faces per frame)')
+    parser.add_argument('--noise', type=float, default=0.02, help='Per-dimension query noise')
+    args = parser.parse_args()
+
+    gallery = make_gallery(args.gallery)
+    names = [str(i) for i in range(len(gallery))]
+    queries, _ = make_queries(gallery, args.queries, args.noise)
+    # A plain list of float64 arrays, as the original scripts held the gallery
+    list_bytes = len(gallery) * (np.zeros(128).nbytes + 112 + 8)
+
+    exact = FaceMatcher(gallery, names)
+    exact_indices, exact_dist, exact_ms = timed_search(exact, queries, args.batch)
+
+    print(f"Gallery: {args.gallery} x 128, queries: {args.queries}, batch: {args.batch}")
+    print(f"{'storage':<16}{'MB':>10}{'saving':>10}{'recall@1':>10}{'max err':>10}{'ms/face':>10}")
+    print(f"{'float64 list':<16}{list_bytes / 2 ** 20:>10.1f}{'':>10}{'':>10}{'':>10}{'':>10}")
+    print(f"{'float32':<16}{exact.known_encodings.nbytes / 2 ** 20:>10.1f}"
+          f"{list_bytes / exact.known_encodings.nbytes:>9.1f}x{1.0:>10.4f}{0.0:>10.4f}{exact_ms:>10.3f}")
+
+    for dtype in ('float16', 'int8'):
+        matcher = FaceMatcher(gallery, names, quantize=dtype)
+        indices, dist, ms = timed_search(matcher, queries, args.batch)
+        recall = float(np.mean(indices == exact_indices))
+        # Distance error over all pairs for a sample of queries
+        error = np.abs(matcher.distances(queries[:50]) - exact.distances(queries[:50])).max()
+        nbytes = matcher.quantized.nbytes
+        print(f"{dtype:<16}{nbytes / 2 ** 20:>10.1f}{list_bytes / nbytes:>9.1f}x"
+              f"{recall:>10.4f}{error:>10.4f}{ms:>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
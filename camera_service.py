@@ -0,0 +1,297 @@
+import time
+import queue
+import argparse
+import multiprocessing as mp
+import cv2
+import face_recognition
+import numpy as np
+
+from attendance_tracker import AttendanceTracker
+from attendance_writer import AttendanceWriter
+from face_matcher import FaceMatcher
+from face_tracker import FaceTracker
+from gallery_store import load_gallery
+from motion_gate import MotionGate, locate_faces_in_regions
+from ttl_cache import TTLCache
+
+
+def open_capture(source, stop_event, attempts=1, retry_delay=1.0):
+    """
+    Open a capture, retrying with a growing delay (at most 30s) between attempts.
+
+    Returns:
+        cv2.VideoCapture: The opened capture, or None if every attempt failed
+    """
+    for attempt in range(attempts):
+        if attempt and stop_event.wait(min(retry_delay * 2 ** (attempt - 1), 30.0)):
+            return None
+        cap = cv2.VideoCapture(source)
+        if cap.isOpened():
+            return cap
+        cap.release()
+    return None
+
+
+def camera_worker(camera_id, source, out_queue, stop_event, scale=0.25, reencode_every=15, stats_every=1.0,
+                  max_retries=5, retry_delay=1.0):
+    """
+    Capture, detect and encode faces from one camera (runs in its own process).
+
+    Encodings are sent to the service process, which owns the shared matcher.
+    Messages are ('faces', camera_id, captured_at, encodings),
+    ('stats', camera_id, counters) and finally ('done', camera_id, counters).
+
+    A live source (device or stream) whose read fails is reopened up to
+    max_retries times in a row before the camera gives up; a video file
+    simply ends.
+    """
+    # Device indices and stream URLs are live; anything else is a video file
+    live = not isinstance(source, str) or '://' in source
+    attempts = 1 + max_retries if live else 1
+    counters = {'frames': 0, 'detections': 0, 'encoded': 0, 'dropped_messages': 0, 'reconnects': 0, 'error': None}
+    cap = open_capture(source, stop_event, attempts, retry_delay)
+    if cap is None:
+        counters['error'] = f"Could not open video source: {source}"
+        out_queue.put(('done', camera_id, counters))
+        return
+
+    motion_gate = MotionGate()
+    # Identities are resolved centrally; a track here only needs re-encoding every reencode_every frames
+    face_tracker = FaceTracker(low_confidence_every=reencode_every)
+    locations = []
+    last_stats = time.time()
+
+    try:
+        while not stop_event.is_set():
+            ret, frame = cap.read()
+            if not ret:
+                if not live:
+                    break
+                # Glitch on a stream or device: reopen it (a fresh connection for RTSP)
+                cap.release()
+                cap = open_capture(source, stop_event, max_retries, retry_delay)
+                if cap is None:
+                    if not stop_event.is_set():
+                        counters['error'] = f"Lost video source after {max_retries} reconnect attempts: {source}"
+                    break
+                counters['reconnects'] += 1
+                motion_gate = MotionGate()
+                continue
+            captured_at = time.time()
+            counters['frames'] += 1
+
+            small = cv2.resize(frame, (0, 0), None, scale, scale)
+            small = cv2.cvtColor(small, cv2.COLOR_BGR2RGB)
+
+            moved, regions = motion_gate.check(small)
+            if moved and regions:
+                locations = locate_faces_in_regions(small, regions, locations)
+            elif moved:
+                locations = face_recognition.face_locations(small)
+            counters['detections'] += len(locations)
+
+            stale = face_tracker.select_for_encoding(face_tracker.update(locations))
+            if stale:
+                encodings = face_recognition.face_encodings(small, [track.location for track in stale])
+                for track in stale:
+                    face_tracker.set_identity(track, None, float('inf'))
+                counters['encoded'] += len(stale)
+                try:
+                    out_queue.put_nowait(('faces', camera_id, captured_at, np.asarray(encodings, dtype=np.float32)))
+                except queue.Full:
+                    counters['dropped_messages'] += 1
+
+            if captured_at - last_stats >= stats_every:
+                last_stats = captured_at
+                try:
+                    out_queue.put_nowait(('stats', camera_id, dict(counters)))
+                except queue.Full:
+                    pass
+    finally:
+        if cap is not None:
+            cap.release()
+        out_queue.put(('done', camera_id, counters))
+
+
+class CameraService:
+    def __init__(self, sources, training_images_path='Training_images', tolerance=0.5, scale=0.25,
+                 debounce_seconds=30, max_queue=1024):
+        """
+        Attendance from many cameras with one shared matcher and one writer
+
+        Each source (device index, video file or RTSP URL) gets its own
+        capture/detect/encode process. Encodings from all cameras are
+        matched in batches against one gallery matcher and marked through
+        one attendance writer.
+
+        Args:
+            sources (list): cv2.VideoCapture sources
+            training_images_path (str): Directory containing known face images
+            tolerance (float): Largest distance accepted as a match
+            scale (float): Downscale factor applied before detection
+            debounce_seconds (int): Minimum seconds between marks for the same person
+            max_queue (int): Messages buffered between cameras and the matcher
+        """
+        self.sources = list(sources)
+        self.scale = scale
+
+        names, encodings = load_gallery(training_images_path)
+        self.matcher = FaceMatcher(encodings, names, tolerance=tolerance)
+        self.tracker = AttendanceTracker()
+        self.writer = AttendanceWriter(self.tracker)
+
+        self.queue = mp.Queue(maxsize=max_queue)
+        self.stop_event = mp.Event()
+        self.processes = []
+        # Debounce shared by all cameras, so walking between rooms does not re-mark
+        self.recent_recognitions = TTLCache(ttl=debounce_seconds)
+
+        # Per-camera statistics, keyed by camera id (index into sources)
+        self.camera_stats = {
+            i: {'source': str(source), 'messages': 0, 'matched': 0, 'total_latency': 0.0, 'max_latency': 0.0,
+                'worker': {}, 'started_at': None, 'finished_at': None}
+            for i, source in enumerate(self.sources)
+        }
+
+    def start(self):
+        self.writer.start()
+        for camera_id, source in enumerate(self.sources):
+            process = mp.Process(
+                target=camera_worker,
+                args=(camera_id, source, self.queue, self.stop_event, self.scale),
+                name=f'camera-{camera_id}',
+                daemon=True
+            )
+            process.start()
+            self.camera_stats[camera_id]['started_at'] = time.time()
+            self.processes.append(process)
+        return self
+
+    def run(self, batch_size=64, poll_interval=1.0):
+        """
+        Match and mark faces from all cameras until every camera has finished.
+
+        Args:
+            batch_size (int): Most messages matched together
+            poll_interval (float): Seconds to wait for messages before checking
+                for camera processes that died without reporting
+        """
+        running = set(range(len(self.sources)))
+        try:
+            while running:
+                try:
+                    messages = [self.queue.get(timeout=poll_interval)]
+                except queue.Empty:
+                    self.check_processes(running)
+                    continue
+                # Drain what is already waiting so several frames are matched in one batch
+                while len(messages) < batch_size:
+                    try:
+                        messages.append(self.queue.get_nowait())
+                    except queue.Empty:
+                        break
+
+                face_messages = []
+                for message in messages:
+                    kind, camera_id, payload = message[0], message[1], message[-1]
+                    if kind == 'faces':
+                        face_messages.append(message)
+                    else:
+                        self.camera_stats[camera_id]['worker'] = payload
+                        if kind == 'done':
+                            self.camera_stats[camera_id]['finished_at'] = time.time()
+                            if payload.get('error'):
+                                print(f"Camera {camera_id}: {payload['error']}")
+                            running.discard(camera_id)
+
+                if face_messages:
+                    self.match_messages(face_messages)
+        except KeyboardInterrupt:
+            print("\nCamera service interrupted by user.")
+        finally:
+            self.stop()
+
+    def check_processes(self, running):
+        """
+        Treat cameras whose process exited without sending 'done' (crash, OOM kill) as finished.
+        """
+        for camera_id in list(running):
+            process = self.processes[camera_id]
+            if process.is_alive():
+                continue
+            error = f"Camera process exited unexpectedly (exit code {process.exitcode})"
+            print(f"Camera {camera_id}: {error}")
+            self.camera_stats[camera_id]['worker'] = dict(self.camera_stats[camera_id]['worker'], error=error)
+            self.camera_stats[camera_id]['finished_at'] = time.time()
+            running.discard(camera_id)
+
+    def match_messages(self, face_messages):
+        encodings = np.concatenate([m[3] for m in face_messages])
+        results = iter(self.matcher.identify(encodings))
+        now = time.time()
+
+        for _, camera_id, captured_at, camera_encodings in face_messages:
+            stats = self.camera_stats[camera_id]
+            latency = now - captured_at
+            stats['messages'] += 1
+            stats['total_latency'] += latency
+            stats['max_latency'] = max(stats['max_latency'], latency)
+
+            for _ in range(len(camera_encodings)):
+                name, _ = next(results)
+                if name is None:
+                    continue
+                stats['matched'] += 1
+                if self.recent_recognitions.add(name.upper()):
+                    self.writer.submit(name.upper())
+
+    def stop(self):
+        self.stop_event.set()
+        for process in self.processes:
+            process.join(timeout=5)
+        self.writer.stop()
+        self.tracker.close()
+
+    def stats(self):
+        """
+        Per-camera processed FPS, face/encode counts and camera-to-match latency in ms.
+        """
+        report = {}
+        for camera_id, stats in self.camera_stats.items():
+            worker = stats['worker']
+            end = stats['finished_at'] or time.time()
+            elapsed = end - stats['started_at'] if stats['started_at'] else 0.0
+            report[camera_id] = {
+                'source': stats['source'],
+                'frames': worker.get('frames', 0),
+                'fps': worker.get('frames', 0) / elapsed if elapsed else 0.0,
+                'encoded': worker.get('encoded', 0),
+                'matched': stats['matched'],
+                'dropped_messages': worker.get('dropped_messages', 0),
+                'reconnects': worker.get('reconnects', 0),
+                'avg_latency_ms': stats['total_latency'] / stats['messages'] * 1000 if stats['messages'] else 0.0,
+                'max_latency_ms': stats['max_latency'] * 1000
+            }
+        return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Multi-camera face recognition attendance')
+    parser.add_argument('sources', nargs='+', help='Camera indices, video files or stream URLs')
+    parser.add_argument('--scale', type=float, default=0.25, help='Downscale factor before detection')
+    args = parser.parse_args()
+
+    sources = [int(s) if s.isdigit() else s for s in args.sources]
+    service = CameraService(sources, scale=args.scale).start()
+    service.run()
+
+    print("\nCamera statistics:")
+    for camera_id, stats in service.stats().items():
+        print(f"Camera {camera_id} ({stats['source']}): {stats['frames']} frames, {stats['fps']:.1f} fps, "
+              f"{stats['encoded']} encoded, {stats['matched']} matched, "
+              f"latency avg {stats['avg_latency_ms']:.1f} ms / max {stats['max_latency_ms']:.1f} ms")
+    print(f"Recent recognitions: {service.recent_recognitions.stats()}")
+
+
+if __name__ == "__main__":
+    main()
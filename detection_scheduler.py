@@ -0,0 +1,100 @@
+import cv2
+import face_recognition
+import numpy as np
+from typing import List, Tuple
+
+from face_tracker import iou_matrix
+
+
+class DetectionScheduler:
+    def __init__(self, full_scan_every: int = 10, full_scan_scale: float = 0.5, roi_scale: float = 1.0,
+                 roi_margin: float = 0.6, duplicate_iou: float = 0.3):
+        """
+        Decide where to run the face detector on each frame
+
+        Every full_scan_every frames the whole frame is scanned at
+        full_scan_scale. In between, only crops around the faces found last
+        time are scanned, at the higher roi_scale, which is both cheaper than
+        a full scan and better at keeping small faces at the back of a hall.
+
+        :param full_scan_every: Frames between full-frame scans
+        :param full_scan_scale: Downscale factor for full-frame scans
+        :param roi_scale: Scale factor for crops around known faces
+        :param roi_margin: Crop margin around a face, as a fraction of its size
+        :param duplicate_iou: IoU above which two detections are the same face
+        """
+        self.full_scan_every = full_scan_every
+        self.full_scan_scale = full_scan_scale
+        self.roi_scale = roi_scale
+        self.roi_margin = roi_margin
+        self.duplicate_iou = duplicate_iou
+
+        self.frame_index = -1
+        self.last_locations = []
+
+        # Counters reported by stats()
+        self.full_scans = 0
+        self.roi_scans = 0
+        self.pixels_scanned = 0
+
+    def detect(self, rgb_frame: np.ndarray) -> List[Tuple[int, int, int, int]]:
+        """
+        Detect faces in a full-resolution RGB frame.
+
+        :param rgb_frame: Full-resolution RGB frame
+        :return: (top, right, bottom, left) face locations in frame coordinates
+        """
+        self.frame_index += 1
+        if self.frame_index % self.full_scan_every == 0 or not self.last_locations:
+            locations = self.scan(rgb_frame, (0, 0), self.full_scan_scale)
+            self.full_scans += 1
+        else:
+            locations = self.scan_regions(rgb_frame)
+            self.roi_scans += 1
+
+        self.last_locations = locations
+        return locations
+
+    def scan(self, rgb_image: np.ndarray, offset: Tuple[int, int], scale: float) -> List[Tuple[int, int, int, int]]:
+        """
+        Run the detector on an image at a scale and map boxes back by offset.
+        """
+        if scale != 1.0:
+            scaled = cv2.resize(rgb_image, (0, 0), None, scale, scale)
+        else:
+            scaled = np.ascontiguousarray(rgb_image)
+        self.pixels_scanned += scaled.shape[0] * scaled.shape[1]
+
+        y0, x0 = offset
+        return [
+            (int(top / scale) + y0, int(right / scale) + x0, int(bottom / scale) + y0, int(left / scale) + x0)
+            for top, right, bottom, left in face_recognition.face_locations(scaled)
+        ]
+
+    def scan_regions(self, rgb_frame: np.ndarray) -> List[Tuple[int, int, int, int]]:
+        """
+        Scan expanded crops around the previously found faces.
+        """
+        height, width = rgb_frame.shape[:2]
+        locations = []
+        for top, right, bottom, left in self.last_locations:
+            pad_y = int((bottom - top) * self.roi_margin)
+            pad_x = int((right - left) * self.roi_margin)
+            y0, y1 = max(0, top - pad_y), min(height, bottom + pad_y)
+            x0, x1 = max(0, left - pad_x), min(width, right + pad_x)
+            if y1 <= y0 or x1 <= x0:
+                continue
+
+            for location in self.scan(rgb_frame[y0:y1, x0:x1], (y0, x0), self.roi_scale):
+                # Crops of neighbouring faces overlap; keep each face once
+                if locations and iou_matrix([location], locations).max() > self.duplicate_iou:
+                    continue
+                locations.append(location)
+        return locations
+
+    def stats(self) -> dict:
+        return {
+            'full_scans': self.full_scans,
+            'roi_scans': self.roi_scans,
+            'pixels_scanned': self.pixels_scanned
+        }
@@ -0,0 +1,48 @@
+import sys
+import time
+import argparse
+
+from gallery_store import GalleryStore
+
+
+def print_progress(done, total, file_name, faces):
+    status = 'no face' if faces == 0 else f'{faces} faces' if faces > 1 else 'ok'
+    print(f"[{done}/{total}] {file_name}: {status}", flush=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Enrol training images into the gallery store')
+    parser.add_argument('--path', default='Training_images', help='Training images directory')
+    parser.add_argument('--store', default='gallery_store.npz', help='Gallery store file')
+    parser.add_argument('--workers', type=int, default=None, help='Encoding processes (default: CPU count)')
+    parser.add_argument('--add', metavar='IMAGE', help='Enrol a single image instead of syncing the directory')
+    parser.add_argument('--name', help='Student name for --add (default: image file name)')
+    args = parser.parse_args()
+
+    store = GalleryStore(args.path, args.store)
+    start = time.perf_counter()
+
+    if args.add:
+        try:
+            faces = store.add_image(args.add, args.name)
+        except ValueError as e:
+            print(f"Error: {e}")
+            sys.exit(1)
+        print_progress(1, 1, args.add, faces)
+        if faces == 0:
+            print("No face found; the image was stored but the student cannot be recognized yet.")
+    else:
+        store.sync(workers=args.workers, progress=print_progress)
+
+    print(f"\nGallery: {len(set(store.names))} people, {len(store.names)} known faces, {len(store.entries)} images "
+          f"({time.perf_counter() - start:.1f}s)")
+
+    problems = store.problems()
+    if problems:
+        print("\nImages needing attention:")
+        for file_name, faces in problems:
+            print(f"  {file_name}: {'no face found' if faces == 0 else f'{faces} faces, largest used'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,266 @@
+import numpy as np
+from typing import List, Optional, Sequence, Tuple
+
+from ann_index import IVFIndex, squared_distances
+from quantized_gallery import QuantizedGallery
+
+ENCODING_SIZE = 128
+
+# Galleries at least this large use the IVF index when index='auto'
+AUTO_IVF_SIZE = 20000
+
+# updated() retrains the IVF cells once the gallery has grown or shrunk by more
+# than this factor since they were trained
+RETRAIN_FACTOR = 2.0
+
+
+class FaceMatcher:
+    def __init__(self, known_encodings, known_names: Sequence[str], tolerance: float = 0.6,
+                 index: str = 'brute', n_lists: Optional[int] = None, n_probe: int = 8, aggregate: str = 'min',
+                 quantize: Optional[str] = None, keys: Optional[Sequence] = None,
+                 centroids: Optional[np.ndarray] = None, norms: Optional[np.ndarray] = None,
+                 cells: Optional[np.ndarray] = None, trained_rows: Optional[int] = None):
+        """
+        Match face encodings against a gallery of known faces in one batch
+
+        The gallery is held as a contiguous (N, 128) float32 matrix (or a
+        float16/int8 quantized one) with precomputed squared norms, so all faces in a frame are matched with
+        a single matrix product instead of one pass over the gallery per face.
+        A name may have several encodings (photos or prototypes); rows are
+        grouped by name and a face's distance to a person is aggregated over
+        that person's rows.
+
+        :param known_encodings: Face encodings for known people (list, (N, 128) array
+                                or an already quantized QuantizedGallery)
+        :param known_names: Names corresponding to known encodings
+        :param tolerance: Largest distance still accepted as a match
+        :param index: 'brute' (exact scan), 'ivf' (approximate, for very large
+                      galleries) or 'auto' (ivf from AUTO_IVF_SIZE encodings up)
+        :param n_lists: Number of IVF cells (defaults to about 4 * sqrt(N))
+        :param n_probe: IVF cells searched per face; higher is slower but more accurate
+        :param aggregate: 'min' (distance to a person's nearest encoding) or 'mean'
+                          (mean distance over all of their encodings; exact search only)
+        :param quantize: None (float32), 'float16' or 'int8' to hold the gallery
+                         quantized and compute distances on it directly (exact search only)
+        :param keys: Optional label of every row (e.g. its image file), needed by updated()
+        :param centroids: Trained IVF centroids to reuse instead of training new ones
+        :param norms: Squared norms of the float32 rows, if already known (used by updated())
+        :param cells: IVF cell of every row under centroids, if already known (used by updated())
+        :param trained_rows: Gallery size the reused centroids were trained for (used by updated())
+        """
+        if isinstance(known_encodings, QuantizedGallery):
+            quantized = known_encodings
+        else:
+            known_encodings = np.asarray(known_encodings, dtype=np.float32).reshape(-1, ENCODING_SIZE)
+            quantized = QuantizedGallery.from_encodings(known_encodings, quantize) if quantize else None
+        known_names = list(known_names)
+        self.tolerance = tolerance
+        self.index_mode = index
+        self.n_lists = n_lists
+        self.n_probe = n_probe
+        self.quantize = quantize
+        # Incremented by updated(), so callers can tell gallery snapshots apart
+        self.version = 0
+
+        row_count = len(quantized) if quantized is not None else len(known_encodings)
+        if len(known_names) != row_count:
+            raise ValueError(
+                f"Got {len(known_names)} names for {row_count} encodings"
+            )
+        if aggregate not in ('min', 'mean'):
+            raise ValueError(f"Unknown aggregate: {aggregate}")
+        self.aggregate = aggregate
+
+        # Group rows by name (in order of first appearance) so per-person
+        # distances reduce over contiguous column runs
+        identity_ids = {}
+        row_identity = np.array([identity_ids.setdefault(n, len(identity_ids)) for n in known_names], dtype=np.int64)
+        order = np.argsort(row_identity, kind='stable')
+        grouped = np.array_equal(order, np.arange(len(order)))
+        self.known_names = [known_names[i] for i in order]
+        self.keys = [keys[i] for i in order] if keys is not None else None
+        self.identities = list(identity_ids)
+        self.identity_starts = np.flatnonzero(np.diff(row_identity[order], prepend=-1) != 0)
+        self.identity_counts = np.bincount(row_identity, minlength=len(self.identities))
+
+        if quantized is not None:
+            # Only the quantized codes are kept; a memory-mapped gallery stays mapped when already grouped
+            self.quantized = quantized if grouped else quantized.take(order)
+            self.known_encodings = None
+            self.known_norms = self.quantized.norms
+        else:
+            self.quantized = None
+            self.known_encodings = known_encodings if grouped else known_encodings[order]
+            self.known_encodings = np.ascontiguousarray(self.known_encodings)
+            # |e|^2 for every gallery row, reused by every query
+            if norms is not None:
+                self.known_norms = np.asarray(norms, dtype=np.float32)[order]
+            else:
+                self.known_norms = np.einsum('ij,ij->i', self.known_encodings, self.known_encodings)
+
+        if index == 'auto':
+            exact_only = self.quantized is not None or aggregate != 'min'
+            index = 'ivf' if len(self) >= AUTO_IVF_SIZE and not exact_only else 'brute'
+        if index == 'ivf' and aggregate != 'min':
+            raise ValueError("The IVF index only supports aggregate='min'")
+        if index == 'ivf' and self.quantized is not None:
+            raise ValueError("The IVF index does not support quantized galleries")
+        if index == 'ivf':
+            self.index = IVFIndex(self.known_encodings, n_lists=n_lists, n_probe=n_probe, centroids=centroids,
+                                  assignment=np.asarray(cells)[order] if cells is not None else None,
+                                  norms=self.known_norms, trained_rows=trained_rows)
+        elif index == 'brute':
+            self.index = None
+        else:
+            raise ValueError(f"Unknown index mode: {index}")
+
+    def __len__(self):
+        return len(self.known_names)
+
+    def updated(self, removed_keys: Sequence = (), added_keys: Sequence = (), added_names: Sequence[str] = (),
+                added_encodings=None) -> 'FaceMatcher':
+        """
+        New matcher with some rows removed and others added.
+
+        The matcher itself is left untouched, so faces already being matched
+        against it finish against a consistent gallery; callers swap in the
+        returned matcher between frames.
+
+        :param removed_keys: Keys of the rows to drop
+        :param added_keys: Keys of the new rows
+        :param added_names: Names of the new rows
+        :param added_encodings: (K, 128) encodings of the new rows
+        :return: Matcher with the same settings and version + 1
+        """
+        if self.keys is None:
+            raise ValueError('updated() needs a matcher built with keys')
+        removed = set(removed_keys)
+        keep = np.array([key not in removed for key in self.keys], dtype=bool)
+        added = np.asarray(added_encodings if added_encodings is not None else [],
+                           dtype=np.float32).reshape(-1, ENCODING_SIZE)
+
+        # Kept rows carry their codes, norms and IVF cells over; only added rows are processed
+        norms = None
+        if self.quantized is not None:
+            encodings = self.quantized.take(np.flatnonzero(keep)).concatenate(
+                QuantizedGallery.from_encodings(added, self.quantized.dtype))
+        else:
+            encodings = np.concatenate([self.known_encodings[keep], added])
+            norms = np.concatenate([self.known_norms[keep], np.einsum('ij,ij->i', added, added)])
+        # Cells are kept while the gallery stays near the size they were trained for
+        # (a few changed rows don't move them); past that they are retrained
+        centroids = cells = trained_rows = None
+        row_count = int(keep.sum()) + len(added)
+        if self.index is not None:
+            trained_rows = self.index.trained_rows
+            if trained_rows / RETRAIN_FACTOR <= row_count <= trained_rows * RETRAIN_FACTOR:
+                centroids = self.index.centroids
+                cells = np.concatenate([self.index.assignment[keep], self.index.assign(added)])
+
+        matcher = FaceMatcher(
+            encodings,
+            [n for n, k in zip(self.known_names, keep) if k] + list(added_names),
+            tolerance=self.tolerance, index=self.index_mode, n_lists=self.n_lists, n_probe=self.n_probe,
+            aggregate=self.aggregate, quantize=self.quantize,
+            keys=[key for key, k in zip(self.keys, keep) if k] + list(added_keys),
+            centroids=centroids, norms=norms, cells=cells, trained_rows=trained_rows
+        )
+        matcher.version = self.version + 1
+        return matcher
+
+    def distances(self, face_encodings) -> np.ndarray:
+        """
+        Euclidean distances between every query face and every known face.
+
+        :param face_encodings: (M, 128) encodings of the faces to match
+        :return: (M, N) float32 distance matrix
+        """
+        queries = np.asarray(face_encodings, dtype=np.float32).reshape(-1, ENCODING_SIZE)
+        if self.quantized is not None:
+            return np.sqrt(self.quantized.squared_distances(queries))
+
+        # |q - e|^2 = |q|^2 + |e|^2 - 2 q.e as one matrix product
+        return np.sqrt(squared_distances(queries, self.known_encodings, self.known_norms))
+
+    def identity_distances(self, face_encodings) -> np.ndarray:
+        """
+        Aggregated distance between every query face and every known person.
+
+        :param face_encodings: (M, 128) encodings of the faces to match
+        :return: (M, len(identities)) float32 distance matrix, columns in identities order
+        """
+        dist = self.distances(face_encodings)
+        if not self.identities:
+            return dist
+        if self.aggregate == 'min':
+            return np.minimum.reduceat(dist, self.identity_starts, axis=1)
+        return np.add.reduceat(dist, self.identity_starts, axis=1) / self.identity_counts
+
+    def search(self, face_encodings, k: int = 1) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Find the k nearest known faces for every query face.
+
+        :param face_encodings: (M, 128) encodings of the faces to match
+        :param k: Number of neighbours to return per face
+        :return: (M, k) gallery indices and (M, k) distances, nearest first
+                 (the IVF index may return index -1 when a face has fewer candidates)
+        """
+        queries = np.asarray(face_encodings, dtype=np.float32).reshape(-1, ENCODING_SIZE)
+        k = min(k, len(self))
+        if k == 0 or len(queries) == 0:
+            return (np.empty((len(queries), 0), dtype=np.int64),
+                    np.empty((len(queries), 0), dtype=np.float32))
+
+        if self.index is not None:
+            return self.index.search(queries, k)
+
+        dist = self.distances(queries)
+        if k < dist.shape[1]:
+            indices = np.argpartition(dist, k - 1, axis=1)[:, :k]
+        else:
+            indices = np.tile(np.arange(dist.shape[1]), (len(queries), 1))
+        top = np.take_along_axis(dist, indices, axis=1)
+        order = np.argsort(top, axis=1)
+        return np.take_along_axis(indices, order, axis=1), np.take_along_axis(top, order, axis=1)
+
+    def match(self, face_encodings, k: int = 1) -> List[List[Tuple[str, float]]]:
+        """
+        Top-k known names and distances for every query face.
+
+        :param face_encodings: (M, 128) encodings of the faces to match
+        :param k: Number of candidates to return per face
+        :return: For each face, a list of (name, distance) pairs, nearest first
+        """
+        indices, dist = self.search(face_encodings, k)
+        return [
+            [(self.known_names[i], float(d)) for i, d in zip(row_indices, row_dist) if i >= 0]
+            for row_indices, row_dist in zip(indices, dist)
+        ]
+
+    def identify(self, face_encodings, tolerance: Optional[float] = None) -> List[Tuple[Optional[str], float]]:
+        """
+        Best known name for every query face, or None if it is not close enough.
+
+        :param face_encodings: (M, 128) encodings of the faces to match
+        :param tolerance: Largest accepted distance (defaults to the matcher tolerance)
+        :return: For each face, (name or None, distance to the nearest known person)
+        """
+        if tolerance is None:
+            tolerance = self.tolerance
+
+        if self.aggregate != 'min' and self.identities:
+            dist = self.identity_distances(face_encodings)
+            best = np.argmin(dist, axis=1)
+            return [
+                (self.identities[i] if d <= tolerance else None, float(d))
+                for i, d in zip(best, dist[np.arange(len(dist)), best])
+            ]
+
+        results = []
+        for candidates in self.match(face_encodings, k=1):
+            if not candidates:
+                results.append((None, float('inf')))
+                continue
+            name, distance = candidates[0]
+            results.append((name if distance <= tolerance else None, distance))
+        return results
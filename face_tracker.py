@@ -0,0 +1,165 @@
+import numpy as np
+from typing import List, Optional, Sequence, Tuple
+
+
+def iou_matrix(boxes_a: Sequence, boxes_b: Sequence) -> np.ndarray:
+    """
+    Intersection over union between two lists of (top, right, bottom, left) boxes.
+
+    Returns:
+        np.ndarray: (len(boxes_a), len(boxes_b)) IoU values
+    """
+    a = np.asarray(boxes_a, dtype=np.float32).reshape(-1, 4)
+    b = np.asarray(boxes_b, dtype=np.float32).reshape(-1, 4)
+
+    top = np.maximum(a[:, None, 0], b[None, :, 0])
+    right = np.minimum(a[:, None, 1], b[None, :, 1])
+    bottom = np.minimum(a[:, None, 2], b[None, :, 2])
+    left = np.maximum(a[:, None, 3], b[None, :, 3])
+    intersection = np.clip(right - left, 0, None) * np.clip(bottom - top, 0, None)
+
+    area_a = (a[:, 1] - a[:, 3]) * (a[:, 2] - a[:, 0])
+    area_b = (b[:, 1] - b[:, 3]) * (b[:, 2] - b[:, 0])
+    union = area_a[:, None] + area_b[None, :] - intersection
+    return np.where(union > 0, intersection / np.maximum(union, 1e-6), 0.0)
+
+
+class Track:
+    def __init__(self, track_id: int, location: Tuple[int, int, int, int], frame_index: int):
+        """
+        A face followed across frames
+
+        :param track_id: Unique id of the track
+        :param location: Latest (top, right, bottom, left) box
+        :param frame_index: Frame the track was created on
+        """
+        self.id = track_id
+        self.location = location
+        self.name = None
+        self.distance = float('inf')
+        self.last_seen = frame_index
+        self.last_encoded = None
+        self.missed = 0
+        # Index of this track's face in the current frame's detections
+        self.detection_index = None
+
+
+class FaceTracker:
+    def __init__(self, iou_threshold: float = 0.3, max_missed: int = 5, reencode_every: int = 30,
+                 confident_distance: float = 0.45, low_confidence_every: int = 5):
+        """
+        Associate detected faces across frames and cache each track's identity
+
+        Faces are matched to existing tracks by box overlap (IoU). A track is
+        only re-encoded when it is new, every reencode_every frames, or every
+        low_confidence_every frames while its identity is unknown or its
+        distance is above confident_distance.
+
+        :param iou_threshold: Minimum IoU to continue a track
+        :param max_missed: Frames a track survives without a detection
+        :param reencode_every: Frames between re-encodes of a confident track
+        :param confident_distance: Largest distance treated as a confident identity
+        :param low_confidence_every: Frames between re-encodes of an unsure track
+        """
+        self.iou_threshold = iou_threshold
+        self.max_missed = max_missed
+        self.reencode_every = reencode_every
+        self.confident_distance = confident_distance
+        self.low_confidence_every = low_confidence_every
+
+        self.tracks = []
+        self.next_id = 0
+        self.frame_index = -1
+
+        # Counters reported by stats()
+        self.encoded = 0
+        self.reused = 0
+
+    def update(self, locations: Sequence) -> List[Track]:
+        """
+        Associate this frame's detections with tracks.
+
+        :param locations: (top, right, bottom, left) boxes detected in the frame
+        :return: Track for every detection, in detection order
+        """
+        self.frame_index += 1
+        locations = [tuple(int(v) for v in loc) for loc in locations]
+        for track in self.tracks:
+            track.detection_index = None
+
+        assigned = [None] * len(locations)
+        if self.tracks and locations:
+            iou = iou_matrix([t.location for t in self.tracks], locations)
+            # Greedy assignment, highest overlap first
+            for flat in np.argsort(iou, axis=None)[::-1]:
+                t, d = np.unravel_index(flat, iou.shape)
+                if iou[t, d] < self.iou_threshold:
+                    break
+                track = self.tracks[t]
+                if assigned[d] is None and track.detection_index is None:
+                    assigned[d] = track
+                    track.detection_index = d
+
+        for d, location in enumerate(locations):
+            track = assigned[d]
+            if track is None:
+                track = Track(self.next_id, location, self.frame_index)
+                self.next_id += 1
+                track.detection_index = d
+                self.tracks.append(track)
+                assigned[d] = track
+            track.location = location
+            track.last_seen = self.frame_index
+            track.missed = 0
+
+        # Age out tracks that have not been seen for a while
+        for track in self.tracks:
+            if track.detection_index is None:
+                track.missed += 1
+        self.tracks = [t for t in self.tracks if t.missed <= self.max_missed]
+
+        return assigned
+
+    def needs_encoding(self, track: Track) -> bool:
+        """
+        Whether a track's face should be encoded and matched on this frame.
+        """
+        if track.last_encoded is None:
+            return True
+        age = self.frame_index - track.last_encoded
+        if track.name is None or track.distance > self.confident_distance:
+            return age >= self.low_confidence_every
+        return age >= self.reencode_every
+
+    def select_for_encoding(self, tracks: Sequence[Track]) -> List[Track]:
+        """
+        Tracks from this frame that need a fresh encoding, counting the rest as reused.
+        """
+        stale = [t for t in tracks if self.needs_encoding(t)]
+        self.reused += len(tracks) - len(stale)
+        return stale
+
+    def set_identity(self, track: Track, name: Optional[str], distance: float):
+        """
+        Store the result of matching a freshly encoded track.
+        """
+        track.name = name
+        track.distance = distance
+        track.last_encoded = self.frame_index
+        self.encoded += 1
+
+    def invalidate(self):
+        """
+        Re-encode every track on its next detection (e.g. after the gallery changed).
+        """
+        for track in self.tracks:
+            track.last_encoded = None
+
+    def stats(self) -> dict:
+        total = self.encoded + self.reused
+        return {
+            'active_tracks': len(self.tracks),
+            'encoded': self.encoded,
+            'reused': self.reused,
+            'encode_ratio': self.encoded / total if total else 0.0
+        }
@@ -1,14 +1,44 @@
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, Response
 from flask_cors import CORS
-import csv
 import subprocess
-import os
+import time
+import atexit
+import threading
 from datetime import datetime
 from attendance_tracker import AttendanceTracker
+from query_cache import QueryCache
+from recognition_pool import RecognitionPool
 
 app = Flask(__name__)
 CORS(app)
 
+# Shared by all requests; created on first use so the reloader parent stays light
+_tracker = None
+_recognition_pool = None
+_init_lock = threading.Lock()
+# Attendance query results, invalidated by the tracker's writes
+_query_cache = QueryCache()
+
+def get_tracker():
+    global _tracker
+    with _init_lock:
+        if _tracker is None:
+            _tracker = AttendanceTracker()
+            _tracker.add_write_listener(_query_cache.invalidate)
+        return _tracker
+
+def get_recognition_pool():
+    global _recognition_pool
+    with _init_lock:
+        if _recognition_pool is None:
+            _recognition_pool = RecognitionPool().start()
+        return _recognition_pool
+
+@atexit.register
+def shutdown_recognition_pool():
+    if _recognition_pool is not None:
+        _recognition_pool.shutdown()
+
 @app.route('/run_live_face_recognition', methods=['POST'])
 def run_live_face_recognition():
     try:
@@ -28,29 +58,123 @@ def run_image_face_recognition():
 
         image_files = request.files.getlist('images[]')
 
-        for i, image_file in enumerate(image_files):
-            image_path = f'temp_image_{i}.jpg'  # Unique filename for each image
-            image_file.save(image_path)
-
-            # Run face recognition script
-            subprocess.run(['python', 'image_face_recognition_attendance.py', image_path], check=True)
+        # Recognition runs in long-lived worker processes; attendance is marked here
+        pool = get_recognition_pool()
+        tracker = get_tracker()
+        futures = [pool.submit(image_file.read()) for image_file in image_files]
 
-            # Remove the temporary image after processing
-            os.remove(image_path)
+        for future in futures:
+            for name in future.result()['recognized_names']:
+                tracker.mark_attendance(name)
 
         return jsonify({'status': 'success', 'results': ['Execution completed.']})
 
-    except subprocess.CalledProcessError as e:
-        return jsonify({'status': 'error', 'error_message': f'Subprocess error: {str(e)}'})
     except Exception as e:
         return jsonify({'status': 'error', 'error_message': str(e)})
 
+@app.route('/recognize_batch', methods=['POST'])
+def recognize_batch():
+    """
+    Recognize a batch of uploaded images across the worker pool.
+
+    Form fields: images[] (files), annotate=1 to include annotated images,
+    mark=0 to skip marking attendance.
+    """
+    try:
+        image_files = request.files.getlist('images[]')
+        if not image_files:
+            return jsonify({'status': 'error', 'error_message': 'No image file provided'})
+
+        annotate = request.values.get('annotate', '0').lower() in ('1', 'true', 'yes')
+        mark = request.values.get('mark', '1').lower() in ('1', 'true', 'yes')
+
+        start = time.perf_counter()
+        pool = get_recognition_pool()
+        # Uploads are decoded from memory in the workers; nothing is written to disk
+        results = pool.recognize_batch([image_file.read() for image_file in image_files], annotate)
+
+        if mark:
+            tracker = get_tracker()
+            for result in results:
+                for name in result.get('recognized_names', []):
+                    tracker.mark_attendance(name)
+
+        for image_file, result in zip(image_files, results):
+            result['filename'] = image_file.filename
+
+        return jsonify({
+            'status': 'success',
+            'results': results,
+            'timings_ms': {
+                'total': round((time.perf_counter() - start) * 1000, 2),
+                'images': len(results),
+                'workers': pool.workers
+            }
+        })
+
+    except Exception as e:
+        return jsonify({'status': 'error', 'error_message': str(e)})
+
+@app.route('/reload_gallery', methods=['POST'])
+def reload_gallery():
+    """
+    Re-sync the training images and publish a new shared gallery snapshot.
+    Workers switch to it before their next image, without restarting.
+    """
+    try:
+        version = get_recognition_pool().reload_gallery()
+        return jsonify({'status': 'success', 'gallery_version': version})
+    except Exception as e:
+        return jsonify({'status': 'error', 'error_message': str(e)})
+
+def cached_json(key, compute):
+    """
+    JSON response for a cached query, answering If-None-Match with 304 Not Modified.
+    """
+    payload, etag = _query_cache.get(key, compute)
+    if request.if_none_match.contains(etag):
+        _query_cache.record_not_modified()
+        response = Response(status=304)
+    else:
+        response = jsonify(payload)
+    response.set_etag(etag)
+    # Let clients keep the result but revalidate it on every poll
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+def daily_names(tracker, formatted_date):
+    daily_attendance = tracker.get_daily_attendance(formatted_date)
+
+    if daily_attendance.empty:
+        return {'status': 'success', 'results': ['No Students Found']}
+
+    # Extract unique student names
+    unique_names = daily_attendance['Name'].dropna().unique().tolist()
+
+    return {'status': 'success', 'results': unique_names}
+
+def student_dates(tracker, name):
+    records = tracker.get_student_attendance(name)
+    dates = records['Date'].dropna().unique().tolist()
+    return {'status': 'success', 'results': dates or ['No Attendance Found']}
+
 @app.route('/query_attendance', methods=['GET'])
 def query_attendance():
+    """
+    Students present on ?date=YYYY-MM-DD, or the dates a student attended with ?name=NAME.
+    Results are cached and carry an ETag.
+    """
     try:
-        tracker = AttendanceTracker()
+        tracker = get_tracker()
+        # Pending marks are written first (invalidating what they change),
+        # and writes from other processes clear the cache
+        tracker.flush()
+        _query_cache.sync(tracker.store.data_version())
 
         date = request.args.get('date')
+        name = request.args.get('name')
+        if not date and name:
+            return cached_json(QueryCache.student_key(name), lambda: student_dates(tracker, name))
         if not date:
             return jsonify({'status': 'error', 'error_message': 'Missing date parameter'})
 
@@ -59,18 +183,17 @@ def query_attendance():
         except ValueError:
             return jsonify({'status': 'error', 'error_message': 'Invalid date format. Use YYYY-MM-DD.'})
 
-        daily_attendance = tracker.get_daily_attendance(formatted_date)
-
-        if daily_attendance.empty:
-            return jsonify({'status': 'success', 'results': ['No Students Found']})
-
-        # Extract unique student names
-        unique_names = daily_attendance['Name'].dropna().unique().tolist()
-
-        return jsonify({'status': 'success', 'results': unique_names})
+        return cached_json(QueryCache.date_key(formatted_date), lambda: daily_names(tracker, formatted_date))
 
     except Exception as e:
         return jsonify({'status': 'error', 'error_message': str(e)})
 
+@app.route('/query_attendance/stats', methods=['GET'])
+def query_attendance_stats():
+    """
+    Hit rate and invalidation counters of the attendance query cache.
+    """
+    return jsonify({'status': 'success', 'cache': _query_cache.stats()})
+
 if __name__ == "__main__":
     app.run(debug=True)
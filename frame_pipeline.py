@@ -0,0 +1,168 @@
+import os
+import time
+import queue
+import threading
+import cv2
+import face_recognition
+import numpy as np
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+
+def detect_and_encode(small_rgb):
+    """
+    Detect and encode the faces in a downscaled RGB frame (runs in a worker process).
+
+    Returns:
+        tuple: Face locations in the small frame and (M, 128) float32 encodings
+    """
+    locations = face_recognition.face_locations(small_rgb)
+    encodings = face_recognition.face_encodings(small_rgb, locations)
+    return locations, np.asarray(encodings, dtype=np.float32).reshape(-1, 128)
+
+
+class FramePipeline:
+    def __init__(self, source=0, workers=None, scale=0.25, capture_queue_size=2, max_in_flight=None):
+        """
+        Staged live recognition pipeline
+
+        Capture runs in its own thread into a small queue that drops the
+        oldest frame when full. Detection and encoding run in a process pool;
+        results are yielded in capture order so the display stays in sequence.
+
+        Args:
+            source: cv2.VideoCapture source (device index, video file or URL)
+            workers (int): Detection/encoding processes (defaults to CPU count)
+            scale (float): Downscale factor applied before detection
+            capture_queue_size (int): Frames buffered between capture and dispatch
+            max_in_flight (int): Frames being processed at once (defaults to 2 per worker)
+        """
+        self.source = source
+        self.workers = workers or os.cpu_count() or 1
+        self.scale = scale
+        self.max_in_flight = max_in_flight or 2 * self.workers
+        self.frames = queue.Queue(maxsize=capture_queue_size)
+
+        self.cap = None
+        self.executor = None
+        self.capture_thread = None
+        self.stop_event = threading.Event()
+
+        # Counters reported by stats()
+        self.captured = 0
+        self.dropped = 0
+        self.processed = 0
+        self.latencies = deque(maxlen=1000)
+        self.started_at = None
+
+    def start(self):
+        """
+        Open the source, start the workers and the capture thread.
+        """
+        self.cap = cv2.VideoCapture(self.source)
+        if not self.cap.isOpened():
+            raise IOError(f"Could not open video source: {self.source}")
+
+        self.executor = ProcessPoolExecutor(max_workers=self.workers)
+        self.started_at = time.perf_counter()
+        self.capture_thread = threading.Thread(target=self.capture_loop, name='frame-capture', daemon=True)
+        self.capture_thread.start()
+        return self
+
+    def capture_loop(self):
+        seq = 0
+        while not self.stop_event.is_set():
+            ret, frame = self.cap.read()
+            if not ret:
+                break
+            self.captured += 1
+            item = (seq, time.perf_counter(), frame)
+            seq += 1
+
+            # Drop the oldest frame rather than stall the camera
+            while True:
+                try:
+                    self.frames.put_nowait(item)
+                    break
+                except queue.Full:
+                    try:
+                        self.frames.get_nowait()
+                        self.dropped += 1
+                    except queue.Empty:
+                        pass
+
+        # End of stream marker, waiting for the dispatcher to make room
+        while not self.stop_event.is_set():
+            try:
+                self.frames.put(None, timeout=0.5)
+                break
+            except queue.Full:
+                continue
+
+    def submit(self, frame):
+        small = cv2.resize(frame, (0, 0), None, self.scale, self.scale)
+        small = cv2.cvtColor(small, cv2.COLOR_BGR2RGB)
+        return self.executor.submit(detect_and_encode, small)
+
+    def results(self):
+        """
+        Yield processed frames in capture order.
+
+        Yields:
+            tuple: (frame, face locations in the downscaled frame, (M, 128) encodings)
+        """
+        in_flight = deque()
+        end_of_stream = False
+
+        while not self.stop_event.is_set():
+            # Keep the workers busy; only wait for a frame when nothing is in flight
+            while not end_of_stream and len(in_flight) < self.max_in_flight:
+                try:
+                    item = self.frames.get(timeout=0.5) if not in_flight else self.frames.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    end_of_stream = True
+                    break
+                seq, captured_at, frame = item
+                in_flight.append((captured_at, frame, self.submit(frame)))
+
+            if not in_flight:
+                if end_of_stream:
+                    break
+                continue
+
+            # The oldest frame is always yielded first, which restores capture order
+            captured_at, frame, future = in_flight.popleft()
+            locations, encodings = future.result()
+            self.processed += 1
+            self.latencies.append(time.perf_counter() - captured_at)
+            yield frame, locations, encodings
+
+    def stats(self):
+        """
+        Frame counters, processed FPS and capture-to-result latency in ms.
+        """
+        elapsed = time.perf_counter() - self.started_at if self.started_at else 0.0
+        latencies = np.array(self.latencies) * 1000 if self.latencies else np.zeros(1)
+        return {
+            'workers': self.workers,
+            'captured': self.captured,
+            'dropped': self.dropped,
+            'processed': self.processed,
+            'fps': self.processed / elapsed if elapsed else 0.0,
+            'avg_latency_ms': float(latencies.mean()),
+            'p95_latency_ms': float(np.percentile(latencies, 95))
+        }
+
+    def stop(self):
+        """
+        Stop capturing and shut the workers down.
+        """
+        self.stop_event.set()
+        if self.capture_thread is not None:
+            self.capture_thread.join(timeout=2)
+        if self.executor is not None:
+            self.executor.shutdown(wait=True)
+        if self.cap is not None:
+            self.cap.release()
@@ -0,0 +1,421 @@
+import os
+import shutil
+import hashlib
+import tempfile
+import cv2
+import face_recognition
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Callable, List, Optional, Tuple
+
+from ann_index import kmeans, squared_distances
+from attendance_archive import file_lock
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp')
+ENCODING_SIZE = 128
+
+
+def encode_file(file_path: str) -> Tuple[Optional[np.ndarray], int]:
+    """
+    Encode the face in an image file.
+
+    When an image holds several faces the largest one is taken to be the
+    student, and the face count is returned so the image can be reported.
+
+    Returns:
+        tuple: float32 encoding (None if no face was found) and the number of faces
+    """
+    img = cv2.imread(file_path)
+    if img is None:
+        return None, 0
+    img = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
+    locations = face_recognition.face_locations(img)
+    if not locations:
+        return None, 0
+    largest = max(locations, key=lambda loc: (loc[2] - loc[0]) * (loc[1] - loc[3]))
+    face_encodings = face_recognition.face_encodings(img, [largest])
+    if not face_encodings:
+        return None, len(locations)
+    return np.asarray(face_encodings[0], dtype=np.float32), len(locations)
+
+
+class GalleryStore:
+    def __init__(self, training_images_path='Training_images', store_file='gallery_store.npz'):
+        """
+        Persistent store of known face encodings, shared by every entry point
+
+        Each training image is keyed by its content hash and modification time,
+        so only added or changed images are re-encoded and deleted images are
+        dropped. Encodings are kept as one float32 matrix on disk.
+
+        A person is either one image named after them or a folder named after
+        them holding several images (Training_images/<name>/*.jpg).
+
+        Args:
+            training_images_path (str): Directory containing known face images
+            store_file (str): File the encodings and their keys are saved to
+        """
+        self.training_images_path = training_images_path
+        self.store_file = store_file
+
+        # file name -> {'hash', 'mtime', 'size', 'encoding' (None if no face), 'faces'}
+        self.entries = {}
+        self.load()
+
+    def load(self):
+        """
+        Load previously saved entries from the store file, if any.
+        """
+        self.entries = {}
+        if not os.path.exists(self.store_file):
+            return
+
+        try:
+            with np.load(self.store_file, allow_pickle=False) as data:
+                encodings = data['encodings'].astype(np.float32)
+                # Stores written before face counts were kept only know whether there was a face
+                face_counts = data['face_counts'] if 'face_counts' in data.files else data['has_face'].astype(np.int64)
+                for i, file_name in enumerate(data['files'].tolist()):
+                    self.entries[file_name] = {
+                        'hash': str(data['hashes'][i]),
+                        'mtime': float(data['mtimes'][i]),
+                        'size': int(data['sizes'][i]),
+                        'encoding': encodings[i] if data['has_face'][i] else None,
+                        'faces': int(face_counts[i])
+                    }
+        except Exception as e:
+            print(f"Could not read gallery store {self.store_file}: {e}. Rebuilding.")
+            self.entries = {}
+
+    def save(self):
+        """
+        Write all entries to the store file, replacing it atomically.
+
+        Several processes (the API pool, the live script, enroll.py) may sync
+        the same store at once, so each writes its own temp file and the
+        replace happens under a lock shared across processes.
+        """
+        files = sorted(self.entries)
+        encodings = np.zeros((len(files), ENCODING_SIZE), dtype=np.float32)
+        has_face = np.zeros(len(files), dtype=bool)
+        for i, file_name in enumerate(files):
+            encoding = self.entries[file_name]['encoding']
+            if encoding is not None:
+                encodings[i] = encoding
+                has_face[i] = True
+
+        directory = os.path.dirname(self.store_file)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+
+        # Unique temp file per writer; np.savez appends .npz to names without it, so keep the suffix
+        fd, temp_file = tempfile.mkstemp(dir=directory or '.', prefix=f'.{os.path.basename(self.store_file)}.',
+                                         suffix='.npz')
+        os.close(fd)
+        try:
+            np.savez(
+                temp_file,
+                files=np.array(files, dtype=str),
+                hashes=np.array([self.entries[f]['hash'] for f in files], dtype=str),
+                mtimes=np.array([self.entries[f]['mtime'] for f in files], dtype=np.float64),
+                sizes=np.array([self.entries[f]['size'] for f in files], dtype=np.int64),
+                has_face=has_face,
+                face_counts=np.array([self.entries[f].get('faces', int(has_face[i])) for i, f in enumerate(files)],
+                                     dtype=np.int64),
+                encodings=encodings
+            )
+        except BaseException:
+            os.remove(temp_file)
+            raise
+
+        with file_lock(f'{self.store_file}.lock'):
+            os.replace(temp_file, self.store_file)
+
+    def sync(self, workers: Optional[int] = None, progress: Optional[Callable] = None) -> bool:
+        """
+        Bring the store up to date with the training images directory.
+
+        Unchanged files (same mtime and size) are reused without being read,
+        files whose content hash is already known are reused without being
+        encoded, and everything else is encoded, across a process pool when
+        there is more than one image to encode.
+
+        Args:
+            workers (int): Encoding processes (defaults to CPU count; 1 encodes in this process)
+            progress (callable): Called as progress(done, total, file_name, faces) after each encode
+
+        Returns:
+            bool: True if the store changed and was saved
+        """
+        current_files = self.list_image_files()
+        known_by_hash = {entry['hash']: entry for entry in self.entries.values()}
+
+        new_entries = {}
+        to_encode = []
+        changed = False
+        for file_name in current_files:
+            file_path = os.path.join(self.training_images_path, file_name)
+            stat = os.stat(file_path)
+            entry = self.entries.get(file_name)
+
+            # Fast path: file untouched since it was last encoded
+            if entry and entry['mtime'] == stat.st_mtime and entry['size'] == stat.st_size:
+                new_entries[file_name] = entry
+                continue
+
+            changed = True
+
+            file_hash = self.hash_file(file_path)
+            new_entries[file_name] = {
+                'hash': file_hash,
+                'mtime': stat.st_mtime,
+                'size': stat.st_size,
+                'encoding': None,
+                'faces': 0
+            }
+            previous = known_by_hash.get(file_hash)
+            if previous is not None:
+                # Same content (touched, copied or renamed), no need to re-encode
+                new_entries[file_name]['encoding'] = previous['encoding']
+                new_entries[file_name]['faces'] = previous.get('faces', int(previous['encoding'] is not None))
+            else:
+                to_encode.append(file_name)
+
+        # Each result is written back to the entry of the file it came from
+        for file_name, (encoding, faces) in self.encode_files(to_encode, workers, progress):
+            new_entries[file_name]['encoding'] = encoding
+            new_entries[file_name]['faces'] = faces
+            if encoding is None:
+                print(f"Could not find face encodings in {file_name}. Skipping.")
+            elif faces > 1:
+                print(f"Found {faces} faces in {file_name}. Using the largest.")
+
+        removed_count = len(set(self.entries) - set(new_entries))
+        self.entries = new_entries
+
+        if changed or removed_count or not os.path.exists(self.store_file):
+            self.save()
+            print(f"Gallery store updated: {len(to_encode)} encoded, {removed_count} removed, "
+                  f"{len(self.names)} known faces")
+            return True
+
+        print(f"Loaded {len(self.names)} known faces from {self.store_file}")
+        return False
+
+    def encode_files(self, file_names: List[str], workers: Optional[int] = None, progress: Optional[Callable] = None):
+        """
+        Encode training images, yielding results as they complete.
+
+        Yields:
+            tuple: (file name, (encoding or None, face count))
+        """
+        workers = min(workers or os.cpu_count() or 1, len(file_names))
+        paths = {f: os.path.join(self.training_images_path, f) for f in file_names}
+
+        if workers <= 1:
+            results = ((f, encode_file(paths[f])) for f in file_names)
+            for done, (file_name, result) in enumerate(results, 1):
+                if progress is not None:
+                    progress(done, len(file_names), file_name, result[1])
+                yield file_name, result
+            return
+
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(encode_file, paths[f]): f for f in file_names}
+            for done, future in enumerate(as_completed(futures), 1):
+                file_name = futures[future]
+                result = future.result()
+                if progress is not None:
+                    progress(done, len(file_names), file_name, result[1])
+                yield file_name, result
+
+    def add_image(self, image_path: str, name: Optional[str] = None) -> int:
+        """
+        Enrol a single image without re-scanning the rest of the gallery.
+
+        The image is copied into the training images directory as
+        <name><extension> (replacing an earlier image with that file name),
+        or into <name>/ when the person already has a folder of images,
+        then encoded and saved.
+
+        Args:
+            image_path (str): Image of the student
+            name (str): Student name (defaults to the image file name)
+
+        Returns:
+            int: Number of faces found in the image
+        """
+        extension = os.path.splitext(image_path)[1].lower()
+        if extension not in IMAGE_EXTENSIONS:
+            raise ValueError(f"Unsupported image type: {image_path}")
+        name = name or os.path.splitext(os.path.basename(image_path))[0]
+        if os.path.isdir(os.path.join(self.training_images_path, name)):
+            file_name = f'{name}/{os.path.basename(image_path)}'
+        else:
+            file_name = name + extension
+            for existing in self.entries:
+                if existing != file_name and self.identity(existing) == name:
+                    raise ValueError(f"{name} is already enrolled as {existing}")
+
+        target = os.path.join(self.training_images_path, file_name)
+        if os.path.abspath(image_path) != os.path.abspath(target):
+            os.makedirs(self.training_images_path, exist_ok=True)
+            shutil.copy2(image_path, target)
+
+        encoding, faces = encode_file(target)
+        stat = os.stat(target)
+        self.entries[file_name] = {
+            'hash': self.hash_file(target),
+            'mtime': stat.st_mtime,
+            'size': stat.st_size,
+            'encoding': encoding,
+            'faces': faces
+        }
+        self.save()
+        return faces
+
+    def problems(self) -> List[Tuple[str, int]]:
+        """
+        Images that did not contain exactly one face.
+
+        Returns:
+            list: (file name, face count) pairs
+        """
+        return [(f, entry.get('faces', 0)) for f, entry in sorted(self.entries.items()) if entry.get('faces', 0) != 1]
+
+    def list_image_files(self) -> List[str]:
+        """
+        List image file names in the training images directory.
+        """
+        if not os.path.isdir(self.training_images_path):
+            print(f"Training images directory not found: {self.training_images_path}")
+            return []
+
+        files = []
+        for f in os.listdir(self.training_images_path):
+            folder = os.path.join(self.training_images_path, f)
+            if os.path.isdir(folder):
+                # One folder per person, holding several images of them
+                files.extend(f'{f}/{g}' for g in os.listdir(folder) if g.lower().endswith(IMAGE_EXTENSIONS))
+            elif f.lower().endswith(IMAGE_EXTENSIONS):
+                files.append(f)
+        return sorted(files)
+
+    @staticmethod
+    def identity(file_name: str) -> str:
+        """
+        Person an image belongs to: its folder, or its file name without extension.
+        """
+        folder, base = os.path.split(file_name)
+        return folder or os.path.splitext(base)[0]
+
+    @staticmethod
+    def hash_file(file_path: str) -> str:
+        """
+        SHA-1 of the file content, read in chunks.
+        """
+        sha1 = hashlib.sha1()
+        with open(file_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                sha1.update(chunk)
+        return sha1.hexdigest()
+
+    @staticmethod
+    def encode_image(file_path: str) -> Optional[np.ndarray]:
+        """
+        Encode the (largest) face found in an image file.
+
+        Returns:
+            np.ndarray: float32 encoding, or None if no face was found
+        """
+        return encode_file(file_path)[0]
+
+    @property
+    def names(self) -> List[str]:
+        """
+        Person of every image with a face, in store order (repeated for people with several images).
+        """
+        return [
+            self.identity(f) for f in sorted(self.entries)
+            if self.entries[f]['encoding'] is not None
+        ]
+
+    @property
+    def files(self) -> List[str]:
+        """
+        Image file of every encoding, aligned with names.
+        """
+        return [f for f in sorted(self.entries) if self.entries[f]['encoding'] is not None]
+
+    @property
+    def encodings(self) -> np.ndarray:
+        """
+        (N, 128) float32 matrix of encodings, aligned with names.
+        """
+        rows = [
+            self.entries[f]['encoding'] for f in sorted(self.entries)
+            if self.entries[f]['encoding'] is not None
+        ]
+        if not rows:
+            return np.empty((0, ENCODING_SIZE), dtype=np.float32)
+        return np.ascontiguousarray(np.stack(rows), dtype=np.float32)
+
+
+def compress_identities(names: List[str], encodings: np.ndarray, medoids: int = 2) -> Tuple[List[str], np.ndarray]:
+    """
+    Replace each person's encodings with a small prototype set.
+
+    A person with more than medoids + 1 encodings is reduced to the
+    centroid of their encodings plus medoids real encodings picked as the
+    samples nearest to k-means centres, so matching cost grows with the
+    number of people rather than photos.
+
+    Args:
+        names (list): Person of every encoding
+        encodings (np.ndarray): (N, 128) float32 encodings
+        medoids (int): Medoids kept per person besides the centroid
+
+    Returns:
+        tuple: Names and (M, 128) float32 prototypes, grouped by person
+    """
+    rows_by_name = {}
+    for i, name in enumerate(names):
+        rows_by_name.setdefault(name, []).append(i)
+
+    out_names, out_encodings = [], []
+    for name, rows in rows_by_name.items():
+        samples = encodings[rows]
+        if len(samples) > medoids + 1:
+            prototypes = [samples.mean(axis=0)]
+            if medoids:
+                centres = kmeans(samples, medoids, n_iter=10)
+                nearest = np.unique(np.argmin(squared_distances(centres, samples), axis=1))
+                prototypes.extend(samples[nearest])
+            samples = np.stack(prototypes)
+        out_names.extend([name] * len(samples))
+        out_encodings.append(samples)
+
+    if not out_encodings:
+        return [], np.empty((0, ENCODING_SIZE), dtype=np.float32)
+    return out_names, np.ascontiguousarray(np.concatenate(out_encodings), dtype=np.float32)
+
+
+def load_gallery(training_images_path='Training_images', store_file='gallery_store.npz',
+                 prototypes: Optional[int] = None) -> Tuple[List[str], np.ndarray]:
+    """
+    Sync the gallery store and return its names and encodings.
+
+    Args:
+        training_images_path (str): Directory containing known face images
+        store_file (str): Gallery store file
+        prototypes (int): Compress each person to their centroid plus this
+            many medoids (None keeps every encoding)
+
+    Returns:
+        tuple: List of names and (N, 128) float32 encoding matrix
+    """
+    store = GalleryStore(training_images_path, store_file)
+    store.sync()
+    if prototypes is not None:
+        return compress_identities(store.names, store.encodings, prototypes)
+    return store.names, store.encodings
@@ -0,0 +1,119 @@
+import os
+import threading
+from typing import Callable, Optional
+
+from face_matcher import FaceMatcher
+from gallery_store import GalleryStore
+
+
+class GalleryWatcher:
+    def __init__(self, training_images_path: str = 'Training_images', store_file: str = 'gallery_store.npz',
+                 interval: float = 2.0, on_update: Optional[Callable[[FaceMatcher], None]] = None,
+                 **matcher_options):
+        """
+        Keep a face matcher in step with the training images and gallery store
+
+        Every interval seconds the training images directory and the store
+        file are stat()ed. When something changed, the store is synced (only
+        new or changed images are encoded) and a new matcher is derived from
+        the current one by removing and adding just the changed rows. The new
+        matcher replaces the matcher attribute in one assignment, so a frame
+        that already took a reference finishes against a consistent gallery.
+
+        Args:
+            training_images_path (str): Directory containing known face images
+            store_file (str): Gallery store file (also updated by enroll.py)
+            interval (float): Seconds between checks by the background thread
+            on_update (callable): Called with every new matcher (e.g. to publish it)
+            **matcher_options: Passed to FaceMatcher (tolerance, index, ...)
+        """
+        self.store = GalleryStore(training_images_path, store_file)
+        self.store.sync()
+        self.interval = interval
+        self.on_update = on_update
+
+        self.matcher = FaceMatcher(self.store.encodings, self.store.names, keys=self.store.files, **matcher_options)
+        # Content hash of every image in the current matcher
+        self.known = self.hashes()
+        self.signature = self.scan()
+
+        self.stop_event = threading.Event()
+        self.thread = None
+        # check() runs from the watcher thread and on demand (e.g. /reload_gallery)
+        self.lock = threading.Lock()
+
+    def scan(self) -> tuple:
+        """
+        Cheap fingerprint of the images directory and the store file (stat only).
+        """
+        stats = []
+        try:
+            stats.append(os.stat(self.store.store_file).st_mtime_ns)
+        except OSError:
+            stats.append(None)
+        for file_name in self.store.list_image_files():
+            try:
+                stat = os.stat(os.path.join(self.store.training_images_path, file_name))
+            except OSError:
+                continue
+            stats.append((file_name, stat.st_mtime_ns, stat.st_size))
+        return tuple(stats)
+
+    def hashes(self) -> dict:
+        return {f: self.store.entries[f]['hash'] for f in self.store.files}
+
+    def check(self) -> bool:
+        """
+        Apply gallery changes made since the last check.
+
+        Returns:
+            bool: True if a new matcher version was installed
+        """
+        with self.lock:
+            signature = self.scan()
+            if signature == self.signature:
+                return False
+
+            if signature[0] != self.signature[0]:
+                # The store was rewritten by another process (e.g. enroll.py); start from its entries
+                self.store.load()
+            self.store.sync()
+            self.signature = self.scan()
+
+            before, after = self.known, self.hashes()
+            removed = [f for f in before if after.get(f) != before[f]]
+            added = [f for f in after if before.get(f) != after[f]]
+            if not removed and not added:
+                return False
+
+            names = [self.store.identity(f) for f in added]
+            encodings = [self.store.entries[f]['encoding'] for f in added]
+            self.matcher = self.matcher.updated(removed, added, names, encodings)
+            self.known = after
+            print(f"Gallery updated to version {self.matcher.version}: "
+                  f"{len(added)} added, {len(removed)} removed, {len(self.matcher)} known faces")
+            if self.on_update is not None:
+                self.on_update(self.matcher)
+            return True
+
+    def start(self) -> 'GalleryWatcher':
+        """
+        Check for changes in a background thread.
+        """
+        if self.thread is None:
+            self.thread = threading.Thread(target=self.run, name='gallery-watcher', daemon=True)
+            self.thread.start()
+        return self
+
+    def run(self):
+        while not self.stop_event.wait(self.interval):
+            try:
+                self.check()
+            except Exception as e:
+                print(f"Error reloading gallery: {e}")
+
+    def stop(self, timeout: Optional[float] = 5.0):
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join(timeout)
+            self.thread = None
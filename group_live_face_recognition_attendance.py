@@ -1,18 +1,39 @@
 import cv2
 import face_recognition
 import numpy as np
-from typing import List, Tuple
+from typing import List, Optional, Tuple
+
+from detection_scheduler import DetectionScheduler
+from face_matcher import FaceMatcher
+from face_tracker import FaceTracker
+from gallery_watcher import GalleryWatcher
 
 class GroupRecognition:
-    def __init__(self, known_encodings: List, known_names: List[str]):
+    def __init__(self, known_encodings: List, known_names: List[str], index: str = 'brute', n_probe: int = 8,
+                 tracking: bool = True, scheduled_detection: bool = True,
+                 gallery_watcher: Optional[GalleryWatcher] = None):
         """
         Initialize group recognition system
         
         :param known_encodings: List of face encodings for known people
         :param known_names: List of names corresponding to known encodings
+        :param index: Matcher index mode ('brute', 'ivf' or 'auto' for very large galleries)
+        :param n_probe: IVF cells searched per face (recall/latency trade-off)
+        :param tracking: Follow faces across frames and only re-encode new, stale or unsure tracks
+        :param scheduled_detection: Scan the full frame only periodically and crops around
+                                    known faces in between, at higher resolution
+        :param gallery_watcher: Started GalleryWatcher (built with tolerance=0.6) whose
+                                matcher replaces the given gallery and follows its updates
         """
         self.known_encodings = known_encodings
         self.known_names = known_names
+        self.gallery_watcher = gallery_watcher
+        if gallery_watcher is not None:
+            self.matcher = gallery_watcher.matcher
+        else:
+            self.matcher = FaceMatcher(known_encodings, known_names, tolerance=0.6, index=index, n_probe=n_probe)
+        self.face_tracker = FaceTracker() if tracking else None
+        self.detection_scheduler = DetectionScheduler() if scheduled_detection else None
 
     def process_group(self, frame: np.ndarray) -> Tuple[np.ndarray, List[str], List[str]]:
         """
@@ -21,55 +42,89 @@ class GroupRecognition:
         :param frame: Input video frame
         :return: Processed frame, list of recognized names, list of unauthorized names
         """
-        # Resize frame for faster processing
-        imgS = cv2.resize(frame, (0, 0), None, 0.25, 0.25)
-        imgS = cv2.cvtColor(imgS, cv2.COLOR_BGR2RGB)
-
-        # Detect faces
-        faces_cur_frame = face_recognition.face_locations(imgS)
-        encodes_cur_frame = face_recognition.face_encodings(imgS, faces_cur_frame)
+        if self.detection_scheduler is not None:
+            # Detect faces in full-frame coordinates (periodic full scan, crops otherwise)
+            imgS = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+            faces_cur_frame = self.detection_scheduler.detect(imgS)
+            scale = 1
+        else:
+            # Resize frame for faster processing
+            imgS = cv2.resize(frame, (0, 0), None, 0.25, 0.25)
+            imgS = cv2.cvtColor(imgS, cv2.COLOR_BGR2RGB)
+
+            # Detect faces
+            faces_cur_frame = face_recognition.face_locations(imgS)
+            scale = 4
 
         recognized_names = []
         unauthorized_names = []
 
+        # Encode and match (in one batch) only the faces whose identity isn't cached
+        matches = self.identify_faces(imgS, faces_cur_frame, self.current_matcher())
+
         # Process each detected face
-        for encode_face, face_loc in zip(encodes_cur_frame, faces_cur_frame):
-            # Compare face with known faces
-            matches = face_recognition.compare_faces(
-                self.known_encodings, 
-                encode_face, 
-                tolerance=0.6
-            )
-            face_distances = face_recognition.face_distance(self.known_encodings, encode_face)
-
-            # Find best match
-            if len(face_distances) > 0:
-                match_index = min(range(len(face_distances)), key=face_distances.__getitem__)
-
-                if matches[match_index]:
-                    # Recognized face
-                    name = self.known_names[match_index].upper()
-                    recognized_names.append(name)
-                    
-                    # Draw green rectangle for recognized face
-                    y1, x2, y2, x1 = face_loc
-                    y1, x2, y2, x1 = y1 * 4, x2 * 4, y2 * 4, x1 * 4
-                    cv2.rectangle(frame, (x1, y1), (x2, y2), (0, 255, 0), 2)
-                    cv2.rectangle(frame, (x1, y2 - 35), (x2, y2), (0, 255, 0), cv2.FILLED)
-                    cv2.putText(frame, name, (x1 + 6, y2 - 6), 
-                                cv2.FONT_HERSHEY_COMPLEX, 1, (255, 255, 255), 2)
-                else:
-                    # Unauthorized face
-                    unauthorized_names.append('UNKNOWN')
-                    
-                    # Draw red rectangle for unauthorized face
-                    y1, x2, y2, x1 = face_loc
-                    y1, x2, y2, x1 = y1 * 4, x2 * 4, y2 * 4, x1 * 4
-                    cv2.rectangle(frame, (x1, y1), (x2, y2), (0, 0, 255), 2)
-                    cv2.putText(frame, 'UNKNOWN', (x1 + 6, y2 - 6), 
-                                cv2.FONT_HERSHEY_COMPLEX, 1, (255, 255, 255), 2)
+        for (name, _), face_loc in zip(matches, faces_cur_frame):
+            if name is not None:
+                # Recognized face
+                name = name.upper()
+                recognized_names.append(name)
+                
+                # Draw green rectangle for recognized face
+                y1, x2, y2, x1 = face_loc
+                y1, x2, y2, x1 = y1 * scale, x2 * scale, y2 * scale, x1 * scale
+                cv2.rectangle(frame, (x1, y1), (x2, y2), (0, 255, 0), 2)
+                cv2.rectangle(frame, (x1, y2 - 35), (x2, y2), (0, 255, 0), cv2.FILLED)
+                cv2.putText(frame, name, (x1 + 6, y2 - 6), 
+                            cv2.FONT_HERSHEY_COMPLEX, 1, (255, 255, 255), 2)
+            else:
+                # Unauthorized face
+                unauthorized_names.append('UNKNOWN')
+                
+                # Draw red rectangle for unauthorized face
+                y1, x2, y2, x1 = face_loc
+                y1, x2, y2, x1 = y1 * scale, x2 * scale, y2 * scale, x1 * scale
+                cv2.rectangle(frame, (x1, y1), (x2, y2), (0, 0, 255), 2)
+                cv2.putText(frame, 'UNKNOWN', (x1 + 6, y2 - 6), 
+                            cv2.FONT_HERSHEY_COMPLEX, 1, (255, 255, 255), 2)
 
         return frame, recognized_names, unauthorized_names
+
+    def current_matcher(self) -> FaceMatcher:
+        """
+        Matcher for the next frame, switching to a newer gallery version if the watcher loaded one
+        
+        :return: Matcher every face of the frame is matched against
+        """
+        if self.gallery_watcher is not None and self.gallery_watcher.matcher is not self.matcher:
+            self.matcher = self.gallery_watcher.matcher
+            if self.face_tracker is not None:
+                # Cached identities may refer to removed or changed images
+                self.face_tracker.invalidate()
+        return self.matcher
+
+    def identify_faces(self, imgS: np.ndarray, face_locations: List, matcher: Optional[FaceMatcher] = None) -> List[Tuple]:
+        """
+        Identify detected faces, reusing cached track identities where possible
+        
+        :param imgS: RGB frame the face locations refer to
+        :param face_locations: Detected face locations in imgS
+        :param matcher: Gallery snapshot to match against (defaults to the current matcher)
+        :return: (name or None, distance) for every face
+        """
+        if matcher is None:
+            matcher = self.matcher
+        if self.face_tracker is None:
+            encodes_cur_frame = face_recognition.face_encodings(imgS, face_locations)
+            return matcher.identify(encodes_cur_frame)
+
+        tracks = self.face_tracker.update(face_locations)
+        stale = self.face_tracker.select_for_encoding(tracks)
+        if stale:
+            encodings = face_recognition.face_encodings(imgS, [track.location for track in stale])
+            for track, (name, distance) in zip(stale, matcher.identify(encodings)):
+                self.face_tracker.set_identity(track, name, distance)
+
+        return [(track.name, track.distance) for track in tracks]
     
 
 
@@ -174,4 +229,4 @@ class GroupRecognition:
 #         cv2.destroyAllWindows()
 
 # if __name__ == "__main__":
-#     run_face_recognition()
\ No newline at end of file
+#     run_face_recognition()
@@ -0,0 +1,95 @@
+from collections import deque
+from typing import Iterable, Optional, Tuple
+
+import numpy as np
+
+
+class IdentityVoter:
+    def __init__(self, window: int = 5, min_votes: int = 3, commit_distance: float = 0.5):
+        """
+        Commit a track's identity only after several consistent matches
+
+        Every encode of a tracked face adds one (name, distance) observation.
+        A name is committed once it holds at least min_votes of the last
+        window observations, a majority of them, and its mean distance is at
+        most commit_distance. A committed name is dropped again when a full
+        window passes without a single vote for it.
+
+        Args:
+            window (int): Observations kept per track
+            min_votes (int): Matches needed before a name is committed
+            commit_distance (float): Largest mean distance accepted for a commit
+        """
+        if min_votes > window:
+            raise ValueError('min_votes cannot exceed window')
+        self.window = window
+        self.min_votes = min_votes
+        self.commit_distance = commit_distance
+
+        self.observations = {}
+        self.identities = {}
+
+        # Counters reported by stats()
+        self.observed = 0
+        self.commits = 0
+        self.revoked = 0
+
+    def observe(self, track_id: int, name: Optional[str], distance: float) -> Tuple[Optional[str], float, bool]:
+        """
+        Add a match result for a track.
+
+        Args:
+            track_id (int): Id of the track the face belongs to
+            name (str): Matched name, or None for an unknown face
+            distance (float): Distance of the match
+
+        Returns:
+            tuple: (committed name or None, its mean distance, whether it was committed by this call)
+        """
+        history = self.observations.setdefault(track_id, deque(maxlen=self.window))
+        history.append((name, distance))
+        self.observed += 1
+
+        votes = {}
+        for voted_name, voted_distance in history:
+            if voted_name is not None:
+                votes.setdefault(voted_name, []).append(voted_distance)
+
+        current = self.identities.get(track_id)
+        if current is not None and current not in votes and len(history) == self.window:
+            del self.identities[track_id]
+            self.revoked += 1
+            current = None
+
+        if votes:
+            # Most votes wins, ties go to the closer mean distance
+            best = max(votes, key=lambda n: (len(votes[n]), -np.mean(votes[n])))
+            count = len(votes[best])
+            mean_distance = float(np.mean(votes[best]))
+            if best != current and count >= self.min_votes and count * 2 > len(history) \
+                    and mean_distance <= self.commit_distance:
+                self.identities[track_id] = best
+                self.commits += 1
+                return best, mean_distance, True
+
+        if current is None:
+            return None, float('inf'), False
+        return current, float(np.mean(votes[current])), False
+
+    def retain(self, track_ids: Iterable[int]):
+        """
+        Forget every track not in track_ids.
+        """
+        keep = set(track_ids)
+        for track_id in list(self.observations):
+            if track_id not in keep:
+                del self.observations[track_id]
+                self.identities.pop(track_id, None)
+
+    def stats(self) -> dict:
+        return {
+            'tracks': len(self.observations),
+            'observed': self.observed,
+            'commits': self.commits,
+            'revoked': self.revoked
+        }
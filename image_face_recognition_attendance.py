@@ -2,60 +2,132 @@ import cv2
 import face_recognition
 import os
 import sys
-import numpy as np
+import time
 from attendance_tracker import AttendanceTracker
+from face_matcher import FaceMatcher
+from gallery_store import GalleryStore
+from gallery_watcher import GalleryWatcher
+from shared_gallery import SharedGallery
+from tiled_detection import TiledDetector
 
 class face_recognition_system:
-    def __init__(self, training_images_path='Training_images', confidence_threshold=0.6):
+    def __init__(self, training_images_path='Training_images', confidence_threshold=0.6, index='brute', n_probe=8,
+                 mark_attendance=True, detection_scale=1.0, tiled=None, tile_workers=None, quantize=None,
+                 shared_gallery=None, watch_gallery=False):
         """
         Initialize the attendance system with known face encodings
         
         Args:
             training_images_path (str): Path to directory containing known face images
             confidence_threshold (float): Threshold for face recognition confidence
+            index (str): Matcher index mode ('brute', 'ivf' or 'auto' for very large galleries)
+            n_probe (int): IVF cells searched per face (recall/latency trade-off)
+            mark_attendance (bool): Mark recognized faces in the attendance tracker
+                (worker processes leave marking to their parent)
+            detection_scale (float): Downscale factor for detection; boxes are
+                always mapped back to original image coordinates
+            tiled (bool): Detect in overlapping tiles (None = only for large images)
+            tile_workers (int): Processes detecting tiles (defaults to CPU count)
+            quantize (str): Hold the gallery as 'float16' or 'int8' to save memory (None = float32)
+            shared_gallery (str): Memory-map the gallery snapshots published to this
+                directory instead of loading the store (see refresh_gallery)
+            watch_gallery (bool): Watch Training_images and the gallery store and
+                apply added, changed and removed images without restarting (with
+                shared_gallery, the publisher watches and this follows its snapshots)
         """
-        self.tracker = AttendanceTracker()
+        self.tracker = AttendanceTracker() if mark_attendance else None
         self.training_images_path = training_images_path
         self.confidence_threshold = confidence_threshold
+        self.detection_scale = detection_scale
+        self.tiled = tiled
+        self.tiled_detector = TiledDetector(downscale=detection_scale, workers=tile_workers)
+        self.index = index
+        self.n_probe = n_probe
+        self.quantize = quantize
+        self.shared_gallery = SharedGallery(shared_gallery) if shared_gallery else None
         
-        # Load known images and their encodings
-        self.known_images = []
-        self.known_class_names = []
-        self.known_encodings = self.load_known_faces()
+        self.gallery_watcher = None
+        if watch_gallery and self.shared_gallery is None:
+            self.gallery_watcher = GalleryWatcher(training_images_path, index=index, n_probe=n_probe,
+                                                  quantize=quantize).start()
+            self.use_matcher(self.gallery_watcher.matcher)
+        else:
+            # Load known names and their encodings from the gallery store
+            self.known_class_names = []
+            self.known_encodings = self.load_known_faces()
+            self.build_matcher()
 
-    def load_known_faces(self):
+    def close(self):
+        """
+        Stop the gallery watcher and the tile worker processes, and close the attendance tracker
+        """
+        if self.gallery_watcher is not None:
+            self.gallery_watcher.stop()
+            self.gallery_watcher = None
+        self.tiled_detector.shutdown()
+        if self.tracker is not None:
+            self.tracker.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def build_matcher(self):
         """
-        Load known face images and generate their encodings
+        Build the matcher over the currently loaded gallery
+        """
+        self.matcher = FaceMatcher(self.known_encodings, self.known_class_names, index=self.index,
+                                   n_probe=self.n_probe, quantize=self.quantize)
+        if self.quantize:
+            # Keep only the matcher's quantized copy of the gallery
+            self.known_encodings = None
+
+    def use_matcher(self, matcher):
+        """
+        Switch to a matcher built by the gallery watcher
+        """
+        self.matcher = matcher
+        self.known_class_names = matcher.known_names
+        self.known_encodings = matcher.known_encodings
+
+    def refresh_gallery(self):
+        """
+        Switch to a newer gallery version (watched store or shared snapshot) if there is one
         
         Returns:
-            list: Face encodings for known individuals
+            bool: True if the gallery was reloaded
         """
-        for cl in os.listdir(self.training_images_path):
-            cur_img = cv2.imread(os.path.join(self.training_images_path, cl))
-            self.known_images.append(cur_img)
-            # Use filename (without extension) as name
-            self.known_class_names.append(os.path.splitext(cl)[0])
-        
-        return self.find_encodings(self.known_images)
+        if self.gallery_watcher is not None:
+            if self.gallery_watcher.matcher is self.matcher:
+                return False
+            self.use_matcher(self.gallery_watcher.matcher)
+            return True
+        if self.shared_gallery is None or not self.shared_gallery.changed():
+            return False
+        self.known_encodings = self.load_known_faces()
+        self.build_matcher()
+        print(f"Gallery reloaded: version {self.shared_gallery.version}, {len(self.matcher)} known faces")
+        return True
 
-    def find_encodings(self, images):
+    def load_known_faces(self):
         """
-        Generate face encodings for a list of images
-        
-        Args:
-            images (list): List of images to encode
+        Load known face encodings from the gallery store, encoding only
+        training images that were added or changed since the last run
         
         Returns:
-            list: Face encodings for the images
+            np.ndarray: (N, 128) float32 face encodings for known individuals
         """
-        encode_list = []
-        for img in images:
-            img = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
-            # Handle cases where no face is detected
-            face_encodings = face_recognition.face_encodings(img)
-            if face_encodings:
-                encode_list.append(face_encodings[0])
-        return encode_list
+        if self.shared_gallery is not None:
+            # Memory-mapped snapshot shared with every other reader
+            self.known_class_names, encodings = self.shared_gallery.load()
+            return encodings
+
+        store = GalleryStore(self.training_images_path)
+        store.sync()
+        self.known_class_names = store.names
+        return store.encodings
 
     def recognize_faces_in_image(self, image_path):
         """
@@ -69,51 +141,134 @@ class face_recognition_system:
         """
         # Read the image
         img = cv2.imread(image_path)
+        return self.recognize_faces_in_array(img)
+
+    def match_faces(self, img):
+        """
+        Detect, encode and match the faces in a decoded BGR image,
+        without drawing or marking attendance
+        
+        Args:
+            img (np.ndarray): BGR image
+        
+        Returns:
+            tuple: List of faces (dicts with 'name' or None, 'distance',
+                'location' as (top, right, bottom, left) and 'encoding')
+                and a dict of stage timings in seconds
+        """
+        # The whole image is matched against one gallery version
+        self.refresh_gallery()
+        matcher = self.matcher
+
+        timings = {}
+        start = time.perf_counter()
         img_rgb = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
 
-        # Detect faces in the image
-        faces_cur_frame = face_recognition.face_locations(img_rgb)
+        # Detect faces in the image (locations in original image coordinates)
+        faces_cur_frame = self.detect_faces(img_rgb)
+        timings['detect'] = time.perf_counter() - start
+
+        start = time.perf_counter()
         encodes_cur_frame = face_recognition.face_encodings(img_rgb, faces_cur_frame)
+        timings['encode'] = time.perf_counter() - start
+
+        # Match all detected faces against the gallery in one batch
+        start = time.perf_counter()
+        matches = matcher.identify(encodes_cur_frame, self.confidence_threshold)
+        timings['match'] = time.perf_counter() - start
+
+        faces = []
+        for (name, distance), encode_face, face_loc in zip(matches, encodes_cur_frame, faces_cur_frame):
+            faces.append({
+                'name': name.upper() if name is not None else None,
+                'distance': distance,
+                'location': face_loc,
+                'encoding': encode_face
+            })
+        return faces, timings
+
+    def detect_faces(self, img_rgb):
+        """
+        Detect faces at the configured scale, tiling large images
+        
+        Args:
+            img_rgb (np.ndarray): RGB image
+        
+        Returns:
+            list: (top, right, bottom, left) locations in original image coordinates
+        """
+        tiled = self.tiled
+        if tiled is None:
+            # Tile when the detection image is more than two tiles across
+            tiled = max(img_rgb.shape[:2]) * self.detection_scale > 2 * self.tiled_detector.tile_size
+        if tiled:
+            return self.tiled_detector.detect(img_rgb)
+
+        scale = self.detection_scale
+        if scale != 1.0:
+            img_rgb = cv2.resize(img_rgb, (0, 0), None, scale, scale)
+        return [
+            (int(top / scale), int(right / scale), int(bottom / scale), int(left / scale))
+            for top, right, bottom, left in face_recognition.face_locations(img_rgb)
+        ]
+
+    def draw_faces(self, img, faces):
+        """
+        Draw labelled boxes for matched faces (green) and unknown faces (red)
+        
+        Args:
+            img (np.ndarray): BGR image, annotated in place
+            faces (list): Faces returned by match_faces
+        
+        Returns:
+            list: (x1, y1, x2, y2) drawn box for every face
+        """
+        boxes = []
+        for face in faces:
+            # Locations are already in original image coordinates
+            y1, x2, y2, x1 = face['location']
+            if face['name'] is not None:
+                # Draw bounding box and name
+                cv2.rectangle(img, (x1, y1), (x2, y2), (0, 255, 0), 2)
+                cv2.rectangle(img, (x1, y2 - 35), (x2, y2), (0, 255, 0), cv2.FILLED)
+                cv2.putText(img, face['name'], (x1 + 6, y2 - 6), cv2.FONT_HERSHEY_COMPLEX, 1, (255, 255, 255), 2)
+            else:
+                # Unknown face
+                cv2.rectangle(img, (x1, y1), (x2, y2), (0, 0, 255), 2)
+                cv2.rectangle(img, (x1, y2 - 35), (x2, y2), (0, 0, 255), cv2.FILLED)
+                cv2.putText(img, "UNKNOWN", (x1 + 6, y2 - 6), cv2.FONT_HERSHEY_COMPLEX, 1, (255, 255, 255), 2)
+            boxes.append((x1, y1, x2, y2))
+        return boxes
+
+    def recognize_faces_in_array(self, img):
+        """
+        Recognize faces in a decoded BGR image and mark attendance
+        
+        Args:
+            img (np.ndarray): BGR image, annotated in place
+        
+        Returns:
+            tuple: Processed image and list of recognized names and unknown faces
+        """
+        faces, _ = self.match_faces(img)
+        boxes = self.draw_faces(img, faces)
 
         recognized_names = []
         unknown_faces = []
 
         # Process each detected face
-        for encode_face, face_loc in zip(encodes_cur_frame, faces_cur_frame):
-            # Compare face with known encodings
-            matches = face_recognition.compare_faces(self.known_encodings, encode_face)
-            face_dis = face_recognition.face_distance(self.known_encodings, encode_face)
-            
-            # Find the best match
-            if len(face_dis) > 0:
-                match_index = min(range(len(face_dis)), key=face_dis.__getitem__)
-
-                if matches[match_index] and face_dis[match_index] < self.confidence_threshold:
-                    name = self.known_class_names[match_index].upper()
-                    
-                    # Draw bounding box and name
-                    y1, x2, y2, x1 = face_loc
-                    y1, x2, y2, x1 = y1 * 4, x2 * 4, y2 * 4, x1 * 4
-                    cv2.rectangle(img, (x1, y1), (x2, y2), (0, 255, 0), 2)
-                    cv2.rectangle(img, (x1, y2 - 35), (x2, y2), (0, 255, 0), cv2.FILLED)
-                    cv2.putText(img, name, (x1 + 6, y2 - 6), cv2.FONT_HERSHEY_COMPLEX, 1, (255, 255, 255), 2)
-                    
-                    # Mark attendance
-                    self.tracker.mark_attendance(name)
-                    recognized_names.append(name)
-                else:
-                    # Unknown face
-                    y1, x2, y2, x1 = face_loc
-                    y1, x2, y2, x1 = y1 * 4, x2 * 4, y2 * 4, x1 * 4
-                    cv2.rectangle(img, (x1, y1), (x2, y2), (0, 0, 255), 2)
-                    cv2.rectangle(img, (x1, y2 - 35), (x2, y2), (0, 0, 255), cv2.FILLED)
-                    cv2.putText(img, "UNKNOWN", (x1 + 6, y2 - 6), cv2.FONT_HERSHEY_COMPLEX, 1, (255, 255, 255), 2)
-                    
-                    # Store unknown face location
-                    unknown_faces.append({
-                        'location': (x1, y1, x2, y2),
-                        'encoding': encode_face
-                    })
+        for face, box in zip(faces, boxes):
+            if face['name'] is not None:
+                # Mark attendance
+                if self.tracker is not None:
+                    self.tracker.mark_attendance(face['name'])
+                recognized_names.append(face['name'])
+            else:
+                # Store unknown face location
+                unknown_faces.append({
+                    'location': box,
+                    'encoding': face['encoding']
+                })
 
         return img, recognized_names, unknown_faces
 
@@ -159,11 +314,9 @@ def main():
     # Get image paths from command line arguments
     image_paths = sys.argv[1:]
     
-    # Initialize the attendance system
-    attendance_system = face_recognition_system()
-    
-    # Process multiple images
-    results = attendance_system.process_multiple_images(image_paths)
+    # Initialize the attendance system and process multiple images
+    with face_recognition_system() as attendance_system:
+        results = attendance_system.process_multiple_images(image_paths)
     
     # Print results
     print("\nAttendance Results:")
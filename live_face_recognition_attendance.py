@@ -1,117 +1,168 @@
 import cv2
 import face_recognition
-import os
-from datetime import datetime
-import numpy as np
-import sys
+import argparse
 
 from attendance_tracker import AttendanceTracker
-
-def run_face_recognition():
-    # Initialize the attendance tracker
+from attendance_writer import AttendanceWriter
+from face_tracker import FaceTracker
+from identity_voting import IdentityVoter
+from ttl_cache import TTLCache
+from frame_pipeline import FramePipeline
+from motion_gate import MotionGate, locate_faces_in_regions
+from gallery_watcher import GalleryWatcher
+
+def detect_frames(cap, motion_gate=None):
+    """
+    Capture frames and detect/encode faces serially in this thread.
+
+    Encoding is left to the caller, which only encodes faces it needs.
+    With a motion gate, detection is skipped on still frames (the previous
+    faces are reused) and limited to the changed regions otherwise.
+
+    Yields:
+        tuple: (frame, 0.25 scaled RGB frame, face locations in the scaled frame, None)
+    """
+    facesCurFrame = []
+    while True:
+        cv2.waitKey(10)
+
+        ret, img = cap.read()
+        if not ret:
+            print("Failed to grab frame")
+            break
+
+        # Resize for processing
+        imgS = cv2.resize(img, (0, 0), None, 0.25, 0.25)
+        imgS = cv2.cvtColor(imgS, cv2.COLOR_BGR2RGB)
+
+        # Process faces
+        if motion_gate is None:
+            facesCurFrame = face_recognition.face_locations(imgS)
+        else:
+            moved, regions = motion_gate.check(imgS)
+            if moved and regions:
+                facesCurFrame = locate_faces_in_regions(imgS, regions, facesCurFrame)
+            elif moved:
+                facesCurFrame = face_recognition.face_locations(imgS)
+        yield img, imgS, facesCurFrame, None
+
+def run_face_recognition(source=0, workers=0, motion_gating=True, vote_window=5, min_votes=3, commit_distance=0.5):
+    """
+    Recognize faces from a camera and mark attendance.
+
+    Args:
+        source: cv2.VideoCapture source (device index, video file or URL)
+        workers (int): Detection/encoding processes; 0 runs everything in this thread
+        motion_gating (bool): Skip detection on still frames (single-threaded loop only)
+        vote_window (int): Match results kept per tracked face
+        min_votes (int): Matches of the same name needed before it is marked
+        commit_distance (float): Largest mean distance accepted for a mark
+    """
+    # Initialize the attendance tracker; marks are written by a background
+    # writer so the camera loop never waits on storage
     tracker = AttendanceTracker()
+    writer = AttendanceWriter(tracker).start()
 
+    # Load known faces from the shared gallery store (only new/changed images are encoded)
+    # and keep following it, so newly enrolled students are recognized without a restart
     path = 'Training_images'
-    images = []
-    classNames = []
-    myList = os.listdir(path)
-    print(myList)
-    for cl in myList:
-        curImg = cv2.imread(f'{path}/{cl}')
-        images.append(curImg)
-        classNames.append(os.path.splitext(cl)[0])
+    # Gallery held as one float32 matrix; all faces in a frame are matched in one batch
+    # Only accept as a match if the distance is below 0.5 (adjust this threshold as needed)
+    gallery_watcher = GalleryWatcher(path, tolerance=0.5).start()
+    matcher = gallery_watcher.matcher
+    classNames = matcher.known_names
     print(classNames)
 
-    def findEncodings(images):
-        encodeList = []
-        for img in images:
-            img = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
-            try:
-                encode = face_recognition.face_encodings(img)[0]
-                encodeList.append(encode)
-            except IndexError:
-                print(f"Could not find face encodings in an image. Skipping.")
-        return encodeList
-
     def markAttendance(name):
-        tracker.mark_attendance(name)
+        writer.submit(name)
 
-    # Find encodings for known faces
-    encodeListKnown = findEncodings(images)
     print('Encoding Complete')
 
-    # Dictionary to track recently recognized faces to prevent rapid multiple markings
-    recent_recognitions = {}
+    # Names marked in the last 30 seconds, to prevent rapid multiple markings
+    recent_recognitions = TTLCache(ttl=30)
+
+    # Follows faces across frames so stationary people are not re-encoded every frame
+    face_tracker = FaceTracker()
+
+    # A tracked face is only named (and marked) after several consistent matches
+    voter = IdentityVoter(vote_window, min_votes, commit_distance)
 
     # session_attendance = set()
 
+    pipeline = None
+    motion_gate = None
     try:
-        # Start video capture
-        cap = cv2.VideoCapture(0)
-
-        if not cap.isOpened():
-            print("Error: Could not open camera.")
-            return
+        if workers:
+            # Capture, detection/encoding (process pool) and display run as separate stages
+            # (workers already encode every face, so tracking there only saves matching)
+            pipeline = FramePipeline(source, workers=workers).start()
+            frames = ((img, None, faces, encodes) for img, faces, encodes in pipeline.results())
+        else:
+            # Start video capture
+            cap = cv2.VideoCapture(source)
+
+            if not cap.isOpened():
+                print("Error: Could not open camera.")
+                return
+            # Skip detection when nothing moved, which keeps an idle camera near zero CPU
+            motion_gate = MotionGate() if motion_gating else None
+            frames = detect_frames(cap, motion_gate)
         
         # Text to explain controls
         # print("\nControls:")
         # print("Press 'r' to reset the current session")
         # print("Press 'q' or ESC to quit the program")
 
-        while True:
-            cv2.waitKey(10)
-
-            ret, img = cap.read()
-            if not ret:
-                print("Failed to grab frame")
-                break
-
-            # Resize for processing
-            imgS = cv2.resize(img, (0, 0), None, 0.25, 0.25)
-            imgS = cv2.cvtColor(imgS, cv2.COLOR_BGR2RGB)
-
-            # Process faces
-            facesCurFrame = face_recognition.face_locations(imgS)
-            
-            if facesCurFrame:
-                encodesCurFrame = face_recognition.face_encodings(imgS, facesCurFrame)
-
+        for img, imgS, facesCurFrame, encodesCurFrame in frames:
+            # Each frame is matched against one gallery version; cached identities are
+            # re-checked when a new version is installed
+            if gallery_watcher.matcher is not matcher:
+                matcher = gallery_watcher.matcher
+                face_tracker.invalidate()
+
+            # Associate faces with tracks; only new, stale or unsure tracks are encoded and matched
+            tracks = face_tracker.update(facesCurFrame)
+            voter.retain(track.id for track in face_tracker.tracks)
+            stale = face_tracker.select_for_encoding(tracks)
+            if stale:
+                if encodesCurFrame is None:
+                    encodings = face_recognition.face_encodings(imgS, [track.location for track in stale])
+                else:
+                    encodings = [encodesCurFrame[track.detection_index] for track in stale]
+                for track, (name, faceDis) in zip(stale, matcher.identify(encodings)):
+                    name, faceDis, committed = voter.observe(track.id, name, faceDis)
+                    face_tracker.set_identity(track, name, faceDis)
+                    if not committed:
+                        continue
+                    name = name.upper()
+
+                    # Mark attendance with time delay - avoid taking same person withing 30 second time delay
+                    if recent_recognitions.add(name):
+                        markAttendance(name)
+                        # print(f"Attendance marked for {name}")
+
+            if tracks:
                 # Track authorized and unauthorized faces
                 recognized_people = []
                 unauthorized_faces = []
 
-                for encodeFace, faceLoc in zip(encodesCurFrame, facesCurFrame):
-                    # Add tolerance to face matching
-                    matches = face_recognition.compare_faces(encodeListKnown, encodeFace, tolerance=0.6)
-                    faceDis = face_recognition.face_distance(encodeListKnown, encodeFace)
+                for track in tracks:
+                    name, faceLoc = track.name, track.location
+                    # Authorized person (known face)
+                    if name is not None:
+                        name = name.upper()
+                        recognized_people.append((name, faceLoc))
+
+                        # Mark attendance only once per session
+                        # if name not in session_attendance:
+                        #     markAttendance(name)
+                        #     session_attendance.add(name)
+                        # print(f"Attendance marked for {name}")
                     
-                    if len(faceDis) > 0:
-                        matchIndex = min(range(len(faceDis)), key=faceDis.__getitem__)
-
-                        # Authorized person (known face)
-                        # Add this confidence threshold check (smaller distance = better match)
-                        # Only accept as a match if the distance is below 0.5 (adjust this threshold as needed)
-                        if matches[matchIndex] and faceDis[matchIndex] < 0.5:
-                            name = classNames[matchIndex].upper()
-                            recognized_people.append((name, faceLoc))
-                            
-                            # Mark attendance with time delay - avoid taking same person withing 30 second time delay
-                            current_time = datetime.now()
-                            if name not in recent_recognitions or (current_time - recent_recognitions[name]).total_seconds() > 30:
-                                markAttendance(name)
-                                # print(f"Attendance marked for {name}")
-                                recent_recognitions[name] = current_time
-
-                            # Mark attendance only once per session
-                            # if name not in session_attendance:
-                            #     markAttendance(name)
-                            #     session_attendance.add(name)
-                            # print(f"Attendance marked for {name}")
-                        
-                        # Unauthorized person (unknown face)
-                        else:
-                            # Face didn't meet confidence threshold, mark as unknown
-                            unauthorized_faces.append(faceLoc)
+                    # Unauthorized person (unknown face)
+                    else:
+                        # Face didn't meet confidence threshold, mark as unknown
+                        unauthorized_faces.append(faceLoc)
 
                 # Draw rectangles for recognized people (green)
                 for name, faceLoc in recognized_people:
@@ -155,10 +206,34 @@ def run_face_recognition():
         # Ensure resources are released
         if 'cap' in locals():
             cap.release()
+        if pipeline is not None:
+            pipeline.stop()
+            print(f"Frame pipeline: {pipeline.stats()}")
+        if motion_gate is not None:
+            print(f"Motion gate: {motion_gate.stats()}")
+        print(f"Face tracker: {face_tracker.stats()}")
+        print(f"Identity voting: {voter.stats()}")
+        print(f"Recent recognitions: {recent_recognitions.stats()}")
         cv2.destroyAllWindows()
+        writer.stop()
+        print(f"Attendance writer: {writer.stats()}")
+        tracker.close()
+        gallery_watcher.stop()
 
 if __name__ == "__main__":
-    run_face_recognition()
+    parser = argparse.ArgumentParser(description='Live face recognition attendance')
+    parser.add_argument('--source', default='0', help='Camera index, video file or stream URL')
+    parser.add_argument('--workers', type=int, default=0,
+                        help='Detection/encoding processes (0 = single-threaded loop)')
+    parser.add_argument('--no-motion-gate', action='store_true', help='Run detection on every frame')
+    parser.add_argument('--vote-window', type=int, default=5, help='Match results kept per tracked face')
+    parser.add_argument('--min-votes', type=int, default=3, help='Consistent matches needed before marking')
+    parser.add_argument('--commit-distance', type=float, default=0.5,
+                        help='Largest mean distance accepted for a mark')
+    args = parser.parse_args()
+    run_face_recognition(int(args.source) if args.source.isdigit() else args.source, args.workers,
+                         motion_gating=not args.no_motion_gate, vote_window=args.vote_window,
+                         min_votes=args.min_votes, commit_distance=args.commit_distance)
 
 
 # Performance increased Implementation
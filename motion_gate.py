@@ -0,0 +1,170 @@
+import cv2
+import face_recognition
+import numpy as np
+from typing import List, Sequence, Tuple
+
+from face_tracker import iou_matrix
+
+
+class MotionGate:
+    def __init__(self, work_width: int = 160, pixel_threshold: int = 25, min_changed_fraction: float = 0.002,
+                 full_scan_fraction: float = 0.5, background_alpha: float = 0.2, margin: int = 16,
+                 full_scan_every: int = 300):
+        """
+        Cheap change detection in front of the face detector
+
+        Frames are shrunk to work_width pixels wide, blurred and compared
+        with a running-average background. When too few pixels changed the
+        frame is skipped; otherwise the changed regions are returned so
+        detection can be limited to them.
+
+        Args:
+            work_width (int): Width the frame is shrunk to before differencing
+            pixel_threshold (int): Grey-level difference counted as a change
+            min_changed_fraction (float): Changed pixel fraction below which the frame is skipped
+            full_scan_fraction (float): Changed region area fraction above which the whole frame is scanned
+            background_alpha (float): Running-average weight of the newest frame
+            margin (int): Pixels (in input coordinates) added around each changed region
+            full_scan_every (int): Force a full scan after this many frames without one
+        """
+        self.work_width = work_width
+        self.pixel_threshold = pixel_threshold
+        self.min_changed_fraction = min_changed_fraction
+        self.full_scan_fraction = full_scan_fraction
+        self.background_alpha = background_alpha
+        self.margin = margin
+        self.full_scan_every = full_scan_every
+
+        self.background = None
+        self.frames_since_full_scan = 0
+
+        # Counters reported by stats()
+        self.skipped = 0
+        self.region_scans = 0
+        self.full_scans = 0
+
+    def check(self, frame: np.ndarray) -> Tuple[bool, List[Tuple[int, int, int, int]]]:
+        """
+        Compare a frame with the background.
+
+        Args:
+            frame (np.ndarray): RGB (or single-channel) frame
+
+        Returns:
+            tuple: (process, regions). process is False when nothing moved.
+            regions are (x, y, w, h) boxes in frame coordinates to scan, or an
+            empty list when the whole frame should be scanned.
+        """
+        height, width = frame.shape[:2]
+        scale = min(1.0, self.work_width / float(width))
+        small = cv2.resize(frame, (0, 0), None, scale, scale) if scale < 1.0 else frame
+        gray = cv2.cvtColor(small, cv2.COLOR_RGB2GRAY) if small.ndim == 3 else small
+        gray = cv2.GaussianBlur(gray, (5, 5), 0).astype(np.float32)
+
+        self.frames_since_full_scan += 1
+        if self.background is None or self.frames_since_full_scan >= self.full_scan_every:
+            self.background = gray
+            return self.full_scan()
+
+        mask = (cv2.absdiff(gray, self.background) > self.pixel_threshold).astype(np.uint8)
+        cv2.accumulateWeighted(gray, self.background, self.background_alpha)
+
+        changed_fraction = float(mask.mean())
+        if changed_fraction < self.min_changed_fraction:
+            self.skipped += 1
+            return False, []
+
+        # Bounding boxes of the changed blobs, mapped back to frame coordinates
+        mask = cv2.dilate(mask, np.ones((3, 3), np.uint8), iterations=2)
+        contours = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)[-2]
+        regions = []
+        area = 0
+        for contour in contours:
+            x, y, w, h = cv2.boundingRect(contour)
+            x0 = max(0, int(x / scale) - self.margin)
+            y0 = max(0, int(y / scale) - self.margin)
+            x1 = min(width, int((x + w) / scale) + self.margin)
+            y1 = min(height, int((y + h) / scale) + self.margin)
+            regions.append((x0, y0, x1 - x0, y1 - y0))
+            area += (x1 - x0) * (y1 - y0)
+
+        if not regions or area > self.full_scan_fraction * width * height:
+            return self.full_scan()
+
+        self.region_scans += 1
+        return True, regions
+
+    def full_scan(self):
+        self.full_scans += 1
+        self.frames_since_full_scan = 0
+        return True, []
+
+    def stats(self) -> dict:
+        total = self.skipped + self.region_scans + self.full_scans
+        return {
+            'frames': total,
+            'skipped': self.skipped,
+            'region_scans': self.region_scans,
+            'full_scans': self.full_scans,
+            'skipped_fraction': self.skipped / total if total else 0.0
+        }
+
+
+def overlaps(location: Sequence[int], region: Sequence[int]) -> bool:
+    """
+    Whether a (top, right, bottom, left) face box overlaps an (x, y, w, h) region.
+    """
+    top, right, bottom, left = location
+    x, y, w, h = region
+    return left < x + w and right > x and top < y + h and bottom > y
+
+
+def locate_faces_in_regions(image: np.ndarray, regions: Sequence, previous_locations: Sequence,
+                            min_size: int = 64, face_margin: float = 0.25,
+                            duplicate_iou: float = 0.3) -> List[Tuple[int, int, int, int]]:
+    """
+    Detect faces only inside changed regions, keeping earlier faces elsewhere.
+
+    A crop is grown to cover every previous face it overlaps (plus
+    face_margin of the face size, as the face may have moved), so a face
+    only partly inside the changed region is still detected whole.
+
+    Args:
+        image (np.ndarray): RGB image the regions refer to
+        regions (list): (x, y, w, h) changed regions
+        previous_locations (list): Faces found on the previous processed frame
+        min_size (int): Smallest crop side passed to the detector
+        face_margin (float): Margin around overlapped previous faces, as a fraction of their size
+        duplicate_iou (float): IoU above which two detections are the same face
+
+    Returns:
+        list: (top, right, bottom, left) face locations in image coordinates
+    """
+    height, width = image.shape[:2]
+
+    # Faces outside every changed region are assumed not to have moved
+    locations = [loc for loc in previous_locations if not any(overlaps(loc, r) for r in regions)]
+
+    for x, y, w, h in regions:
+        # Grow tiny regions so the detector has enough context
+        pad_x = max(0, (min_size - w) // 2)
+        pad_y = max(0, (min_size - h) // 2)
+        x0, y0, x1, y1 = x - pad_x, y - pad_y, x + w + pad_x, y + h + pad_y
+
+        # Dropped faces overlapping this region must fit in the crop entirely
+        for top, right, bottom, left in previous_locations:
+            if overlaps((top, right, bottom, left), (x, y, w, h)):
+                margin_x = int((right - left) * face_margin)
+                margin_y = int((bottom - top) * face_margin)
+                x0, y0 = min(x0, left - margin_x), min(y0, top - margin_y)
+                x1, y1 = max(x1, right + margin_x), max(y1, bottom + margin_y)
+        x0, y0, x1, y1 = max(0, x0), max(0, y0), min(width, x1), min(height, y1)
+
+        crop = np.ascontiguousarray(image[y0:y1, x0:x1])
+        for top, right, bottom, left in face_recognition.face_locations(crop):
+            location = (top + y0, right + x0, bottom + y0, left + x0)
+            # Overlapping regions can find the same face twice; neighbouring faces may touch
+            if not locations or iou_matrix([location], locations).max() <= duplicate_iou:
+                locations.append(location)
+
+    return locations
@@ -0,0 +1,131 @@
+import os
+import numpy as np
+from typing import Optional
+
+from ann_index import squared_distances
+
+QUANTIZED_DTYPES = ('float16', 'int8')
+
+
+class QuantizedGallery:
+    def __init__(self, codes: np.ndarray, scales: Optional[np.ndarray] = None, norms: Optional[np.ndarray] = None):
+        """
+        Face encodings stored as float16, or int8 with one scale per vector
+
+        The codes are one contiguous (N, 128) array that can be memory-mapped
+        from disk. Distances are computed directly on it, dequantizing a block
+        of rows at a time so no full float32 copy of the gallery is made.
+
+        Args:
+            codes (np.ndarray): (N, 128) float16 or int8 codes
+            scales (np.ndarray): (N,) float32 scales, required for int8 codes
+            norms (np.ndarray): (N,) squared norms of the dequantized rows, if already known
+        """
+        if codes.dtype == np.int8 and scales is None:
+            raise ValueError('int8 codes need per-vector scales')
+        if codes.dtype not in (np.float16, np.int8):
+            raise ValueError(f"Unsupported code type: {codes.dtype}")
+        self.codes = codes
+        self.scales = scales
+
+        # |e|^2 of the dequantized rows, so distances match what is compared
+        if norms is not None:
+            self.norms = np.asarray(norms, dtype=np.float32)
+            return
+        self.norms = np.concatenate([
+            np.einsum('ij,ij->i', block, block) for block in self.blocks()
+        ]) if len(codes) else np.empty(0, dtype=np.float32)
+
+    @classmethod
+    def from_encodings(cls, encodings: np.ndarray, dtype: str = 'int8') -> 'QuantizedGallery':
+        """
+        Quantize float encodings.
+
+        Args:
+            encodings (np.ndarray): (N, 128) float encodings
+            dtype (str): 'float16' or 'int8' (symmetric, scale = max |x| / 127 per vector)
+        """
+        encodings = np.asarray(encodings, dtype=np.float32)
+        if dtype == 'float16':
+            return cls(np.ascontiguousarray(encodings.astype(np.float16)))
+        if dtype == 'int8':
+            scales = np.abs(encodings).max(axis=1) / 127.0 if len(encodings) else np.empty(0, dtype=np.float32)
+            scales = np.where(scales > 0, scales, 1.0).astype(np.float32)
+            codes = np.clip(np.rint(encodings / scales[:, None]), -127, 127).astype(np.int8)
+            return cls(np.ascontiguousarray(codes), scales)
+        raise ValueError(f"Unknown quantization: {dtype} (expected one of {QUANTIZED_DTYPES})")
+
+    @classmethod
+    def load(cls, prefix: str, mmap: bool = True) -> 'QuantizedGallery':
+        """
+        Load a gallery written by save(), memory-mapping the codes by default.
+        """
+        mode = 'r' if mmap else None
+        codes = np.load(f'{prefix}.codes.npy', mmap_mode=mode)
+        scales = np.load(f'{prefix}.scales.npy') if os.path.exists(f'{prefix}.scales.npy') else None
+        return cls(codes, scales)
+
+    def save(self, prefix: str):
+        """
+        Write <prefix>.codes.npy (and <prefix>.scales.npy for int8), each replaced atomically.
+        """
+        arrays = {'codes': self.codes}
+        if self.scales is not None:
+            arrays['scales'] = self.scales
+        for name, array in arrays.items():
+            temp_file = f'{prefix}.{name}.tmp.npy'
+            np.save(temp_file, array)
+            os.replace(temp_file, f'{prefix}.{name}.npy')
+
+    def __len__(self):
+        return len(self.codes)
+
+    @property
+    def dtype(self) -> str:
+        return str(self.codes.dtype)
+
+    @property
+    def nbytes(self) -> int:
+        return self.codes.nbytes + (self.scales.nbytes if self.scales is not None else 0)
+
+    def take(self, indices: np.ndarray) -> 'QuantizedGallery':
+        """
+        Gallery made of the given rows, in that order.
+        """
+        scales = self.scales[indices] if self.scales is not None else None
+        return QuantizedGallery(np.ascontiguousarray(self.codes[indices]), scales, self.norms[indices])
+
+    def concatenate(self, other: 'QuantizedGallery') -> 'QuantizedGallery':
+        """
+        Gallery with the rows of other (same code type) appended.
+        """
+        scales = np.concatenate([self.scales, other.scales]) if self.scales is not None else None
+        return QuantizedGallery(np.concatenate([self.codes, other.codes]), scales,
+                                np.concatenate([self.norms, other.norms]))
+
+    def dequantize(self, start: int = 0, stop: Optional[int] = None) -> np.ndarray:
+        """
+        float32 copy of rows start:stop.
+        """
+        block = self.codes[start:stop].astype(np.float32)
+        if self.scales is not None:
+            block *= self.scales[start:stop, None]
+        return block
+
+    def blocks(self, block_rows: int = 8192):
+        for start in range(0, len(self.codes), block_rows):
+            yield self.dequantize(start, start + block_rows)
+
+    def squared_distances(self, queries: np.ndarray, block_rows: int = 8192) -> np.ndarray:
+        """
+        Squared distances between float32 queries and every gallery row.
+
+        Returns:
+            np.ndarray: (M, N) float32 squared distances
+        """
+        queries = np.asarray(queries, dtype=np.float32)
+        out = np.empty((len(queries), len(self.codes)), dtype=np.float32)
+        for start in range(0, len(self.codes), block_rows):
+            stop = start + block_rows
+            out[:, start:stop] = squared_distances(queries, self.dequantize(start, stop), self.norms[start:stop])
+        return out
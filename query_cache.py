@@ -0,0 +1,126 @@
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Callable, Hashable, Iterable, Optional, Tuple
+
+
+class QueryCache:
+    def __init__(self, max_entries: int = 512):
+        """
+        Read cache for attendance query results, keyed by date and by student
+
+        Entries are dropped exactly when the tracker writes marks for their
+        date or student (invalidate() is registered as a tracker write
+        listener). Writes by other processes sharing the database cannot be
+        attributed to a date, so a change in the store's data version
+        clears the whole cache instead. Every entry carries an ETag derived
+        from its content, so clients sending If-None-Match get a 304 without
+        the result being rebuilt or resent.
+
+        Args:
+            max_entries (int): Largest number of cached results (least recently used are dropped)
+        """
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        # Bumped on every invalidation, so a result computed across a write is not cached
+        self.generation = 0
+        self.source_version = None
+
+        # Counters reported by stats()
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+        self.invalidations = 0
+        self.external_clears = 0
+
+    @staticmethod
+    def date_key(date: str) -> tuple:
+        return ('date', date)
+
+    @staticmethod
+    def student_key(name: str) -> tuple:
+        return ('student', name)
+
+    @staticmethod
+    def make_etag(payload) -> str:
+        body = json.dumps(payload, sort_keys=True, default=str).encode('utf-8')
+        return hashlib.sha1(body).hexdigest()
+
+    def get(self, key: Hashable, compute: Callable[[], object]) -> Tuple[object, str]:
+        """
+        Cached result for key, computing and storing it on a miss.
+
+        Args:
+            key: date_key() or student_key()
+            compute (callable): Builds the JSON-serializable result
+
+        Returns:
+            tuple: Result and its ETag
+        """
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return entry
+            self.misses += 1
+            generation = self.generation
+
+        payload = compute()
+        entry = (payload, self.make_etag(payload))
+        with self.lock:
+            if generation == self.generation:
+                self.entries[key] = entry
+                if len(self.entries) > self.max_entries:
+                    self.entries.popitem(last=False)
+        return entry
+
+    def record_not_modified(self):
+        with self.lock:
+            self.not_modified += 1
+
+    def invalidate(self, date: Optional[str] = None, names: Iterable[str] = ()):
+        """
+        Drop the results of a date and of the given students (tracker write listener).
+        """
+        keys = [self.student_key(name) for name in names]
+        if date is not None:
+            keys.append(self.date_key(date))
+        with self.lock:
+            self.generation += 1
+            for key in keys:
+                if self.entries.pop(key, None) is not None:
+                    self.invalidations += 1
+
+    def sync(self, source_version):
+        """
+        Clear everything if the store was changed by another connection since the last call.
+        """
+        with self.lock:
+            if source_version == self.source_version:
+                return
+            if self.source_version is not None:
+                self.entries.clear()
+                self.generation += 1
+                self.external_clears += 1
+            self.source_version = source_version
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.generation += 1
+
+    def stats(self) -> dict:
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self.entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'not_modified': self.not_modified,
+                'invalidations': self.invalidations,
+                'external_clears': self.external_clears,
+                'hit_rate': self.hits / lookups if lookups else 0.0
+            }
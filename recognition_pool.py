@@ -0,0 +1,221 @@
+import os
+import time
+import base64
+import cv2
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.util import Finalize
+
+from gallery_store import load_gallery
+from gallery_watcher import GalleryWatcher
+from image_face_recognition_attendance import face_recognition_system
+from shared_gallery import publish_gallery, read_current
+
+# Per-process recognizer, created once by the worker initializer
+_recognizer = None
+
+
+def init_worker(training_images_path, confidence_threshold, shared_gallery=None, detection_scale=1.0):
+    """
+    Load the models and the gallery (or map the shared gallery) once per worker
+    process. Also the initializer of the video_attendance chunk workers.
+    """
+    global _recognizer
+    _recognizer = face_recognition_system(
+        training_images_path,
+        confidence_threshold=confidence_threshold,
+        mark_attendance=False,
+        detection_scale=detection_scale,
+        shared_gallery=shared_gallery,
+        # Work is already spread across the pool, so tiles stay in-process
+        tile_workers=1
+    )
+    # Release the recognizer's resources when the worker process exits
+    Finalize(_recognizer, _recognizer.close, exitpriority=10)
+
+
+def get_recognizer():
+    """
+    Recognizer of this worker process, created by init_worker.
+    """
+    return _recognizer
+
+
+def _ping(_=None):
+    return os.getpid()
+
+
+def _recognize_bytes(image_bytes, annotate=False):
+    """
+    Decode an uploaded image in memory and recognize the faces in it.
+
+    Returns:
+        dict: JSON-ready names, distances, boxes and stage timings in ms,
+        plus the annotated image as base64 JPEG when annotate is set
+    """
+    start = time.perf_counter()
+    img = cv2.imdecode(np.frombuffer(image_bytes, dtype=np.uint8), cv2.IMREAD_COLOR)
+    if img is None:
+        raise ValueError('Could not decode image')
+    decode_seconds = time.perf_counter() - start
+
+    # match_faces picks up a newly published gallery without restarting the worker
+    faces, timings = _recognizer.match_faces(img)
+    timings['decode'] = decode_seconds
+
+    result = {
+        'recognized_names': [face['name'] for face in faces if face['name'] is not None],
+        'unknown_faces_count': sum(1 for face in faces if face['name'] is None),
+        'faces': [
+            {
+                'name': face['name'],
+                'distance': face['distance'] if np.isfinite(face['distance']) else None,
+                'box': dict(zip(('top', 'right', 'bottom', 'left'), (int(v) for v in face['location'])))
+            }
+            for face in faces
+        ],
+        'image_size': {'width': img.shape[1], 'height': img.shape[0]},
+        'worker_pid': os.getpid()
+    }
+
+    if annotate:
+        _recognizer.draw_faces(img, faces)
+        ok, jpeg = cv2.imencode('.jpg', img)
+        if ok:
+            result['annotated_image'] = base64.b64encode(jpeg.tobytes()).decode('ascii')
+
+    timings['total'] = time.perf_counter() - start
+    result['timings_ms'] = {stage: round(seconds * 1000, 2) for stage, seconds in timings.items()}
+    return result
+
+
+class RecognitionPool:
+    def __init__(self, workers=None, training_images_path='Training_images', confidence_threshold=0.6,
+                 shared_gallery='gallery_shared', quantize=None, watch_gallery=True, watch_interval=2.0):
+        """
+        Long-lived recognition worker processes
+
+        Each worker imports dlib once, then takes images from the pool's
+        queue, so per-image latency is detection and encoding only, not
+        interpreter and model startup. The gallery is published once as a
+        memory-mapped snapshot that all workers share, so extra workers cost
+        almost no extra memory. The parent watches the training images and
+        publishes a new snapshot whenever they change (reload_gallery() does
+        the same on demand); workers check the snapshot pointer before each
+        image and switch to the new one without restarting.
+
+        Args:
+            workers (int): Number of worker processes (defaults to CPU count)
+            training_images_path (str): Directory containing known face images
+            confidence_threshold (float): Largest distance accepted as a match
+            shared_gallery (str): Directory gallery snapshots are published to
+            quantize (str): Publish 'float16' or 'int8' snapshots (None = float32)
+            watch_gallery (bool): Publish added, changed and removed training images automatically
+            watch_interval (float): Seconds between checks of the training images
+        """
+        self.workers = workers or os.cpu_count() or 1
+        self.training_images_path = training_images_path
+        self.confidence_threshold = confidence_threshold
+        self.shared_gallery = shared_gallery
+        self.quantize = quantize
+        self.watch_gallery = watch_gallery
+        self.watch_interval = watch_interval
+        self.gallery_watcher = None
+        self.executor = None
+
+    def start(self):
+        """
+        Start the workers and wait until each has loaded the gallery.
+        """
+        if self.executor is not None:
+            return self
+
+        # Bring the gallery store up to date once, so workers only map it
+        if self.watch_gallery:
+            self.gallery_watcher = GalleryWatcher(self.training_images_path, interval=self.watch_interval,
+                                                  on_update=self.publish_matcher)
+            self.publish_matcher(self.gallery_watcher.matcher)
+            self.gallery_watcher.start()
+        else:
+            self.reload_gallery()
+
+        self.executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            initializer=init_worker,
+            initargs=(self.training_images_path, self.confidence_threshold, self.shared_gallery)
+        )
+        pids = set(self.executor.map(_ping, range(self.workers)))
+        print(f"Recognition pool ready: {len(pids)} worker processes")
+        return self
+
+    def publish_matcher(self, matcher):
+        """
+        Publish the gallery of a (float32) matcher as a new shared snapshot.
+        """
+        version = publish_gallery(matcher.known_names, matcher.known_encodings, self.shared_gallery, self.quantize)
+        print(f"Published gallery snapshot {version} ({len(matcher)} known faces)")
+        return version
+
+    def reload_gallery(self):
+        """
+        Sync the gallery store and publish it as a new shared snapshot
+        (with a watcher, only if something changed since the last one).
+
+        Returns:
+            int: Version of the current snapshot
+        """
+        if self.gallery_watcher is not None:
+            self.gallery_watcher.check()
+            return read_current(self.shared_gallery)['version']
+        names, encodings = load_gallery(self.training_images_path)
+        return publish_gallery(names, encodings, self.shared_gallery, self.quantize)
+
+    def submit(self, image_bytes, annotate=False):
+        """
+        Queue an encoded image (JPEG/PNG bytes) for recognition.
+
+        Args:
+            image_bytes (bytes): Encoded image, decoded in the worker
+            annotate (bool): Also return the annotated image as base64 JPEG
+
+        Returns:
+            concurrent.futures.Future: Resolves to the recognition result dict
+        """
+        if self.executor is None:
+            self.start()
+        return self.executor.submit(_recognize_bytes, image_bytes, annotate)
+
+    def recognize_batch(self, images, annotate=False):
+        """
+        Fan a batch of encoded images out across the workers.
+
+        Args:
+            images (list): Encoded image bytes
+            annotate (bool): Also return annotated images
+
+        Returns:
+            list: Result dict per image, in input order; failed images
+            get {'error': message} instead
+        """
+        futures = [self.submit(image_bytes, annotate) for image_bytes in images]
+        results = []
+        for future in futures:
+            try:
+                results.append(future.result())
+            except Exception as e:
+                results.append({'error': str(e)})
+        return results
+
+    def recognize(self, image_bytes):
+        """
+        Recognize faces in one encoded image, waiting for the result.
+        """
+        return self.submit(image_bytes).result()
+
+    def shutdown(self):
+        if self.gallery_watcher is not None:
+            self.gallery_watcher.stop()
+            self.gallery_watcher = None
+        if self.executor is not None:
+            self.executor.shutdown(wait=True)
+            self.executor = None
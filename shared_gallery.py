@@ -0,0 +1,134 @@
+import os
+import glob
+import json
+import numpy as np
+from typing import List, Optional, Tuple, Union
+
+from quantized_gallery import QuantizedGallery
+
+CURRENT_FILE = 'CURRENT'
+
+
+def publish_gallery(names: List[str], encodings: np.ndarray, directory: str = 'gallery_shared',
+                    quantize: Optional[str] = None, keep: int = 2) -> int:
+    """
+    Write a gallery snapshot that worker processes can memory-map.
+
+    Each snapshot is a set of version-numbered files (raw .npy encodings or
+    quantized codes, plus names). The CURRENT pointer file is replaced
+    atomically once the snapshot is complete, so readers never see a half
+    written gallery and pick the new one up on their next check.
+
+    Args:
+        names (list): Name of every encoding
+        encodings (np.ndarray): (N, 128) float32 encodings
+        directory (str): Directory holding the snapshots
+        quantize (str): Store 'float16' or 'int8' codes instead of float32
+        keep (int): Snapshots kept on disk (older ones are deleted; readers
+            still mapping them keep their data until they reload)
+
+    Returns:
+        int: Version number of the new snapshot
+    """
+    os.makedirs(directory, exist_ok=True)
+    current = read_current(directory)
+    version = current['version'] + 1 if current else 1
+    prefix = os.path.join(directory, f'gallery-{version}')
+
+    if quantize:
+        QuantizedGallery.from_encodings(encodings, quantize).save(prefix)
+    else:
+        temp_file = f'{prefix}.codes.tmp.npy'
+        np.save(temp_file, np.ascontiguousarray(encodings, dtype=np.float32))
+        os.replace(temp_file, f'{prefix}.codes.npy')
+    with open(f'{prefix}.names.json', 'w', encoding='utf-8') as f:
+        json.dump(list(names), f)
+
+    temp_file = os.path.join(directory, f'{CURRENT_FILE}.tmp')
+    with open(temp_file, 'w', encoding='utf-8') as f:
+        json.dump({'version': version, 'quantize': quantize, 'count': len(names)}, f)
+    os.replace(temp_file, os.path.join(directory, CURRENT_FILE))
+
+    remove_old_snapshots(directory, version - keep + 1)
+    return version
+
+
+def remove_old_snapshots(directory: str, oldest_kept: int):
+    for path in glob.glob(os.path.join(directory, 'gallery-*.*')):
+        version = os.path.basename(path).split('.')[0].split('-')[-1]
+        if version.isdigit() and int(version) < oldest_kept:
+            try:
+                os.remove(path)
+            except OSError:
+                # Windows refuses to delete files that are still mapped; retried on the next publish
+                pass
+
+
+def read_current(directory: str) -> Optional[dict]:
+    """
+    Read the CURRENT pointer of a snapshot directory (None if nothing was published).
+    """
+    try:
+        with open(os.path.join(directory, CURRENT_FILE), encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+class SharedGallery:
+    def __init__(self, directory: str = 'gallery_shared'):
+        """
+        Read-only, memory-mapped view of the latest published gallery snapshot
+
+        Encodings are opened with np.load(mmap_mode='r'), so every process
+        reading the same snapshot shares the operating system's page cache
+        instead of holding its own copy. changed() is a single stat() call,
+        cheap enough to run before every request.
+
+        Args:
+            directory (str): Directory snapshots are published to
+        """
+        self.directory = directory
+        self.version = None
+        self.pointer_mtime = None
+
+    def changed(self) -> bool:
+        """
+        Whether a newer snapshot has been published since the last load().
+        """
+        try:
+            mtime = os.stat(os.path.join(self.directory, CURRENT_FILE)).st_mtime_ns
+        except OSError:
+            return False
+        if mtime == self.pointer_mtime:
+            return False
+        current = read_current(self.directory)
+        return current is not None and current['version'] != self.version
+
+    def load(self) -> Tuple[List[str], Union[np.ndarray, QuantizedGallery]]:
+        """
+        Map the current snapshot.
+
+        Returns:
+            tuple: Names and either a read-only (N, 128) float32 memmap or a QuantizedGallery
+        """
+        pointer = os.path.join(self.directory, CURRENT_FILE)
+        mtime = os.stat(pointer).st_mtime_ns
+        current = read_current(self.directory)
+        if current is None:
+            raise IOError(f"No gallery snapshot published in {self.directory}")
+
+        prefix = os.path.join(self.directory, f"gallery-{current['version']}")
+        with open(f'{prefix}.names.json', encoding='utf-8') as f:
+            names = json.load(f)
+        if not current.get('count'):
+            # Empty arrays cannot be memory-mapped
+            encodings = np.empty((0, 128), dtype=np.float32)
+        elif current.get('quantize'):
+            encodings = QuantizedGallery.load(prefix, mmap=True)
+        else:
+            encodings = np.load(f'{prefix}.codes.npy', mmap_mode='r')
+
+        self.version = current['version']
+        self.pointer_mtime = mtime
+        return names, encodings
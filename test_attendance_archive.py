@@ -0,0 +1,78 @@
+import pandas as pd
+
+from attendance_archive import COLUMNS, AttendanceArchive
+from attendance_tracker import AttendanceTracker
+
+
+def record(name, date, *times, **values):
+    row = dict.fromkeys(COLUMNS)
+    row.update({'Name': name, 'Date': date})
+    row.update(zip(['In Time 1', 'Out Time 1', 'In Time 2', 'Out Time 2', 'In Time 3', 'Out Time 3'], times))
+    row.update(values)
+    return row
+
+
+RECORDS = pd.DataFrame([
+    record('ALICE', '04/03/2024', '09:00:00', '12:30:00', **{'Session 1 Duration': '3:30:00', 'Total Hours': '3:30:00'}),
+    # 'HH:MM' times, an unparsable value and a non-padded date must come back as written
+    record('BOB', '4/03/2024', '09:00', '10:15', 'late', **{'Session 1 Duration': '1:15:00',
+                                                            'Session 2 Duration': '0:00:00', 'Total Hours': '1:15:00'}),
+    record('ALICE', '05/03/2024', '23:00:00', '01:00:00', **{'Session 1 Duration': '2:00:00', 'Total Hours': '2:00:00'}),
+], columns=COLUMNS)
+
+
+def rows(frame):
+    return [[None if pd.isna(v) else v for v in row] for row in frame[COLUMNS].astype(object).values.tolist()]
+
+
+def test_archived_records_are_restored_exactly(tmp_path):
+    archive = AttendanceArchive(str(tmp_path / 'archive'))
+    archive.write_month('2024-03', RECORDS)
+
+    restored = rows(archive.daily('04/03/2024')) + rows(archive.daily('05/03/2024'))
+
+    assert restored == rows(RECORDS)
+    assert list(archive.student('BOB')['In Time 2']) == ['late']
+    assert archive.daily('04/04/2024') is None
+
+
+def test_typed_columns_hold_seconds(tmp_path):
+    archive = AttendanceArchive(str(tmp_path / 'archive'))
+    archive.write_month('2024-03', RECORDS)
+
+    typed = archive.student('BOB', typed=True).iloc[0]
+
+    assert (typed['In Time 1'], typed['Out Time 1'], typed['In Time 2']) == (32400, 36900, -1)
+
+
+def test_write_day_leaves_other_days_untouched(tmp_path):
+    archive = AttendanceArchive(str(tmp_path / 'archive'))
+    archive.write_month('2024-03', RECORDS)
+    new_day = pd.DataFrame([record('CAROL', '05/03/2024', '08:00', '09:00')], columns=COLUMNS)
+
+    assert archive.write_day('05/03/2024', new_day)
+
+    assert rows(archive.daily('04/03/2024')) == rows(RECORDS.iloc[:2])
+    assert rows(archive.daily('05/03/2024')) == rows(new_day)
+    assert rows(archive.student('CAROL')) == rows(new_day)
+    assert not archive.write_day('05/04/2024', new_day)
+
+
+def test_backdated_marks_update_the_archived_day(tmp_path):
+    csv_file = str(tmp_path / 'Attendance.csv')
+    records = RECORDS.copy()
+    records.loc[1, 'Date'] = '04/03/2024'
+    records.to_csv(csv_file, index=False)
+    tracker = AttendanceTracker(csv_file)
+    try:
+        assert tracker.archive.months() == ['2024-03']
+
+        tracker.mark_attendance('BOB', pd.Timestamp('2024-03-04 11:00:00').to_pydatetime())
+        tracker.flush()
+
+        bob = tracker.get_daily_attendance('04/03/2024').set_index('Name').loc['BOB']
+        assert list(bob[['In Time 1', 'Out Time 1', 'In Time 2', 'Out Time 2']]) == ['09:00', '10:15', 'late', '11:00:00']
+        # The other day of the month is read back unchanged
+        assert rows(tracker.get_daily_attendance('05/03/2024')) == rows(records.iloc[2:])
+    finally:
+        tracker.close()
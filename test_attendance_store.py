@@ -0,0 +1,75 @@
+from attendance_store import SQLiteAttendanceStore
+
+COLUMNS = ['Name', 'Date', 'In Time 1', 'Out Time 1', 'Total Hours']
+
+
+def make_store(tmp_path):
+    return SQLiteAttendanceStore(str(tmp_path / 'attendance.db'), COLUMNS)
+
+
+def record(name, date, in_time='09:00:00', out_time=''):
+    return {'Name': name, 'Date': date, 'In Time 1': in_time, 'Out Time 1': out_time, 'Total Hours': ''}
+
+
+def test_save_records_inserts_then_updates(tmp_path):
+    store = make_store(tmp_path)
+    records = [record('ALICE', '05/03/2024'), record('BOB', '05/03/2024')]
+    store.save_records(records)
+    assert all(r['id'] is not None for r in records)
+
+    records[0]['Out Time 1'] = '12:00:00'
+    store.save_records(records)
+
+    stored = store.records_with_ids('05/03/2024')
+    assert [r['Name'] for r in stored] == ['ALICE', 'BOB']
+    assert stored[0]['Out Time 1'] == '12:00:00'
+    # Empty values are stored as NULL
+    assert stored[1]['Out Time 1'] is None
+    assert store.count() == 2
+    store.close()
+
+
+def test_month_and_range_queries(tmp_path):
+    store = make_store(tmp_path)
+    store.save_records([record('ALICE', '31/01/2024'), record('ALICE', '01/02/2024'),
+                        record('BOB', '15/02/2024'), record('ALICE', '02/03/2025')])
+
+    assert store.months() == ['2024-01', '2024-02', '2025-03']
+    assert list(store.records_for_month('2024-02')['Date']) == ['01/02/2024', '15/02/2024']
+    # Ranges compare whole dates, not the dd/mm/yyyy text
+    between = store.records_between('01/02/2024', '01/03/2025')
+    assert list(between['Date']) == ['01/02/2024', '15/02/2024']
+    assert list(store.records_for_name('ALICE', exclude_months=['2024-01'])['Date']) == ['01/02/2024', '02/03/2025']
+    store.close()
+
+
+def test_update_columns(tmp_path):
+    store = make_store(tmp_path)
+    store.save_records([record('ALICE', '05/03/2024'), record('BOB', '05/03/2024')])
+    frame = store.records_between(with_ids=True)
+
+    store.update_columns(list(frame['id']), {'Total Hours': ['1:00:00', '']})
+
+    stored = store.records_for_date('05/03/2024')
+    assert list(stored['Total Hours']) == ['1:00:00', None]
+    store.close()
+
+
+def test_update_day_sees_other_connections(tmp_path):
+    first = make_store(tmp_path)
+    second = make_store(tmp_path)
+    version = first.data_version()
+
+    second.save_records([record('ALICE', '05/03/2024')])
+    assert first.data_version() != version
+
+    def close_session(records):
+        assert [r['Name'] for r in records] == ['ALICE']
+        records[0]['Out Time 1'] = '12:00:00'
+        return records
+
+    written = first.update_day('05/03/2024', close_session)
+    assert written[0]['id'] is not None
+    assert list(second.records_for_date('05/03/2024')['Out Time 1']) == ['12:00:00']
+    first.close()
+    second.close()
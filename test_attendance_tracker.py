@@ -0,0 +1,149 @@
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from attendance_tracker import AttendanceTracker
+
+DATE = '05/03/2024'
+
+
+def at(clock):
+    return datetime.strptime(f'{DATE} {clock}', '%d/%m/%Y %H:%M:%S')
+
+
+@pytest.fixture
+def make_tracker(tmp_path):
+    trackers = []
+
+    def make(**options):
+        options.setdefault('use_archive', False)
+        options.setdefault('flush_interval', 60.0)
+        tracker = AttendanceTracker(str(tmp_path / 'Attendance.csv'), **options)
+        trackers.append(tracker)
+        return tracker
+
+    yield make
+    for tracker in trackers:
+        tracker.close()
+
+
+def slots(tracker, name):
+    records = tracker.get_daily_attendance(DATE)
+    assert list(records['Name']) == [name]
+    row = records.iloc[0]
+    return [row[c] for c in tracker.SLOT_COLUMNS if row[c]]
+
+
+def test_two_trackers_share_one_record(make_tracker):
+    # E.g. the live recognition script and the API process on the same database
+    first = make_tracker()
+    second = make_tracker()
+
+    first.mark_attendance('ALICE', at('09:00:00'))
+    first.flush()
+    second.mark_attendance('ALICE', at('12:00:00'))
+    second.flush()
+    first.mark_attendance('ALICE', at('13:00:00'))
+    first.flush()
+
+    assert slots(first, 'ALICE') == ['09:00:00', '12:00:00', '13:00:00']
+
+
+def test_unflushed_marks_of_two_trackers_are_merged(make_tracker):
+    first = make_tracker()
+    second = make_tracker()
+
+    first.mark_attendance('ALICE', at('09:00:00'))
+    second.mark_attendance('ALICE', at('10:00:00'))
+    first.flush()
+    second.flush()
+
+    assert slots(second, 'ALICE') == ['09:00:00', '10:00:00']
+    assert second.store.count() == 1
+
+
+def test_backdated_marks_are_merged_in_time_order(make_tracker):
+    # Recorded footage processed after live marks of the same day
+    tracker = make_tracker()
+
+    tracker.mark_attendance('ALICE', at('14:00:00'))
+    tracker.mark_attendance('ALICE', at('09:00:00'))
+    tracker.mark_attendance('ALICE', at('16:30:00'))
+
+    assert slots(tracker, 'ALICE') == ['09:00:00', '14:00:00', '16:30:00']
+    row = tracker.get_daily_attendance(DATE).iloc[0]
+    assert row['Session 1 Duration'] == '5:00:00'
+    # The third mark opened a session that has no Out Time yet
+    assert row['Session 2 Duration'] == '0:00:00'
+    assert row['Total Hours'] == '5:00:00'
+
+
+def test_repeated_marks_are_ignored(make_tracker):
+    tracker = make_tracker()
+    marks = ['09:00:00', '10:00:00', '09:00:10', '10:00:20']
+
+    for clock in marks:
+        tracker.mark_attendance('ALICE', at(clock))
+    # Processing the same footage again changes nothing
+    for clock in marks:
+        tracker.mark_attendance('ALICE', at(clock))
+
+    assert slots(tracker, 'ALICE') == ['09:00:00', '10:00:00']
+
+
+def test_open_sessions_count_as_zero(make_tracker):
+    tracker = make_tracker()
+    hours = tracker.calculate_record_hours({'In Time 1': '09:00', 'Out Time 1': '', 'In Time 2': '',
+                                            'Out Time 2': '', 'In Time 3': '', 'Out Time 3': ''})
+    assert hours == {'Session 1 Duration': '0:00:00', 'Session 2 Duration': '0:00:00',
+                     'Session 3 Duration': '0:00:00', 'Total Hours': '0:00:00'}
+
+
+def random_records(count, seed=0):
+    rng = np.random.RandomState(seed)
+    records = {}
+    for i in range(1, 4):
+        in_seconds = rng.randint(0, 86400, count)
+        out_seconds = (in_seconds + rng.randint(0, 36000, count)) % 86400
+        used = rng.rand(count) < 0.9 / i
+        # Some sessions are still open: an In Time without an Out Time
+        closed = used & (rng.rand(count) < 0.8)
+        time_format = '%H:%M:%S' if i < 3 else '%H:%M'
+        records[f'In Time {i}'] = [pd.Timestamp(s, unit='s').strftime(time_format) if u else ''
+                                   for s, u in zip(in_seconds, used)]
+        records[f'Out Time {i}'] = [pd.Timestamp(s, unit='s').strftime(time_format) if c else None
+                                    for s, c in zip(out_seconds, closed)]
+    return pd.DataFrame(records)
+
+
+def test_bulk_hours_match_per_record_hours(make_tracker):
+    tracker = make_tracker()
+    records = random_records(2000)
+    # Missing, padded, invalid and mixed-format values
+    edge_cases = [('', ''), ('09:00:00', ''), (None, '10:00'), (float('nan'), None), ('  ', '10:00'),
+                  (' 09:00 ', '10:30'), ('25:00', '10:00'), ('x', 'y'), ('09:00', '10:00:00'), ('9:05', '10:00'),
+                  ('23:00:00', '01:30:00')]
+    for row, (in_time, out_time) in enumerate(edge_cases):
+        records.at[row, 'In Time 1'] = in_time
+        records.at[row, 'Out Time 1'] = out_time
+
+    bulk = tracker.calculate_hours_bulk(records)
+    per_record = pd.DataFrame([tracker.calculate_record_hours(r) for r in records.to_dict('records')],
+                              index=records.index)
+
+    pd.testing.assert_frame_equal(bulk[per_record.columns], per_record)
+    assert bulk.loc[1, 'Session 1 Duration'] == '0:00:00'
+
+
+def test_recompute_hours_repairs_stored_durations(make_tracker):
+    tracker = make_tracker()
+    tracker.mark_attendance('ALICE', at('09:00:00'))
+    tracker.mark_attendance('ALICE', at('11:00:00'))
+    tracker.flush()
+    frame = tracker.store.records_between(with_ids=True)
+    tracker.store.update_columns(list(frame['id']), {'Total Hours': ['9:99:99']})
+
+    assert tracker.recompute_hours() == 1
+    assert tracker.get_daily_attendance(DATE).iloc[0]['Total Hours'] == '2:00:00'
@@ -0,0 +1,124 @@
+import numpy as np
+import pytest
+
+from face_matcher import FaceMatcher
+
+
+def make_gallery(count, seed=0):
+    rng = np.random.RandomState(seed)
+    encodings = rng.normal(0, 0.1, (count, 128)).astype(np.float32)
+    return [f'PERSON {i}' for i in range(count)], encodings
+
+
+def brute_force(encodings, queries):
+    return np.array([[np.linalg.norm(q - e) for e in encodings] for q in queries])
+
+
+def test_distances_match_brute_force():
+    names, encodings = make_gallery(50)
+    queries = make_gallery(7, seed=1)[1]
+
+    np.testing.assert_allclose(FaceMatcher(encodings, names).distances(queries),
+                               brute_force(encodings, queries), rtol=1e-4, atol=1e-5)
+
+
+def test_match_returns_nearest_first():
+    names, encodings = make_gallery(50)
+    queries = make_gallery(7, seed=1)[1]
+    expected = brute_force(encodings, queries)
+
+    results = FaceMatcher(encodings, names).match(queries, k=3)
+
+    for row, candidates in zip(expected, results):
+        nearest = np.argsort(row)[:3]
+        assert [name for name, _ in candidates] == [names[i] for i in nearest]
+        np.testing.assert_allclose([d for _, d in candidates], row[nearest], rtol=1e-4)
+
+
+def test_identify_applies_the_tolerance():
+    names, encodings = make_gallery(10)
+    matcher = FaceMatcher(encodings, names, tolerance=0.5)
+    queries = np.stack([encodings[3] + 0.01, np.full(128, 5.0, dtype=np.float32)])
+
+    (name, distance), (stranger, _) = matcher.identify(queries)
+
+    assert name == 'PERSON 3' and distance < 0.5
+    assert stranger is None
+    assert matcher.identify(queries[1:], tolerance=100.0)[0][0] is not None
+
+
+def test_empty_gallery_and_no_faces():
+    names, encodings = make_gallery(3)
+
+    assert FaceMatcher([], []).identify(np.zeros((2, 128))) == [(None, float('inf'))] * 2
+    assert FaceMatcher(encodings, names).match(np.empty((0, 128))) == []
+
+
+def test_names_must_match_encodings():
+    with pytest.raises(ValueError):
+        FaceMatcher(np.zeros((2, 128)), ['ONLY ONE'])
+
+
+def test_ivf_with_every_cell_probed_is_exact():
+    names, encodings = make_gallery(2000)
+    queries = make_gallery(20, seed=1)[1]
+    exact = FaceMatcher(encodings, names).search(queries, k=5)
+
+    ivf = FaceMatcher(encodings, names, index='ivf', n_lists=16, n_probe=16)
+    indices, distances = ivf.search(queries, k=5)
+
+    np.testing.assert_array_equal(indices, exact[0])
+    np.testing.assert_allclose(distances, exact[1], rtol=1e-4)
+
+
+def test_ivf_recall_on_clustered_gallery():
+    rng = np.random.RandomState(0)
+    centres = rng.normal(0, 1, (40, 128)).astype(np.float32)
+    encodings = (centres[rng.randint(0, 40, 4000)] + rng.normal(0, 0.05, (4000, 128))).astype(np.float32)
+    names = [f'PERSON {i}' for i in range(len(encodings))]
+    queries = encodings[rng.choice(len(encodings), 100, replace=False)] + 0.01
+
+    exact, _ = FaceMatcher(encodings, names).search(queries)
+    approximate, _ = FaceMatcher(encodings, names, index='ivf', n_probe=8).search(queries)
+
+    assert (exact[:, 0] == approximate[:, 0]).mean() >= 0.95
+
+
+def names_of(matcher):
+    return sorted(zip(matcher.keys, matcher.known_names))
+
+
+def test_updated_matches_a_fresh_matcher():
+    names, encodings = make_gallery(500)
+    keys = [f'{name}.jpg' for name in names]
+    matcher = FaceMatcher(encodings, names, index='ivf', keys=keys)
+    added_names, added = make_gallery(5, seed=2)
+    added_names = [f'NEW {name}' for name in added_names]
+
+    updated = matcher.updated(removed_keys=keys[:3], added_keys=[f'{n}.jpg' for n in added_names],
+                              added_names=added_names, added_encodings=added)
+
+    assert updated.version == matcher.version + 1
+    assert len(updated) == 502
+    assert names_of(updated) == sorted(list(zip(keys[3:], names[3:])) +
+                                       [(f'{n}.jpg', n) for n in added_names])
+    # A few changed rows keep the trained cells
+    assert updated.index.centroids is matcher.index.centroids
+    assert updated.identify(added[:1])[0][0] == added_names[0]
+    # The original matcher is untouched
+    assert len(matcher) == 500
+
+
+def test_updated_retrains_cells_once_the_gallery_outgrows_them():
+    names, encodings = make_gallery(4)
+    matcher = FaceMatcher(encodings, names, index='ivf', keys=names)
+    added_names, added = make_gallery(400, seed=3)
+    added_names = [f'NEW {name}' for name in added_names]
+
+    grown = matcher.updated(added_keys=added_names, added_names=added_names, added_encodings=added)
+
+    assert grown.index.trained_rows == 404
+    assert len(grown.index.centroids) > len(matcher.index.centroids)
+    exact, _ = FaceMatcher(grown.known_encodings, grown.known_names).search(added[:10])
+    approximate, _ = grown.search(added[:10])
+    np.testing.assert_array_equal(approximate[:, 0], exact[:, 0])
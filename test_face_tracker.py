@@ -0,0 +1,66 @@
+import numpy as np
+
+from face_tracker import FaceTracker, iou_matrix
+
+
+def box(left, top, size=40):
+    # (top, right, bottom, left)
+    return (top, left + size, top + size, left)
+
+
+def test_iou_matrix():
+    iou = iou_matrix([box(0, 0), box(100, 100)], [box(0, 0), box(20, 0), box(200, 200)])
+
+    np.testing.assert_allclose(iou, [[1.0, 1 / 3, 0.0], [0.0, 0.0, 0.0]], atol=1e-6)
+
+
+def test_tracks_follow_moving_faces():
+    tracker = FaceTracker()
+    first = tracker.update([box(0, 0), box(200, 0)])
+    # Detection order changes and both faces moved a little
+    second = tracker.update([box(205, 3), box(4, 2)])
+
+    assert [t.id for t in second] == [first[1].id, first[0].id]
+    assert second[0].location == box(205, 3)
+
+
+def test_tracks_age_out_after_max_missed_frames():
+    tracker = FaceTracker(max_missed=2)
+    track = tracker.update([box(0, 0)])[0]
+    for _ in range(2):
+        tracker.update([])
+    assert tracker.tracks == [track]
+
+    tracker.update([])
+    assert tracker.tracks == []
+    # The face coming back starts a new track
+    assert tracker.update([box(0, 0)])[0].id != track.id
+
+
+def test_confident_tracks_are_reencoded_less_often():
+    tracker = FaceTracker(reencode_every=10, low_confidence_every=3, confident_distance=0.45)
+    known, unsure = tracker.update([box(0, 0), box(200, 0)])
+    assert tracker.select_for_encoding([known, unsure]) == [known, unsure]
+    tracker.set_identity(known, 'ALICE', 0.3)
+    tracker.set_identity(unsure, 'BOB', 0.55)
+
+    encoded_on = {known.id: [], unsure.id: []}
+    for frame in range(1, 13):
+        tracks = tracker.update([box(0, 0), box(200, 0)])
+        for track in tracker.select_for_encoding(tracks):
+            tracker.set_identity(track, track.name, track.distance)
+            encoded_on[track.id].append(frame)
+
+    assert encoded_on == {known.id: [10], unsure.id: [3, 6, 9, 12]}
+    assert tracker.stats()['encoded'] == 2 + 5
+
+
+def test_invalidate_forces_a_reencode():
+    tracker = FaceTracker()
+    track = tracker.update([box(0, 0)])[0]
+    tracker.set_identity(track, 'ALICE', 0.3)
+    assert tracker.select_for_encoding(tracker.update([box(0, 0)])) == []
+
+    tracker.invalidate()
+
+    assert tracker.select_for_encoding(tracker.update([box(0, 0)])) == [track]
@@ -0,0 +1,141 @@
+import os
+import threading
+
+import numpy as np
+import pytest
+
+pytest.importorskip('face_recognition')
+
+import gallery_store
+from gallery_store import GalleryStore, load_gallery
+
+
+@pytest.fixture
+def encoded(monkeypatch):
+    """
+    Replace face encoding with one derived from the file content, recording every encoded file.
+    """
+    calls = []
+
+    def fake_encode_file(file_path):
+        calls.append(os.path.basename(file_path))
+        with open(file_path, 'rb') as f:
+            content = f.read()
+        if content == b'no face':
+            return None, 0
+        encoding = np.frombuffer(content.ljust(128, b'\0')[:128], dtype=np.uint8).astype(np.float32)
+        return encoding, 1
+
+    monkeypatch.setattr(gallery_store, 'encode_file', fake_encode_file)
+    return calls
+
+
+def write_image(folder, file_name, content):
+    path = folder / file_name
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(content)
+    return path
+
+
+def make_store(tmp_path):
+    return GalleryStore(str(tmp_path / 'images'), str(tmp_path / 'gallery_store.npz'))
+
+
+def test_sync_encodes_each_image_once(tmp_path, encoded):
+    images = tmp_path / 'images'
+    write_image(images, 'ALICE.jpg', b'alice')
+    write_image(images, 'BOB.png', b'bob')
+
+    assert make_store(tmp_path).sync(workers=1)
+    assert sorted(encoded) == ['ALICE.jpg', 'BOB.png']
+
+    # A new store instance reads the saved file and encodes nothing
+    store = make_store(tmp_path)
+    assert not store.sync(workers=1)
+    assert len(encoded) == 2
+    assert store.names == ['ALICE', 'BOB']
+    assert store.encodings.shape == (2, 128)
+    assert store.encodings.dtype == np.float32
+
+
+def test_sync_picks_up_changed_renamed_and_removed_images(tmp_path, encoded):
+    images = tmp_path / 'images'
+    write_image(images, 'ALICE.jpg', b'alice')
+    write_image(images, 'BOB.jpg', b'bob')
+    write_image(images, 'CAROL.jpg', b'carol')
+    make_store(tmp_path).sync(workers=1)
+    encoded.clear()
+
+    write_image(images, 'ALICE.jpg', b'alice, new photo')
+    os.rename(images / 'BOB.jpg', images / 'ROBERT.jpg')
+    os.remove(images / 'CAROL.jpg')
+
+    store = make_store(tmp_path)
+    assert store.sync(workers=1)
+    # The renamed image has known content, so only the changed one is encoded
+    assert encoded == ['ALICE.jpg']
+    assert store.names == ['ALICE', 'ROBERT']
+    assert store.encodings[0][:5].tobytes() == np.frombuffer(b'alice', dtype=np.uint8).astype(np.float32).tobytes()
+
+
+def test_images_without_faces_are_kept_out_of_the_gallery(tmp_path, encoded):
+    images = tmp_path / 'images'
+    write_image(images, 'ALICE.jpg', b'alice')
+    write_image(images, 'EMPTY.jpg', b'no face')
+
+    store = make_store(tmp_path)
+    store.sync(workers=1)
+
+    assert store.names == ['ALICE']
+    assert store.problems() == [('EMPTY.jpg', 0)]
+    # Not re-encoded on the next sync either
+    encoded.clear()
+    make_store(tmp_path).sync(workers=1)
+    assert encoded == []
+
+
+def test_folders_hold_several_images_of_one_person(tmp_path, encoded):
+    images = tmp_path / 'images'
+    write_image(images, 'ALICE/1.jpg', b'alice one')
+    write_image(images, 'ALICE/2.jpg', b'alice two')
+    write_image(images, 'BOB.jpg', b'bob')
+
+    names, encodings = load_gallery(str(images), str(tmp_path / 'gallery_store.npz'))
+
+    assert names == ['ALICE', 'ALICE', 'BOB']
+    assert len(encodings) == 3
+
+
+def test_add_image_enrols_without_a_full_sync(tmp_path, encoded):
+    source = write_image(tmp_path / 'uploads', 'photo.jpg', b'dave')
+    store = make_store(tmp_path)
+
+    assert store.add_image(str(source), name='DAVE') == 1
+    assert (tmp_path / 'images' / 'DAVE.jpg').exists()
+    assert make_store(tmp_path).names == ['DAVE']
+
+
+def test_concurrent_saves_leave_a_complete_store(tmp_path, encoded):
+    images = tmp_path / 'images'
+    for i in range(20):
+        write_image(images, f'STUDENT {i}.jpg', f'student {i}'.encode())
+    make_store(tmp_path).sync(workers=1)
+    errors = []
+
+    def save_repeatedly():
+        store = make_store(tmp_path)
+        try:
+            for _ in range(20):
+                store.save()
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=save_repeatedly) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert len(make_store(tmp_path).names) == 20
+    assert sorted(os.listdir(tmp_path)) == ['gallery_store.npz', 'gallery_store.npz.lock', 'images']
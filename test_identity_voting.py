@@ -0,0 +1,57 @@
+import pytest
+
+from identity_voting import IdentityVoter
+
+
+def test_name_is_committed_after_enough_consistent_votes():
+    voter = IdentityVoter(window=5, min_votes=3, commit_distance=0.5)
+
+    assert voter.observe(1, 'ALICE', 0.4) == (None, float('inf'), False)
+    assert voter.observe(1, None, 0.7)[0] is None
+    assert voter.observe(1, 'ALICE', 0.4)[0] is None
+    name, distance, committed = voter.observe(1, 'ALICE', 0.4)
+
+    assert (name, committed) == ('ALICE', True)
+    assert distance == pytest.approx(0.4)
+    # Later votes keep the name without committing it again
+    assert voter.observe(1, 'ALICE', 0.3)[::2] == ('ALICE', False)
+    assert voter.stats()['commits'] == 1
+
+
+def test_no_commit_without_a_majority_or_close_matches():
+    voter = IdentityVoter(window=5, min_votes=2, commit_distance=0.5)
+    # ALICE gets min_votes but never more than half of the window
+    for name in ('ALICE', None, 'BOB', 'ALICE', None):
+        assert voter.observe(1, name, 0.3)[0] is None
+
+    for _ in range(5):
+        assert voter.observe(2, 'CAROL', 0.55)[0] is None
+
+
+def test_name_is_revoked_after_a_window_without_votes():
+    voter = IdentityVoter(window=3, min_votes=2)
+    voter.observe(1, 'ALICE', 0.3)
+    assert voter.observe(1, 'ALICE', 0.3)[0] == 'ALICE'
+
+    voter.observe(1, None, 0.8)
+    voter.observe(1, None, 0.8)
+    assert voter.observe(1, None, 0.8)[0] is None
+    assert voter.stats()['revoked'] == 1
+
+
+def test_tracks_vote_independently_and_are_forgotten():
+    voter = IdentityVoter(window=3, min_votes=2)
+    for _ in range(2):
+        voter.observe(1, 'ALICE', 0.3)
+        voter.observe(2, 'BOB', 0.3)
+    assert voter.identities == {1: 'ALICE', 2: 'BOB'}
+
+    voter.retain([2])
+
+    assert voter.identities == {2: 'BOB'}
+    assert voter.stats()['tracks'] == 1
+
+
+def test_min_votes_cannot_exceed_window():
+    with pytest.raises(ValueError):
+        IdentityVoter(window=3, min_votes=4)
@@ -0,0 +1,95 @@
+import cv2
+import numpy as np
+import pytest
+
+pytest.importorskip('face_recognition')
+
+import motion_gate
+from motion_gate import MotionGate, locate_faces_in_regions
+
+
+def frame_with(square=None, color=(255, 255, 255), size=(240, 320)):
+    frame = np.zeros(size + (3,), dtype=np.uint8)
+    if square is not None:
+        x, y, side = square
+        frame[y:y + side, x:x + side] = color
+    return frame
+
+
+def test_still_frames_are_skipped():
+    gate = MotionGate()
+
+    assert gate.check(frame_with()) == (True, [])
+    assert gate.check(frame_with()) == (False, [])
+    assert gate.stats()['skipped'] == 1
+
+
+def test_moving_object_gives_a_region_around_it():
+    gate = MotionGate()
+    gate.check(frame_with())
+
+    moved, regions = gate.check(frame_with((100, 80, 40)))
+
+    assert moved and len(regions) == 1
+    x, y, w, h = regions[0]
+    assert x <= 100 and y <= 80 and x + w >= 140 and y + h >= 120
+    assert w * h < 320 * 240 / 2
+
+
+def test_frames_are_read_as_rgb():
+    # Pure red is brighter than pure blue in grey (0.299 against 0.114 of 255)
+    for color, moved in (((255, 0, 0), True), ((0, 0, 255), False)):
+        gate = MotionGate(pixel_threshold=50)
+        gate.check(frame_with())
+        assert gate.check(frame_with((100, 80, 40), color))[0] == moved
+
+
+@pytest.fixture
+def detector(monkeypatch):
+    """
+    Face detector finding every filled rectangle of a crop, padded by 3 pixels like a loose face box.
+    """
+    def face_locations(crop):
+        mask = (crop.max(axis=2) > 0).astype(np.uint8)
+        contours = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)[-2]
+        boxes = []
+        for contour in contours:
+            x, y, w, h = cv2.boundingRect(contour)
+            boxes.append((y - 3, x + w + 3, y + h + 3, x - 3))
+        return sorted(boxes, key=lambda b: b[3])
+
+    monkeypatch.setattr(motion_gate.face_recognition, 'face_locations', face_locations)
+
+
+def draw_faces(*lefts):
+    image = np.zeros((200, 240, 3), dtype=np.uint8)
+    for left in lefts:
+        image[53:87, left:left + 34] = 255
+    return image
+
+
+def test_touching_neighbours_are_both_kept(detector):
+    # The previous face sits at x 50-90; a new face walks in right next to it
+    image = draw_faces(53, 92)
+    previous = [(50, 90, 90, 50)]
+
+    locations = locate_faces_in_regions(image, [(92, 53, 34, 34)], previous)
+
+    assert sorted(locations, key=lambda b: b[3]) == [(50, 90, 90, 50), (50, 129, 90, 89)]
+
+
+def test_faces_in_overlapping_regions_are_found_once(detector):
+    image = draw_faces(92)
+
+    locations = locate_faces_in_regions(image, [(80, 40, 40, 60), (100, 50, 40, 60)], [])
+
+    assert locations == [(50, 129, 90, 89)]
+
+
+def test_faces_outside_changed_regions_are_kept(detector):
+    image = draw_faces(150)
+    still_face = (10, 40, 40, 10)
+
+    locations = locate_faces_in_regions(image, [(150, 53, 34, 34)], [still_face])
+
+    assert locations == [still_face, (50, 187, 90, 147)]
@@ -0,0 +1,60 @@
+import numpy as np
+import pytest
+
+from face_matcher import FaceMatcher
+from quantized_gallery import QuantizedGallery
+
+
+def make_encodings(count, seed=0):
+    return np.random.RandomState(seed).normal(0, 0.1, (count, 128)).astype(np.float32)
+
+
+@pytest.mark.parametrize('dtype, tolerance', [('float16', 1e-3), ('int8', 1e-2)])
+def test_dequantized_rows_are_close(dtype, tolerance):
+    encodings = make_encodings(100)
+    gallery = QuantizedGallery.from_encodings(encodings, dtype)
+
+    assert gallery.dtype == dtype
+    assert gallery.nbytes < encodings.nbytes / 1.9
+    np.testing.assert_allclose(gallery.dequantize(), encodings, atol=tolerance)
+
+
+@pytest.mark.parametrize('dtype', ['float16', 'int8'])
+def test_distances_match_the_dequantized_rows(dtype):
+    encodings = make_encodings(300)
+    queries = make_encodings(5, seed=1)
+    gallery = QuantizedGallery.from_encodings(encodings, dtype)
+
+    rows = gallery.dequantize()
+    expected = ((queries[:, None, :] - rows[None, :, :]) ** 2).sum(axis=2)
+    np.testing.assert_allclose(gallery.squared_distances(queries, block_rows=64), expected, rtol=1e-4, atol=1e-5)
+
+
+def test_quantized_matcher_finds_the_same_people():
+    encodings = make_encodings(500)
+    names = [f'PERSON {i}' for i in range(500)]
+    queries = encodings[::25] + 0.005
+
+    exact = FaceMatcher(encodings, names).identify(queries)
+    quantized = FaceMatcher(encodings, names, quantize='int8').identify(queries)
+
+    assert [n for n, _ in quantized] == [n for n, _ in exact]
+
+
+def test_save_load_take_and_concatenate(tmp_path):
+    gallery = QuantizedGallery.from_encodings(make_encodings(10), 'int8')
+    prefix = str(tmp_path / 'gallery')
+    gallery.save(prefix)
+
+    loaded = QuantizedGallery.load(prefix)
+    np.testing.assert_array_equal(loaded.codes, gallery.codes)
+    np.testing.assert_array_equal(loaded.norms, gallery.norms)
+
+    joined = loaded.take(np.array([3, 1])).concatenate(gallery.take(np.array([7])))
+    np.testing.assert_array_equal(joined.codes, gallery.codes[[3, 1, 7]])
+    np.testing.assert_allclose(joined.norms, gallery.norms[[3, 1, 7]])
+
+
+def test_int8_codes_need_scales():
+    with pytest.raises(ValueError):
+        QuantizedGallery(np.zeros((2, 128), dtype=np.int8))
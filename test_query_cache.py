@@ -0,0 +1,71 @@
+from query_cache import QueryCache
+
+
+def counting(payload):
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return payload
+    return compute, calls
+
+
+def test_hit_returns_cached_result_and_etag():
+    cache = QueryCache()
+    compute, calls = counting([{'Name': 'ALICE'}])
+
+    first = cache.get(cache.date_key('05/03/2024'), compute)
+    second = cache.get(cache.date_key('05/03/2024'), compute)
+
+    assert first == second
+    assert first[1] == QueryCache.make_etag([{'Name': 'ALICE'}])
+    assert len(calls) == 1
+    assert cache.stats()['hits'] == 1
+
+
+def test_invalidate_drops_only_the_written_date_and_students():
+    cache = QueryCache()
+    keys = [cache.date_key('05/03/2024'), cache.date_key('06/03/2024'),
+            cache.student_key('ALICE'), cache.student_key('BOB')]
+    for key in keys:
+        cache.get(key, lambda: [])
+
+    cache.invalidate('05/03/2024', ['ALICE'])
+
+    assert set(cache.entries) == {cache.date_key('06/03/2024'), cache.student_key('BOB')}
+    assert cache.stats()['invalidations'] == 2
+
+
+def test_result_computed_across_a_write_is_not_cached():
+    cache = QueryCache()
+    key = cache.date_key('05/03/2024')
+
+    def compute_during_write():
+        cache.invalidate('05/03/2024', [])
+        return ['stale']
+
+    assert cache.get(key, compute_during_write)[0] == ['stale']
+    assert key not in cache.entries
+
+
+def test_sync_clears_on_external_writes_only():
+    cache = QueryCache()
+    cache.sync(1)
+    cache.get(cache.student_key('ALICE'), lambda: [])
+
+    cache.sync(1)
+    assert len(cache.entries) == 1
+
+    cache.sync(2)
+    assert len(cache.entries) == 0
+    assert cache.stats()['external_clears'] == 1
+
+
+def test_least_recently_used_entries_are_dropped():
+    cache = QueryCache(max_entries=2)
+    cache.get('a', lambda: 1)
+    cache.get('b', lambda: 2)
+    cache.get('a', lambda: 1)
+    cache.get('c', lambda: 3)
+
+    assert list(cache.entries) == ['a', 'c']
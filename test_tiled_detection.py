@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+
+pytest.importorskip('face_recognition')
+
+import tiled_detection
+from tiled_detection import TiledDetector, make_tiles, merge_detections
+
+
+def test_tiles_cover_the_image_with_overlap():
+    tiles = make_tiles(height=1500, width=2500, tile_size=1024, overlap=192)
+
+    covered = np.zeros((1500, 2500), dtype=bool)
+    for y0, x0, y1, x1 in tiles:
+        assert y1 - y0 <= 1024 and x1 - x0 <= 1024
+        covered[y0:y1, x0:x1] = True
+    assert covered.all()
+    # Neighbouring tiles share at least the overlap
+    xs = sorted({x0 for _, x0, _, _ in tiles})
+    assert all(a + 1024 - b >= 192 for a, b in zip(xs, xs[1:]))
+
+
+def test_small_image_is_one_tile():
+    assert make_tiles(300, 400, 1024, 192) == [(0, 0, 300, 400)]
+
+
+def test_merge_keeps_the_larger_of_duplicate_boxes():
+    full = (100, 200, 200, 100)
+    shifted = (102, 203, 201, 101)
+    # A face cut by a tile border: mostly inside the full box
+    cut = (100, 150, 200, 100)
+
+    assert merge_detections([cut, shifted, full]) == [shifted]
+
+
+def test_merge_keeps_neighbouring_faces():
+    left = (100, 200, 200, 100)
+    touching = (100, 295, 200, 195)
+
+    assert sorted(merge_detections([left, touching]), key=lambda b: b[3]) == [left, touching]
+    assert merge_detections([]) == []
+
+
+def test_detect_maps_tile_faces_to_image_coordinates(monkeypatch):
+    image = np.zeros((1200, 2000, 3), dtype=np.uint8)
+    # One bright square "face" straddling a tile border
+    image[500:600, 790:890] = 255
+
+    def face_locations(tile):
+        ys, xs = np.nonzero(tile.max(axis=2))
+        if len(ys) == 0:
+            return []
+        return [(ys.min(), xs.max() + 1, ys.max() + 1, xs.min())]
+
+    monkeypatch.setattr(tiled_detection.face_recognition, 'face_locations', face_locations)
+    detector = TiledDetector(tile_size=1024, overlap=192, coarse_scale=0, workers=1)
+
+    assert detector.detect(image) == [(500, 890, 600, 790)]
+    detector.shutdown()
@@ -0,0 +1,69 @@
+import threading
+
+from ttl_cache import TTLCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_keys_are_debounced_until_they_expire():
+    clock = FakeClock()
+    cache = TTLCache(ttl=30, clock=clock)
+
+    assert cache.add('ALICE')
+    clock.now = 29.9
+    assert not cache.add('ALICE')
+    assert 'ALICE' in cache
+
+    clock.now = 30.0
+    assert 'ALICE' not in cache
+    assert cache.add('ALICE')
+    assert cache.stats()['expired'] == 1
+
+
+def test_a_hit_does_not_extend_the_expiry():
+    clock = FakeClock()
+    cache = TTLCache(ttl=10, clock=clock)
+    cache.add('ALICE')
+
+    clock.now = 9
+    cache.add('ALICE')
+    clock.now = 10
+
+    assert cache.add('ALICE')
+
+
+def test_full_cache_evicts_the_key_closest_to_expiry():
+    clock = FakeClock()
+    cache = TTLCache(ttl=10, max_size=2, clock=clock)
+    cache.add('ALICE')
+    clock.now = 1
+    cache.add('BOB')
+    clock.now = 2
+    cache.add('CAROL')
+
+    assert len(cache) == 2
+    assert 'ALICE' not in cache and 'BOB' in cache and 'CAROL' in cache
+    assert cache.stats()['evicted'] == 1
+
+
+def test_each_key_is_added_once_across_threads():
+    cache = TTLCache(ttl=60)
+    added = []
+
+    def add_all():
+        added.extend(name for name in (f'STUDENT {i}' for i in range(500)) if cache.add(name))
+
+    threads = [threading.Thread(target=add_all) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(added) == sorted(f'STUDENT {i}' for i in range(500))
+    assert cache.stats()['hits'] == 3 * 500
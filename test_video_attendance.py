@@ -0,0 +1,50 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+pytest.importorskip('face_recognition')
+
+from attendance_tracker import AttendanceTracker
+from video_attendance import plan_chunks, sightings_to_events
+
+
+def test_plan_chunks_cover_the_video_on_step_boundaries():
+    chunks = plan_chunks(frame_count=1000, fps=25.0, chunk_seconds=10.0, step=25)
+
+    assert chunks[0] == (0, 250)
+    assert chunks[-1][1] == 1000
+    assert all(start % 25 == 0 for start, _ in chunks)
+    assert all(a[1] == b[0] for a, b in zip(chunks, chunks[1:]))
+
+
+def test_sightings_to_events():
+    sightings = [(65.0, 'ALICE', 0.4), (0.0, 'ALICE', 0.3), (30.0, 'ALICE', 0.5),
+                 (10.0, 'BOB', 0.4),
+                 # Back after more than absence_gap unseen
+                 (500.0, 'ALICE', 0.4), (520.0, 'ALICE', 0.4)]
+
+    events = sightings_to_events(sightings, absence_gap=300)
+
+    # A single sighting gives an in event only
+    assert events == [(0.0, 'ALICE'), (10.0, 'BOB'), (65.0, 'ALICE'), (500.0, 'ALICE'), (520.0, 'ALICE')]
+
+
+def test_video_events_marked_after_live_marks(tmp_path):
+    tracker = AttendanceTracker(str(tmp_path / 'Attendance.csv'), use_archive=False)
+    recording_start = datetime(2024, 3, 5, 9, 0, 0)
+    try:
+        # A live camera marked ALICE before the recording was processed
+        tracker.mark_attendance('ALICE', datetime(2024, 3, 5, 12, 0, 0))
+
+        events = sightings_to_events([(0.0, 'ALICE', 0.4), (3600.0, 'ALICE', 0.4)], absence_gap=7200)
+        for _ in range(2):
+            # Processing the footage twice must not add slots
+            for seconds, name in events:
+                tracker.mark_attendance(name, recording_start + timedelta(seconds=seconds))
+
+        row = tracker.get_daily_attendance('05/03/2024').iloc[0]
+        assert [row['In Time 1'], row['Out Time 1'], row['In Time 2']] == ['09:00:00', '10:00:00', '12:00:00']
+        assert row['Out Time 2'] is None
+        assert row['Total Hours'] == '1:00:00'
+    finally:
+        tracker.close()
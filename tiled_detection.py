@@ -0,0 +1,145 @@
+import os
+import cv2
+import face_recognition
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Sequence, Tuple
+
+
+def make_tiles(height: int, width: int, tile_size: int, overlap: int) -> List[Tuple[int, int, int, int]]:
+    """
+    Split an image into overlapping tiles.
+
+    Args:
+        height (int): Image height
+        width (int): Image width
+        tile_size (int): Tile side in pixels
+        overlap (int): Pixels shared by neighbouring tiles
+
+    Returns:
+        list: (y0, x0, y1, x1) tile bounds covering the whole image
+    """
+    step = max(1, tile_size - overlap)
+
+    def starts(length):
+        if length <= tile_size:
+            return [0]
+        positions = list(range(0, length - tile_size, step))
+        # Last tile is flush with the edge
+        positions.append(length - tile_size)
+        return positions
+
+    return [
+        (y, x, min(height, y + tile_size), min(width, x + tile_size))
+        for y in starts(height) for x in starts(width)
+    ]
+
+
+def merge_detections(locations: Sequence, iou_threshold: float = 0.3, containment: float = 0.6) -> List[Tuple[int, int, int, int]]:
+    """
+    Non-maximum suppression for face boxes without scores.
+
+    Larger boxes win, since a face cut by a tile border is detected as a
+    smaller box mostly contained in the full one.
+
+    Args:
+        locations (list): (top, right, bottom, left) boxes
+        iou_threshold (float): IoU above which two boxes are the same face
+        containment (float): Fraction of the smaller box covered above which it is dropped
+
+    Returns:
+        list: Kept boxes
+    """
+    if not locations:
+        return []
+    boxes = np.asarray(locations, dtype=np.float32)
+    top, right, bottom, left = boxes.T
+    areas = (right - left) * (bottom - top)
+    order = np.argsort(-areas)
+
+    keep = []
+    while len(order):
+        i = order[0]
+        keep.append(i)
+        rest = order[1:]
+        inter_h = np.clip(np.minimum(bottom[i], bottom[rest]) - np.maximum(top[i], top[rest]), 0, None)
+        inter_w = np.clip(np.minimum(right[i], right[rest]) - np.maximum(left[i], left[rest]), 0, None)
+        intersection = inter_h * inter_w
+        iou = intersection / (areas[i] + areas[rest] - intersection)
+        covered = intersection / np.maximum(areas[rest], 1e-6)
+        order = rest[(iou <= iou_threshold) & (covered <= containment)]
+
+    return [tuple(int(v) for v in locations[i]) for i in keep]
+
+
+def detect_tile(tile: np.ndarray, offset: Tuple[int, int], scale: float) -> List[Tuple[int, int, int, int]]:
+    """
+    Detect faces in one tile and map them to original image coordinates.
+    """
+    y0, x0 = offset
+    return [
+        (int(top / scale) + y0, int(right / scale) + x0, int(bottom / scale) + y0, int(left / scale) + x0)
+        for top, right, bottom, left in face_recognition.face_locations(tile)
+    ]
+
+
+class TiledDetector:
+    def __init__(self, downscale: float = 1.0, tile_size: int = 1024, overlap: int = 192,
+                 coarse_scale: float = 0.25, workers: int = None, iou_threshold: float = 0.3):
+        """
+        Tiled, multi-scale face detection for large group photos
+
+        The image is downscaled by downscale, split into overlapping tiles
+        that are detected in parallel, and a whole-image pass at coarse_scale
+        catches faces larger than a tile. Duplicates are merged with NMS and
+        every box is returned in original image coordinates.
+
+        Args:
+            downscale (float): Scale the tiles are cut from (1.0 = full resolution)
+            tile_size (int): Tile side in pixels at that scale
+            overlap (int): Pixels shared by neighbouring tiles; should exceed the largest face
+            coarse_scale (float): Scale of the whole-image pass (0 disables it)
+            workers (int): Processes detecting tiles (1 = in this process)
+            iou_threshold (float): IoU above which two boxes are merged
+        """
+        self.downscale = downscale
+        self.tile_size = tile_size
+        self.overlap = overlap
+        self.coarse_scale = coarse_scale
+        self.workers = workers or os.cpu_count() or 1
+        self.iou_threshold = iou_threshold
+        self.executor = None
+
+    def detect(self, rgb_image: np.ndarray) -> List[Tuple[int, int, int, int]]:
+        """
+        Detect faces in an RGB image.
+
+        Returns:
+            list: (top, right, bottom, left) locations in original image coordinates
+        """
+        scaled = rgb_image
+        if self.downscale != 1.0:
+            scaled = cv2.resize(rgb_image, (0, 0), None, self.downscale, self.downscale)
+
+        jobs = [
+            (np.ascontiguousarray(scaled[y0:y1, x0:x1]), (int(y0 / self.downscale), int(x0 / self.downscale)), self.downscale)
+            for y0, x0, y1, x1 in make_tiles(scaled.shape[0], scaled.shape[1], self.tile_size, self.overlap)
+        ]
+        if self.coarse_scale and self.coarse_scale < self.downscale and len(jobs) > 1:
+            coarse = cv2.resize(rgb_image, (0, 0), None, self.coarse_scale, self.coarse_scale)
+            jobs.append((coarse, (0, 0), self.coarse_scale))
+
+        if self.workers > 1 and len(jobs) > 1:
+            if self.executor is None:
+                self.executor = ProcessPoolExecutor(max_workers=self.workers)
+            results = self.executor.map(detect_tile, *zip(*jobs))
+        else:
+            results = (detect_tile(*job) for job in jobs)
+
+        locations = [location for tile_locations in results for location in tile_locations]
+        return merge_detections(locations, self.iou_threshold)
+
+    def shutdown(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=True)
+            self.executor = None
@@ -0,0 +1,95 @@
+import heapq
+import itertools
+import threading
+import time
+from typing import Callable, Hashable
+
+
+class TTLCache:
+    def __init__(self, ttl: float = 30.0, max_size: int = 10000, clock: Callable[[], float] = time.monotonic):
+        """
+        Size-bounded set of keys that expire ttl seconds after they were added
+
+        Used as the debounce in front of attendance writes: a name is only
+        marked when it is not already in the cache. Expiry times come from a
+        monotonic clock, so wall-clock changes do not release or hold marks.
+        Expired keys are popped from a heap ordered by expiry; when the cache
+        is full the key closest to expiry is evicted. Safe to share between
+        threads (e.g. several cameras).
+
+        Args:
+            ttl (float): Seconds a key stays in the cache
+            max_size (int): Largest number of live keys
+            clock (callable): Monotonic time source in seconds
+        """
+        self.ttl = ttl
+        self.max_size = max_size
+        self.clock = clock
+
+        self.expires = {}
+        self.heap = []
+        # Tie-breaker so keys themselves are never compared
+        self.sequence = itertools.count()
+        self.lock = threading.Lock()
+
+        # Counters reported by stats()
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evicted = 0
+
+    def add(self, key: Hashable) -> bool:
+        """
+        Insert key unless it is already live.
+
+        Returns:
+            bool: True if the key was inserted (a miss), False if it was cached (a hit)
+        """
+        with self.lock:
+            now = self.clock()
+            self.expire(now)
+            if key in self.expires:
+                self.hits += 1
+                return False
+
+            self.misses += 1
+            if len(self.expires) >= self.max_size:
+                _, _, oldest = heapq.heappop(self.heap)
+                del self.expires[oldest]
+                self.evicted += 1
+
+            expires_at = now + self.ttl
+            self.expires[key] = expires_at
+            heapq.heappush(self.heap, (expires_at, next(self.sequence), key))
+            return True
+
+    def expire(self, now: float):
+        """
+        Drop every key whose time is up (call with the lock held).
+        """
+        while self.heap and self.heap[0][0] <= now:
+            _, _, key = heapq.heappop(self.heap)
+            del self.expires[key]
+            self.expired += 1
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self.lock:
+            self.expire(self.clock())
+            return key in self.expires
+
+    def __len__(self) -> int:
+        with self.lock:
+            self.expire(self.clock())
+            return len(self.expires)
+
+    def stats(self) -> dict:
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self.expires),
+                'hits': self.hits,
+                'misses': self.misses,
+                'expired': self.expired,
+                'evicted': self.evicted,
+                'hit_rate': self.hits / lookups if lookups else 0.0
+            }
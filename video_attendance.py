@@ -0,0 +1,212 @@
+import os
+import time
+import argparse
+import cv2
+from datetime import datetime, timedelta
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from attendance_tracker import AttendanceTracker
+from gallery_store import GalleryStore
+# Chunk workers use the recognition pool's per-process recognizer and initializer
+import recognition_pool
+
+
+def plan_chunks(frame_count, fps, chunk_seconds, step):
+    """
+    Split a video into frame ranges of about chunk_seconds each.
+
+    Chunk boundaries are multiples of step, so sampling stays evenly
+    spaced across chunks.
+
+    Returns:
+        list: (start_frame, end_frame) ranges, end exclusive
+    """
+    chunk_frames = max(step, int(round(chunk_seconds * fps / step)) * step)
+    return [(start, min(frame_count, start + chunk_frames)) for start in range(0, frame_count, chunk_frames)]
+
+
+def process_chunk(video_path, start_frame, end_frame, step):
+    """
+    Decode one chunk of a video and recognize faces in every step-th frame.
+
+    Skipped frames are only grabbed, not converted, which keeps decoding cheap.
+
+    Returns:
+        dict: 'sightings' as (seconds, name, distance), plus frame counts and timing
+    """
+    start = time.perf_counter()
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise IOError(f"Could not open video file: {video_path}")
+    fps = cap.get(cv2.CAP_PROP_FPS) or 25.0
+    if start_frame:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, start_frame)
+
+    sightings = []
+    sampled = 0
+    frame_index = start_frame
+    try:
+        while frame_index < end_frame:
+            if (frame_index - start_frame) % step:
+                if not cap.grab():
+                    break
+            else:
+                ret, frame = cap.read()
+                if not ret:
+                    break
+                sampled += 1
+                faces, _ = recognition_pool.get_recognizer().match_faces(frame)
+                for face in faces:
+                    if face['name'] is not None:
+                        sightings.append((frame_index / fps, face['name'], face['distance']))
+            frame_index += 1
+    finally:
+        cap.release()
+
+    return {
+        'sightings': sightings,
+        'frames': frame_index - start_frame,
+        'sampled': sampled,
+        'seconds': time.perf_counter() - start
+    }
+
+
+def sightings_to_events(sightings, absence_gap=300.0):
+    """
+    Turn per-frame sightings into attendance events.
+
+    A student is present from their first sighting until they have been
+    unseen for more than absence_gap seconds. Each presence produces an
+    in event at its first sighting and, if it lasted, an out event at its
+    last, matching the in/out slots of AttendanceTracker.
+
+    Args:
+        sightings (list): (seconds, name, distance) in any order
+        absence_gap (float): Seconds unseen after which a presence ends
+
+    Returns:
+        list: (seconds, name) events sorted by time
+    """
+    by_name = {}
+    for seconds, name, _ in sightings:
+        by_name.setdefault(name, []).append(seconds)
+
+    events = []
+    for name, times in by_name.items():
+        times.sort()
+        first = last = times[0]
+        for seconds in times[1:] + [None]:
+            if seconds is not None and seconds - last <= absence_gap:
+                last = seconds
+                continue
+            events.append((first, name))
+            if last > first:
+                events.append((last, name))
+            if seconds is not None:
+                first = last = seconds
+
+    events.sort()
+    return events
+
+
+def process_video(video_path, workers=None, sample_fps=1.0, chunk_seconds=60.0, training_images_path='Training_images',
+                  confidence_threshold=0.6, detection_scale=0.5):
+    """
+    Recognize faces in a recorded video, decoding time chunks in parallel processes.
+
+    Args:
+        video_path (str): Video file to process
+        workers (int): Worker processes (defaults to CPU count)
+        sample_fps (float): Frames per second of video to recognize
+        chunk_seconds (float): Length of video decoded by one task
+        training_images_path (str): Directory containing known face images
+        confidence_threshold (float): Largest distance accepted as a match
+        detection_scale (float): Downscale factor for detection
+
+    Returns:
+        tuple: List of (seconds, name, distance) sightings and a stats dict
+    """
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise IOError(f"Could not open video file: {video_path}")
+    fps = cap.get(cv2.CAP_PROP_FPS) or 25.0
+    frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    cap.release()
+
+    step = max(1, int(round(fps / sample_fps)))
+    chunks = plan_chunks(frame_count, fps, chunk_seconds, step)
+    workers = workers or os.cpu_count() or 1
+
+    # Encode new training images once here rather than in every worker
+    GalleryStore(training_images_path).sync()
+
+    start = time.perf_counter()
+    sightings = []
+    frames = sampled = 0
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=recognition_pool.init_worker,
+        initargs=(training_images_path, confidence_threshold, None, detection_scale)
+    ) as executor:
+        futures = [executor.submit(process_chunk, video_path, s, e, step) for s, e in chunks]
+        for done, future in enumerate(as_completed(futures), 1):
+            result = future.result()
+            sightings.extend(result['sightings'])
+            frames += result['frames']
+            sampled += result['sampled']
+            print(f"Chunk {done}/{len(chunks)} done ({result['sampled']} frames sampled in {result['seconds']:.1f}s)")
+
+    elapsed = time.perf_counter() - start
+    video_seconds = frame_count / fps
+    stats = {
+        'video_seconds': video_seconds,
+        'elapsed_seconds': elapsed,
+        'speedup': video_seconds / elapsed if elapsed else 0.0,
+        'chunks': len(chunks),
+        'workers': workers,
+        'frames': frames,
+        'sampled': sampled,
+        'sightings': len(sightings)
+    }
+    return sightings, stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Mark attendance from a recorded video')
+    parser.add_argument('video', help='Video file to process')
+    parser.add_argument('--workers', type=int, default=None, help='Worker processes (default: CPU count)')
+    parser.add_argument('--sample-fps', type=float, default=1.0, help='Frames per second of video to recognize')
+    parser.add_argument('--chunk-seconds', type=float, default=60.0, help='Seconds of video per parallel task')
+    parser.add_argument('--scale', type=float, default=0.5, help='Downscale factor for detection')
+    parser.add_argument('--absence-gap', type=float, default=300.0,
+                        help='Seconds a student must be unseen before they are marked out')
+    parser.add_argument('--start', default=None,
+                        help="Wall-clock start of the recording, 'YYYY-MM-DD HH:MM:SS' "
+                             "(default: file modification time minus video length)")
+    args = parser.parse_args()
+
+    sightings, stats = process_video(args.video, workers=args.workers, sample_fps=args.sample_fps,
+                                     chunk_seconds=args.chunk_seconds, detection_scale=args.scale)
+
+    if args.start:
+        recording_start = datetime.strptime(args.start, '%Y-%m-%d %H:%M:%S')
+    else:
+        # Recorders usually finish writing the file when the recording ends
+        recording_start = datetime.fromtimestamp(os.path.getmtime(args.video)) - timedelta(seconds=stats['video_seconds'])
+
+    # The tracker merges backdated marks in time order and skips ones already
+    # recorded, so footage can be processed again without adding slots
+    tracker = AttendanceTracker()
+    try:
+        for seconds, name in sightings_to_events(sightings, args.absence_gap):
+            tracker.mark_attendance(name, recording_start + timedelta(seconds=seconds))
+    finally:
+        tracker.close()
+
+    print(f"\nProcessed {stats['video_seconds']:.0f}s of video in {stats['elapsed_seconds']:.1f}s "
+          f"({stats['speedup']:.1f}x real time) with {stats['workers']} workers, "
+          f"{stats['sampled']} frames sampled, {stats['sightings']} sightings")
+
+
+if __name__ == "__main__":
+    main()